@@ -0,0 +1,101 @@
+"""Compare the Jupyter plugin backends: kernel gateway vs. direct jupyter_client.
+
+For every backend the plugin is started from scratch; the benchmark reports the
+cold-start time (``JupyterPlugin.initialize``, including its first probe cell),
+the latency of the first user cell and per-cell latency percentiles of small
+cells afterwards, plus the number of cells whose printed output was missing.
+
+Usage:
+    python benchmarks/bench_jupyter_backends.py
+    python benchmarks/bench_jupyter_backends.py --cells 200 --backends local gateway
+
+Outside the container the plugin runs in LocalRuntime mode from this checkout.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simple_openhands.events.action import IPythonRunCellAction  # noqa: E402
+from simple_openhands.plugins.jupyter import JupyterPlugin  # noqa: E402
+from simple_openhands.utils.system import find_available_tcp_port  # noqa: E402
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_backend(backend: str, cells: int) -> dict:
+    os.environ['JUPYTER_BACKEND'] = backend
+    os.environ['JUPYTER_PORT'] = str(find_available_tcp_port())
+    plugin = JupyterPlugin()
+    try:
+        start = time.perf_counter()
+        await plugin.initialize('benchmark')
+        cold_start = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await plugin.run(IPythonRunCellAction(code='import math; math.pi'))
+        first_cell = time.perf_counter() - start
+
+        latencies = []
+        wrong_outputs = 0
+        for i in range(cells):
+            start = time.perf_counter()
+            obs = await plugin.run(IPythonRunCellAction(code=f'x = {i} * 2; print(x)'))
+            latencies.append(time.perf_counter() - start)
+            wrong_outputs += obs.content.strip() != str(i * 2)
+    finally:
+        await plugin.shutdown()
+
+    return {
+        'backend': backend,
+        'cold_start_s': round(cold_start, 3),
+        'first_cell_ms': round(first_cell * 1000, 1),
+        'cells': cells,
+        'cell_ms_p50': round(statistics.median(latencies) * 1000, 2),
+        'cell_ms_p95': round(_percentile(latencies, 95) * 1000, 2),
+        'cell_ms_max': round(max(latencies) * 1000, 2),
+        'wrong_outputs': wrong_outputs,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cells', type=int, default=100)
+    parser.add_argument('--backends', nargs='+', default=list(JupyterPlugin.BACKENDS))
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    if not os.path.isdir('/simple_openhands/code'):
+        os.environ.setdefault('LOCAL_RUNTIME_MODE', '1')
+        os.environ.setdefault(
+            'SIMPLE_OPENHANDS_REPO_PATH',
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+
+    results = []
+    for backend in args.backends:
+        print(f'Running backend {backend}...', flush=True)
+        results.append(await run_backend(backend, args.cells))
+
+    columns = list(results[0])
+    print()
+    print(' | '.join(columns))
+    for row in results:
+        print(' | '.join(str(row[c]) for c in columns))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
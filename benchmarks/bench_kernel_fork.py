@@ -0,0 +1,83 @@
+"""Compare spawning local Jupyter kernels with forking them from a zygote.
+
+For each mode the benchmark starts ``--kernels`` kernels one after another with
+the default warm-up profile (agentskills preloaded) and reports the time until
+each kernel has run its warm-up, plus the per-kernel memory: USS (pages only
+this kernel owns) and PSS (shared pages split between the processes sharing
+them). Forked kernels share the zygote's imported modules copy-on-write.
+
+Usage:
+    python benchmarks/bench_kernel_fork.py
+    python benchmarks/bench_kernel_fork.py --kernels 8 --modules numpy pandas
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simple_openhands.plugins.jupyter.local_kernel import LocalJupyterKernel  # noqa: E402
+from simple_openhands.plugins.jupyter.warmup import DEFAULT_WARMUP_MODULES, WarmupProfile  # noqa: E402
+from simple_openhands.plugins.jupyter.zygote import KernelZygote  # noqa: E402
+
+MB = 1024 * 1024
+
+
+async def run_mode(mode: str, kernels: int, modules: list[str]) -> dict:
+    warmup = WarmupProfile(modules=modules)
+    zygote = None
+    if mode == 'fork':
+        zygote = KernelZygote(modules)
+        await zygote.start()
+    started = []
+    startup = []
+    try:
+        for _ in range(kernels):
+            kernel = LocalJupyterKernel('benchmark', warmup=warmup, zygote=zygote)
+            start = time.perf_counter()
+            await kernel.initialize()
+            startup.append(time.perf_counter() - start)
+            started.append(kernel)
+        memory = [psutil.Process(k.pid).memory_full_info() for k in started]
+    finally:
+        for kernel in started:
+            await kernel.shutdown_async()
+        if zygote is not None:
+            await zygote.shutdown()
+    return {
+        'mode': mode,
+        'kernels': kernels,
+        'startup_ms_median': round(statistics.median(startup) * 1000, 1),
+        'startup_ms_max': round(max(startup) * 1000, 1),
+        'zygote_ready_s': round(zygote.ready_seconds, 2) if zygote else None,
+        'uss_mb_avg': round(sum(m.uss for m in memory) / len(memory) / MB, 1),
+        'pss_mb_avg': round(sum(m.pss for m in memory) / len(memory) / MB, 1),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--kernels', type=int, default=4)
+    parser.add_argument('--modules', nargs='*', default=list(DEFAULT_WARMUP_MODULES))
+    args = parser.parse_args()
+
+    results = []
+    for mode in ('spawn', 'fork'):
+        print(f'Running mode {mode}...', flush=True)
+        results.append(await run_mode(mode, args.kernels, args.modules))
+
+    columns = list(results[0])
+    print()
+    print(' | '.join(columns))
+    for row in results:
+        print(' | '.join(str(row[c]) for c in columns))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+"""Stress benchmark for the tmux server layouts of BashSession.
+
+Creates N bash sessions per layout, runs commands on all of them concurrently
+and reports per-command latency percentiles together with the CPU time used by
+the tmux server process(es) hosting the sessions.
+
+Usage:
+    python benchmarks/bench_tmux_sockets.py
+    python benchmarks/bench_tmux_sockets.py --sessions 200 --rounds 5 \\
+        --layouts shared per-session sharded:8 --json results.json
+
+Note: with the 'shared' layout the default tmux server may also host sessions
+that do not belong to the benchmark; its CPU time is attributed to the run.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import libtmux
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simple_openhands.bash import BashSession  # noqa: E402
+from simple_openhands.events.action import CmdRunAction  # noqa: E402
+
+
+def _server_process(socket_name: str | None) -> psutil.Process | None:
+    try:
+        output = libtmux.Server(socket_name=socket_name).cmd(
+            'display-message', '-p', '#{pid}'
+        ).stdout
+        return psutil.Process(int(output[0]))
+    except (IndexError, ValueError, psutil.Error):
+        return None
+
+
+def _cpu_seconds(processes: list[psutil.Process]) -> float:
+    total = 0.0
+    for proc in processes:
+        try:
+            times = proc.cpu_times()
+            total += times.user + times.system
+        except psutil.Error:
+            pass
+    return total
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_layout(layout: str, sessions: int, rounds: int, workers: int, work_dir: str) -> dict:
+    def create(_: int) -> BashSession:
+        session = BashSession(work_dir=work_dir, tmux_socket_layout=layout)
+        session.initialize()
+        session.execute(CmdRunAction('true'))  # warm up: the first command waits for bash to start
+        return session
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        start = time.perf_counter()
+        bash_sessions = list(pool.map(create, range(sessions)))
+        setup_seconds = time.perf_counter() - start
+
+        sockets = {s.tmux_socket for s in bash_sessions}
+        servers = [p for p in (_server_process(sock) for sock in sockets) if p]
+        cpu_before = _cpu_seconds(servers)
+
+        def run(session: BashSession) -> tuple[float, bool]:
+            t0 = time.perf_counter()
+            obs = session.execute(CmdRunAction('echo bench-ok'))
+            return time.perf_counter() - t0, 'bench-ok' in obs.content
+
+        latencies: list[float] = []
+        errors = 0
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for latency, ok in pool.map(run, bash_sessions):
+                latencies.append(latency)
+                errors += not ok
+        command_seconds = time.perf_counter() - start
+        cpu_seconds = _cpu_seconds(servers) - cpu_before
+
+        list(pool.map(lambda s: s.close(), bash_sessions))
+
+    return {
+        'layout': layout,
+        'sessions': sessions,
+        'tmux_servers': len(sockets),
+        'setup_seconds': round(setup_seconds, 2),
+        'commands': len(latencies),
+        'errors': errors,
+        'latency_ms_p50': round(statistics.median(latencies) * 1000, 1),
+        'latency_ms_p95': round(_percentile(latencies, 95) * 1000, 1),
+        'latency_ms_p99': round(_percentile(latencies, 99) * 1000, 1),
+        'latency_ms_max': round(max(latencies) * 1000, 1),
+        'throughput_cmd_per_s': round(len(latencies) / command_seconds, 1),
+        'tmux_cpu_seconds': round(cpu_seconds, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=3, help='commands per session')
+    parser.add_argument('--workers', type=int, default=32, help='concurrent client threads')
+    parser.add_argument(
+        '--layouts', nargs='+', default=['shared', 'per-session', 'sharded:8']
+    )
+    parser.add_argument(
+        '--poll-interval',
+        type=float,
+        default=0.05,
+        help='BashSession.POLL_INTERVAL; the default 0.5s would hide tmux latency',
+    )
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    BashSession.POLL_INTERVAL = args.poll_interval
+    results = []
+    with tempfile.TemporaryDirectory(prefix='bench-tmux-') as work_dir:
+        for layout in args.layouts:
+            print(f'Running layout {layout} with {args.sessions} sessions...', flush=True)
+            results.append(
+                run_layout(layout, args.sessions, args.rounds, args.workers, work_dir)
+            )
+
+    columns = list(results[0])
+    print()
+    print(' | '.join(columns))
+    for row in results:
+        print(' | '.join(str(row[c]) for c in columns))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,15 @@
+import contextlib
+import json
 import os
 import re
+import shlex
+import shutil
+import tempfile
+import threading
 import time
 import traceback
 import uuid
+import zlib
 from enum import Enum
 from typing import Any
 
@@ -19,6 +26,10 @@ from simple_openhands.events.observation.commands import CMD_OUTPUT_PS1_END
 
 from simple_openhands.core import logger
 from simple_openhands.bash_constants import TIMEOUT_MESSAGE_TEMPLATE
+from simple_openhands.command_history import DEFAULT_MAX_BYTES, CommandHistory
+from simple_openhands.services import ServiceManager
+from simple_openhands.utils.file.snapshot import snapshot_directory
+from simple_openhands.utils.output_collapse import OutputCollapseStats, collapse_output
 
 def should_continue() -> bool:
     """Simple helper function to check if execution should continue."""
@@ -164,6 +175,30 @@ def escape_bash_special_chars(command: str) -> str: # 使用bashlex解析命令
         return command
 
 
+def tmux_socket_name(layout: str, session_name: str) -> str | None: # 根据布局计算tmux服务器的 -L socket 名称
+    """Return the tmux ``-L`` socket a session lives on for the given layout.
+
+    Layouts:
+        shared:      every session on the default tmux server (None).
+        per-session: one tmux server per session.
+        sharded:N:   sessions spread over N tmux servers by a hash of their name.
+    """
+    if layout == 'shared':
+        return None
+    if layout == 'per-session':
+        return session_name
+    if layout.startswith('sharded:'):
+        try:
+            shards = int(layout.split(':', 1)[1])
+        except ValueError:
+            shards = 0
+        if shards > 0:
+            return f'simple_openhands-shard-{zlib.crc32(session_name.encode()) % shards}'
+    raise ValueError(
+        f"Invalid tmux socket layout {layout!r}, expected 'shared', 'per-session' or 'sharded:N'"
+    )
+
+
 class BashCommandStatus(Enum): # 定义bash命令的执行状态
     CONTINUE = 'continue'
     COMPLETED = 'completed'
@@ -178,7 +213,14 @@ def _remove_command_prefix(command_output: str, command: str) -> str: #
 class BashSession: # 完整的bash会话管理系统，通过tmux提供持久的bash环境，支持命令执行、状态跟踪和超时管理。
     POLL_INTERVAL = 0.5
     HISTORY_LIMIT = 10_000
+    # Screen capture returns once the visible screen has not changed for this long
+    SCREEN_SETTLE_SECONDS = 1.0
+    CAPTURE_MODES = ('auto', 'history', 'screen')
     PS1 = CmdOutputMetadata.to_ps1_prompt()
+    # Variables describing the shell/terminal itself, not carried over by fork()
+    FORK_ENV_EXCLUDE = frozenset(
+        {'_', 'PWD', 'OLDPWD', 'SHLVL', 'TMUX', 'TMUX_PANE', 'PS1', 'PS2', 'PROMPT_COMMAND'}
+    )
 
     def __init__( # 初始化BashSession实例
         self,
@@ -186,16 +228,39 @@ class BashSession: # 完整的bash会话管理系统，通过tmux提供持久的
         username: str | None = None,
         no_change_timeout_seconds: int = 30,
         max_memory_mb: int | None = None,
+        state_file: str | None = None,
+        tmux_socket_layout: str = 'shared',
+        history_max_bytes: int = DEFAULT_MAX_BYTES,
     ):
         self.NO_CHANGE_TIMEOUT_SECONDS = no_change_timeout_seconds
         self.work_dir = work_dir
         self.username = username
         self._initialized = False
         self.max_memory_mb = max_memory_mb
+        # Persistent mode: the tmux session survives server restarts and is
+        # found again through this state file
+        self.state_file = state_file
+        self._saved_state: dict[str, Any] | None = None
+        # Service changes save the state from request worker threads
+        self._state_lock = threading.Lock()
+        # Commands and fork() drive the pane from different threads: one at a time
+        self._pane_lock = threading.RLock()
+        self.reattached = False
+        # Which tmux server (-L socket) hosts the session, see tmux_socket_name()
+        tmux_socket_name(tmux_socket_layout, '')  # validate early
+        self.tmux_socket_layout = tmux_socket_layout
+        self.tmux_socket: str | None = None
+        self.output_stats = OutputCollapseStats()
+        # Completed commands, bounded by history_max_bytes of compressed output
+        self.history = CommandHistory(max_bytes=history_max_bytes)
+        self._history_pending: dict[str, Any] | None = None
+        self.fork_info: dict[str, Any] | None = None  # set on sessions created by fork()
     
 
     def initialize(self) -> None: # 创建和配置tmux会话，设置bash环境
-        self.server = libtmux.Server()
+        if self.state_file and self._reattach():
+            return
+
         _shell_command = '/bin/bash'
         if self.username in ['root', 'simple_openhands']:
             # This starts a non-login (new) shell for the given user
@@ -212,6 +277,8 @@ class BashSession: # 完整的bash会话管理系统，通过tmux提供持久的
 
         logger.debug(f'Initializing bash session with command: {window_command}')
         session_name = f'simple_openhands-{self.username}-{uuid.uuid4()}'
+        self.tmux_socket = tmux_socket_name(self.tmux_socket_layout, session_name)
+        self.server = libtmux.Server(socket_name=self.tmux_socket)
         self.session = self.server.new_session(
             session_name=session_name,
             start_directory=self.work_dir,  # This parameter is supported by libtmux
@@ -250,10 +317,111 @@ class BashSession: # 完整的bash会话管理系统，通过tmux提供持久的
 
         # Maintain the current working directory
         self._cwd = os.path.abspath(self.work_dir)
+
+        self._init_services(session_name)
         self._initialized = True
+        self._save_state()
+
+    def _init_services(self, session_name: str) -> None: # 创建会话拥有的后台服务管理器
+        """Background services started through the session are owned by it."""
+        self.services = ServiceManager(
+            log_dir=os.path.join(
+                tempfile.gettempdir(), 'simple_openhands-services', session_name
+            ),
+            default_cwd=self._cwd,
+            on_change=self._save_state,
+        )
+
+    def _reattach(self) -> bool: # 持久化模式下，根据状态文件重新连接已存在的tmux会话
+        """Reattach to the tmux session recorded in the state file.
+
+        Returns False (and a fresh session is created instead) when there is no
+        usable state or the recorded tmux session no longer exists.
+        """
+        assert self.state_file is not None
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f'Ignoring unreadable bash session state {self.state_file}: {e}')
+            return False
+
+        session_name = state.get('session_name')
+        if not session_name or state.get('username') != self.username:
+            return False
+        # The recorded socket wins over the configured layout: that is where the session lives
+        self.tmux_socket = state.get('tmux_socket')
+        self.server = libtmux.Server(socket_name=self.tmux_socket)
+        if not self.server.has_session(session_name):
+            logger.info(f'tmux session {session_name} is gone, starting a new one')
+            return False
+        session = self.server.sessions.get(session_name=session_name, default=None)
+        window = (
+            session.windows.get(window_name='bash', default=None) if session else None
+        )
+        if window is None or window.active_pane is None:
+            return False
+
+        self.session = session
+        self.window = window
+        self.pane = window.active_pane
+        prev_status = state.get('prev_status')
+        self.prev_status = BashCommandStatus(prev_status) if prev_status else None
+        # Output the running command printed before the restart is shown again
+        self.prev_output = ''
+        self._closed = False
+        self._cwd = state.get('cwd') or os.path.abspath(self.work_dir)
+        self._init_services(session_name)
+        self.services.adopt(state.get('services', []))
+        self.reattached = True
+        self._initialized = True
+        logger.info(
+            f'Reattached to tmux session {session_name} '
+            f'(cwd: {self._cwd}, prev_status: {self.prev_status})'
+        )
+        return True
+
+    def _save_state(self) -> None: # 持久化模式下，会话名、prev_status、cwd或服务变化时原子地写入状态
+        if not self.state_file or not self._initialized or getattr(self, '_closed', False):
+            return
+        with self._state_lock:
+            # prev_output is left out: it grows with every poll of a running command
+            state = {
+                'session_name': self.session.name,
+                'tmux_socket': self.tmux_socket,
+                'username': self.username,
+                'work_dir': self.work_dir,
+                'cwd': self._cwd,
+                'prev_status': self.prev_status.value if self.prev_status else None,
+                'services': self.services.to_state(),
+            }
+            if state == self._saved_state:
+                return
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.state_file)), exist_ok=True)
+                tmp_path = f'{self.state_file}.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({**state, 'saved_at': time.time()}, f)
+                os.replace(tmp_path, self.state_file)
+                self._saved_state = state
+            except OSError as e:
+                logger.warning(f'Failed to save bash session state to {self.state_file}: {e}')
+
+    def detach(self) -> None: # 保存状态并释放会话，但不杀死tmux会话（用于服务器重启）
+        """Release the session without killing tmux so a restarted server can reattach."""
+        if getattr(self, '_closed', True):
+            return
+        self._save_state()
+        self._closed = True
 
     def __del__(self) -> None: # 析构函数，确保资源自动清理
         """Ensure the session is closed when the object is destroyed."""
+        if getattr(self, 'state_file', None):
+            # Persistent sessions must outlive the server process
+            self.detach()
+            return
         self.close()
 
     def _get_pane_content(self) -> str: # 捕获tmux面板的当前内容
@@ -267,17 +435,186 @@ class BashSession: # 完整的bash会话管理系统，通过tmux提供持久的
         )
         return content
 
+    def _get_screen_content(self) -> str: # 只捕获tmux面板当前可见的屏幕区域（不含历史记录）
+        """Capture only the visible screen region of the pane, without scrollback."""
+        return '\n'.join(
+            line.rstrip() for line in self.pane.cmd('capture-pane', '-p').stdout
+        ).rstrip()
+
+    def _get_screen_state(self) -> dict[str, Any]: # 查询备用屏幕状态、光标位置和面板尺寸
+        """Query alternate-screen usage, cursor position (0-based) and size of the pane."""
+        output = self.pane.cmd(
+            'display-message',
+            '-p',
+            '#{alternate_on} #{cursor_x} #{cursor_y} #{pane_width} #{pane_height}',
+        ).stdout
+        try:
+            alternate_on, cursor_x, cursor_y, width, height = map(int, output[0].split())
+        except (IndexError, ValueError):
+            logger.warning(f'Unexpected tmux display-message output: {output!r}')
+            return {'alternate_on': False}
+        return {
+            'alternate_on': bool(alternate_on),
+            'cursor_x': cursor_x,
+            'cursor_y': cursor_y,
+            'width': width,
+            'height': height,
+        }
+
     def close(self) -> None: # 清理tmux会话资源
         """Clean up the session."""
         if self._closed:
             return
+        if hasattr(self, 'services'):
+            self.services.stop_all()
+        socket_path = None
+        if self.tmux_socket:
+            socket_path = self.server.cmd('display-message', '-p', '#{socket_path}').stdout
         self.session.kill()
         self._closed = True
+        if socket_path and not self.server.is_alive():
+            # tmux leaves the socket of a dedicated server behind once its last session is gone
+            try:
+                os.remove(socket_path[0])
+            except OSError:
+                pass
+        if self.state_file:
+            # A killed session must not be reattached after a restart
+            try:
+                os.remove(self.state_file)
+            except FileNotFoundError:
+                pass
 
     @property
     def cwd(self) -> str: # 获取当前工作目录
         return self._cwd
 
+    def _shell_user_ids(self) -> tuple[int, int] | None: # 会话shell以其他用户运行时（su）返回其uid/gid
+        """uid/gid of the user the shell runs as, if that is not the server's own user."""
+        if self.username not in ['root', 'simple_openhands'] or not hasattr(os, 'geteuid'):
+            return None
+        import pwd
+
+        try:
+            entry = pwd.getpwnam(self.username)
+        except KeyError:
+            return None
+        if entry.pw_uid == os.geteuid():
+            return None
+        return entry.pw_uid, entry.pw_gid
+
+    @contextlib.contextmanager
+    def _private_tempdir(self): # 仅会话shell的用户可访问的临时目录（0700）
+        """A temporary 0700 directory owned by the user the shell runs as.
+
+        The exported environment may contain credentials, so it must not pass
+        through files other local users can read or replace.
+        """
+        directory = tempfile.mkdtemp(prefix='simple_openhands-env-')
+        try:
+            ids = self._shell_user_ids()
+            if ids is not None:
+                os.chown(directory, *ids)
+            yield directory, ids
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _exported_env(self) -> dict[str, str]: # 读取会话shell中导出的环境变量
+        """Read the exported environment of the shell running in the pane."""
+        with self._private_tempdir() as (directory, _):
+            env_file = os.path.join(directory, 'env')
+            # umask 077: the file is created by the shell's user and readable only by it (and root)
+            self.execute(CmdRunAction(f'(umask 077 && env -0 > {shlex.quote(env_file)})', hidden=True))
+            try:
+                with open(env_file, 'rb') as f:
+                    raw = f.read()
+            except FileNotFoundError:
+                raw = b''
+        env: dict[str, str] = {}
+        for item in raw.split(b'\0'):
+            key, sep, value = item.partition(b'=')
+            if sep:
+                env[key.decode('utf-8', 'replace')] = value.decode('utf-8', 'replace')
+        return env
+
+    def _restore_env(self, env: dict[str, str], cwd: str) -> None: # 在会话中导出给定的环境变量并切换目录
+        with self._private_tempdir() as (directory, ids):
+            env_file = os.path.join(directory, 'env.sh')
+            fd = os.open(env_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                for key, value in env.items():
+                    if key in self.FORK_ENV_EXCLUDE or not re.match(r'^[A-Za-z_][A-Za-z0-9_]*$', key):
+                        continue
+                    f.write(f'export {key}={shlex.quote(value)}\n')
+            if ids is not None:
+                os.chown(env_file, *ids)
+            self.execute(
+                CmdRunAction(f'source {shlex.quote(env_file)} && cd {shlex.quote(cwd)}', hidden=True)
+            )
+
+    def fork( # 派生新会话：相同的cwd和导出的环境变量，并可对工作区做快照
+        self,
+        work_dir: str | None = None,
+        snapshot_mode: str | None = 'auto',
+    ) -> 'BashSession':
+        """Create a new session with this session's cwd and exported environment.
+
+        Args:
+            work_dir: Workspace of the new session. When ``snapshot_mode`` is set,
+                a snapshot of this session's ``work_dir`` is created there and
+                paths pointing into the old workspace (cwd, ``PATH``, virtualenvs,
+                ...) are remapped into the snapshot.
+            snapshot_mode: A mode of ``snapshot_directory`` ('auto', 'reflink',
+                'hardlink', 'copy'), or None to share this session's workspace.
+
+        Returns:
+            The new, initialized session. ``fork_info`` describes the snapshot.
+        """
+        if not self._initialized:
+            raise RuntimeError('Bash session is not initialized')
+        with self._pane_lock:
+            if self.prev_status in {
+                BashCommandStatus.CONTINUE,
+                BashCommandStatus.NO_CHANGE_TIMEOUT,
+                BashCommandStatus.HARD_TIMEOUT,
+            }:
+                raise RuntimeError('Cannot fork while a command is still running')
+            env = self._exported_env()
+        src_root = os.path.abspath(self.work_dir)
+        start_time = time.time()
+        if snapshot_mode is None:
+            new_root = src_root
+            used_mode = None
+        else:
+            if work_dir is None:
+                raise ValueError('work_dir is required when snapshotting the workspace')
+            new_root = os.path.abspath(work_dir)
+            used_mode = snapshot_directory(src_root, new_root, snapshot_mode)
+        snapshot_seconds = time.time() - start_time
+
+        def remap(value: str) -> str:
+            if new_root == src_root:
+                return value
+            return re.sub(re.escape(src_root) + r'(?=/|:|$)', new_root, value)
+
+        child = BashSession(
+            work_dir=new_root,
+            username=self.username,
+            no_change_timeout_seconds=self.NO_CHANGE_TIMEOUT_SECONDS,
+            max_memory_mb=self.max_memory_mb,
+            tmux_socket_layout=self.tmux_socket_layout,
+            history_max_bytes=self.history.max_bytes,
+        )
+        child.initialize()
+        child._restore_env({k: remap(v) for k, v in env.items()}, remap(self._cwd))
+        child.fork_info = {
+            'parent': self.session.name,
+            'snapshot_mode': used_mode,
+            'snapshot_seconds': round(snapshot_seconds, 3),
+        }
+        logger.debug(f'Forked bash session {self.session.name} -> {child.session.name}')
+        return child
+
     def _is_special_key(self, command: str) -> bool: # 检测是否为特殊控制键（如Ctrl+C）
         """Check if the command is a special key."""
         # Special keys are of the form C-<key>
@@ -431,6 +768,38 @@ class BashSession: # 完整的bash会话管理系统，通过tmux提供持久的
             metadata=metadata,
         )
 
+    def _handle_screen_capture( # 返回全屏程序（TUI）的可见屏幕和光标位置
+        self,
+        command: str,
+        screen_content: str,
+        screen_state: dict[str, Any],
+    ) -> CmdOutputObservation:
+        # The program is still running; the scrollback and prev_output are left
+        # untouched since a redrawn screen never enters the pane history.
+        self.prev_status = BashCommandStatus.CONTINUE
+        metadata = CmdOutputMetadata()
+        where = (
+            'a full-screen program (alternate screen)'
+            if screen_state.get('alternate_on')
+            else 'the terminal'
+        )
+        cursor = ''
+        if screen_state.get('cursor_y') is not None:
+            cursor = (
+                f', cursor at row {screen_state["cursor_y"] + 1}'
+                f' column {screen_state["cursor_x"] + 1}'
+            )
+        metadata.suffix = (
+            f'\n[Visible screen of {where}{cursor}. The program is still running: '
+            'send keys with `is_input` set to `true` to interact with it.]'
+        )
+        return CmdOutputObservation(
+            content=screen_content,
+            command=command,
+            metadata=metadata,
+            screen=screen_state,
+        )
+
     def _ready_for_next_command(self) -> None: # 为下一个命令准备环境
         """Reset the content buffer for a new command."""
         # Clear the current content
@@ -473,8 +842,66 @@ class BashSession: # 完整的bash会话管理系统，通过tmux提供持久的
         logger.debug(f'COMBINED OUTPUT: {combined_output}')
         return combined_output
 
-    def execute(self, action: CmdRunAction) -> CmdOutputObservation | ErrorObservation: # 执行命令的核心方法，处理命令执行的各个阶段
-        """Execute a command in the bash session."""
+    def execute(self, action: CmdRunAction) -> CmdOutputObservation | ErrorObservation: # 执行命令，并在持久化模式下保存会话状态
+        """Execute a command in the bash session.
+
+        Progress-bar redraws and repeated lines are collapsed in the output unless
+        ``action.collapse_output`` is False; savings are tracked in ``output_stats``.
+        Completed commands are recorded in ``history``.
+        """
+        with self._pane_lock:
+            was_running = self.prev_status in {
+                BashCommandStatus.CONTINUE,
+                BashCommandStatus.NO_CHANGE_TIMEOUT,
+                BashCommandStatus.HARD_TIMEOUT,
+            }
+            cwd_before = self._cwd
+            started_at = time.time()
+            observation = self._execute(action)
+            if isinstance(observation, CmdOutputObservation) and observation.screen is None:
+                if action.collapse_output:
+                    raw_content = observation.content
+                    observation.content = collapse_output(raw_content)
+                    self.output_stats.record(raw_content, observation.content)
+                else:
+                    self.output_stats.record_opt_out()
+                self._track_history(action, observation, was_running, cwd_before, started_at)
+            self._save_state()
+            return observation
+
+    def _track_history( # 累积命令的各段输出，命令完成时写入历史记录
+        self,
+        action: CmdRunAction,
+        observation: CmdOutputObservation,
+        was_running: bool,
+        cwd_before: str,
+        started_at: float,
+    ) -> None:
+        command = action.command.strip()
+        if not was_running and command and not action.is_input and not action.hidden:
+            self._history_pending = {
+                'command': command,
+                'cwd': cwd_before,
+                'started_at': started_at,
+                'outputs': [],
+            }
+        pending = self._history_pending
+        if pending is None:
+            return
+        if observation.content:
+            pending['outputs'].append(observation.content)
+        if self.prev_status == BashCommandStatus.COMPLETED:
+            self._history_pending = None
+            self.history.add(
+                command=pending['command'],
+                output='\n'.join(pending['outputs']),
+                exit_code=observation.metadata.exit_code,
+                cwd=pending['cwd'],
+                started_at=pending['started_at'],
+                duration=time.time() - pending['started_at'],
+            )
+
+    def _execute(self, action: CmdRunAction) -> CmdOutputObservation | ErrorObservation: # 执行命令的核心方法，处理命令执行的各个阶段
         if not self._initialized:
             raise RuntimeError('Bash session is not initialized')
 
@@ -482,6 +909,11 @@ class BashSession: # 完整的bash会话管理系统，通过tmux提供持久的
         logger.debug(f'RECEIVED ACTION: {action}')
         command = action.command.strip()
         is_input: bool = action.is_input
+        capture_mode = action.capture_mode
+        if capture_mode not in self.CAPTURE_MODES:
+            return ErrorObservation(
+                content=f'ERROR: Invalid capture_mode {capture_mode!r}, expected one of {self.CAPTURE_MODES}.'
+            )
 
         # If the previous command is not completed, we need to check if the command is empty
         if self.prev_status not in {
@@ -531,6 +963,7 @@ class BashSession: # 完整的bash会话管理系统，通过tmux提供持久的
         if (
             self.prev_status
             in {
+                BashCommandStatus.CONTINUE,
                 BashCommandStatus.HARD_TIMEOUT,
                 BashCommandStatus.NO_CHANGE_TIMEOUT,
             }
@@ -590,7 +1023,31 @@ class BashSession: # 完整的bash会话管理系统，通过tmux提供持久的
                 )
 
         # Loop until the command completes or times out
+        last_screen_content: str | None = None
+        last_screen_change_time = start_time
         while should_continue():
+            # Full-screen programs (vim, top, htop, ...) redraw the visible screen
+            # on the alternate screen: capture just that instead of the history
+            if capture_mode != 'history':
+                screen_state = self._get_screen_state()
+                if capture_mode == 'screen' or screen_state['alternate_on']:
+                    screen_content = self._get_screen_content()
+                    if not screen_content.endswith(CMD_OUTPUT_PS1_END.rstrip()):
+                        if screen_content != last_screen_content:
+                            last_screen_content = screen_content
+                            last_screen_change_time = time.time()
+                        elapsed_time = time.time() - start_time
+                        if (
+                            time.time() - last_screen_change_time
+                            >= self.SCREEN_SETTLE_SECONDS
+                            or (action.timeout and elapsed_time >= action.timeout)
+                        ):
+                            return self._handle_screen_capture(
+                                command, screen_content, screen_state
+                            )
+                        time.sleep(self.POLL_INTERVAL)
+                        continue
+
             _start_time = time.time()
             logger.debug(f'GETTING PANE CONTENT at {_start_time}')
             cur_pane_output = self._get_pane_content()
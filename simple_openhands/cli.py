@@ -70,6 +70,42 @@ def cmd_context(api_url: str, raw: bool, timeout: float) -> int:
         return 2
 
 
+def _run_streaming(api_url: str, payload: Dict[str, Any], raw: bool, timeout: float) -> int:
+    """Run Python code through /execute_action/stream, printing outputs as they arrive."""
+    url = api_url.rstrip("/") + "/execute_action/stream"
+    try:
+        resp = requests.post(url, json={"action": payload["action"]}, stream=True, timeout=timeout)
+    except requests.RequestException as e:
+        _print_error(f"oh-run: request failed: {e}")
+        return 2
+    if not resp.ok:
+        print(resp.text)
+        return 1
+
+    printed = False
+    for line in resp.iter_lines(decode_unicode=True):
+        if not line:
+            continue
+        if raw:
+            print(line, flush=True)
+            continue
+        event = json.loads(line)
+        if event.get("type") == "observation":
+            if not printed:
+                print(event.get("content") or "[empty output]")
+            break
+        content = event.get("content", {})
+        if event.get("msg_type") == "stream":
+            text = content.get("text", "")
+        elif event.get("msg_type") == "error":
+            text = "\n".join(content.get("traceback", [])) + "\n"
+        else:
+            text = content.get("data", {}).get("text/plain", "") + "\n"
+        print(text, end="", flush=True)
+        printed = True
+    return 0
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(prog="oh-run", description="Execute a bash command or Python code via Simple OpenHands runtime HTTP API")
     parser.add_argument("command", nargs=argparse.REMAINDER, help="Command to execute (bash command by default, or Python code with --python)")
@@ -81,6 +117,7 @@ def main() -> int:
     parser.add_argument("--context", dest="context", action="store_true", help="Print runtime context (server_info) instead of executing a command")
     parser.add_argument("--session-file", dest="session_file", default=None, help="Path to a .oh-session JSON (overridden by --url)")
     parser.add_argument("--python", dest="python", action="store_true", help="Execute as Python code instead of bash command")
+    parser.add_argument("--stream", dest="stream", action="store_true", help="With --python, print output as the cell produces it")
 
     args = parser.parse_args()
 
@@ -122,6 +159,9 @@ def main() -> int:
     else:
         payload = _build_run_action(command=command_str, thought=args.thought, blocking=args.blocking)
 
+    if args.python and args.stream:
+        return _run_streaming(api_url, payload, raw=args.raw, timeout=args.timeout)
+
     # Direct HTTP request (robust, cross-platform)
     url = api_url.rstrip("/") + "/execute_action"
     headers = {"Content-Type": "application/json"}
@@ -0,0 +1,177 @@
+"""Bounded, searchable history of the commands run in a bash session.
+
+Every completed command is kept with its exit code, duration, cwd and its
+zlib-compressed output so that agents can look up earlier results instead of
+re-running ``git status`` or the test suite. The total compressed size is kept
+under a byte budget by evicting the oldest records.
+"""
+
+import itertools
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass
+
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+# Outputs above this size are stored as their last MAX_OUTPUT_CHARS characters
+MAX_OUTPUT_CHARS = 256 * 1024
+
+
+@dataclass
+class CommandRecord:
+    id: int
+    command: str
+    exit_code: int
+    cwd: str | None
+    started_at: float
+    duration: float
+    output_chars: int
+    compressed_output: bytes
+    output_truncated: bool = False
+
+    @property
+    def size(self) -> int:
+        """Approximate memory footprint used for the budget."""
+        return len(self.compressed_output) + len(self.command) + 128
+
+    @property
+    def output(self) -> str:
+        return zlib.decompress(self.compressed_output).decode('utf-8', errors='replace')
+
+    def to_dict(self, include_output: bool = False) -> dict:
+        data = {
+            'id': self.id,
+            'command': self.command,
+            'exit_code': self.exit_code,
+            'cwd': self.cwd,
+            'started_at': self.started_at,
+            'duration': round(self.duration, 3),
+            'output_chars': self.output_chars,
+            'output_truncated': self.output_truncated,
+        }
+        if include_output:
+            data['output'] = self.output
+        return data
+
+
+class CommandHistory:
+    """Per-session command history bounded by ``max_bytes`` of compressed data."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        if max_bytes <= 0:
+            raise ValueError('max_bytes must be positive')
+        self.max_bytes = max_bytes
+        self._records: deque[CommandRecord] = deque()
+        self._ids = itertools.count(1)
+        self._bytes = 0
+        self._evicted = 0
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        command: str,
+        output: str,
+        exit_code: int,
+        cwd: str | None = None,
+        started_at: float | None = None,
+        duration: float = 0.0,
+    ) -> CommandRecord:
+        """Record a completed command, evicting the oldest records when over budget."""
+        truncated = len(output) > MAX_OUTPUT_CHARS
+        stored = output[-MAX_OUTPUT_CHARS:] if truncated else output
+        record = CommandRecord(
+            id=next(self._ids),
+            command=command,
+            exit_code=exit_code,
+            cwd=cwd,
+            started_at=started_at if started_at is not None else time.time(),
+            duration=duration,
+            output_chars=len(output),
+            compressed_output=zlib.compress(stored.encode('utf-8', errors='replace'), 6),
+            output_truncated=truncated,
+        )
+        with self._lock:
+            self._records.append(record)
+            self._bytes += record.size
+            while self._bytes > self.max_bytes and len(self._records) > 1:
+                evicted = self._records.popleft()
+                self._bytes -= evicted.size
+                self._evicted += 1
+        return record
+
+    def get(self, record_id: int) -> CommandRecord:
+        with self._lock:
+            for record in self._records:
+                if record.id == record_id:
+                    return record
+        raise KeyError(record_id)
+
+    def query(
+        self,
+        limit: int = 20,
+        exit_code: int | None = None,
+        failed: bool | None = None,
+        command: str | None = None,
+    ) -> list[CommandRecord]:
+        """Return the most recent matching records, newest first.
+
+        Args:
+            limit: Maximum number of records.
+            exit_code: Only records with this exit code.
+            failed: True for non-zero exit codes only, False for successful commands only.
+            command: Regular expression searched in the command line.
+        """
+        pattern = re.compile(command) if command else None
+        with self._lock:
+            records = list(self._records)
+        result = []
+        for record in reversed(records):
+            if exit_code is not None and record.exit_code != exit_code:
+                continue
+            if failed is not None and (record.exit_code != 0) != failed:
+                continue
+            if pattern and not pattern.search(record.command):
+                continue
+            result.append(record)
+            if len(result) >= limit:
+                break
+        return result
+
+    def grep(
+        self,
+        pattern: str,
+        limit: int = 20,
+        max_lines_per_record: int = 20,
+        ignore_case: bool = False,
+    ) -> list[dict]:
+        """Search past outputs, newest first; returns matching lines per record."""
+        regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        with self._lock:
+            records = list(self._records)
+        result = []
+        for record in reversed(records):
+            lines = [
+                {'line': number, 'text': text}
+                for number, text in enumerate(record.output.splitlines(), start=1)
+                if regex.search(text)
+            ]
+            if not lines:
+                continue
+            entry = record.to_dict()
+            entry['match_count'] = len(lines)
+            entry['matches'] = lines[:max_lines_per_record]
+            result.append(entry)
+            if len(result) >= limit:
+                break
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'records': len(self._records),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'evicted': self._evicted,
+            }
@@ -13,6 +13,10 @@ class ActionType(str, Enum):
     WRITE = 'write'
     EDIT = 'edit'
     RUN_IPYTHON = 'run_ipython'
+    RUN_IPYTHON_FANOUT = 'run_ipython_fanout'
+    KERNEL_CHECKPOINT = 'kernel_checkpoint'
+    KERNEL_RESTORE = 'kernel_restore'
+    AGENT_SKILL = 'agent_skill'
 
 
 class ObservationType(str, Enum):
@@ -22,4 +26,8 @@ class ObservationType(str, Enum):
     WRITE = 'write'
     EDIT = 'edit'
     RUN_IPYTHON = 'run_ipython'
+    RUN_IPYTHON_FANOUT = 'run_ipython_fanout'
+    KERNEL_CHECKPOINT = 'kernel_checkpoint'
+    KERNEL_RESTORE = 'kernel_restore'
+    AGENT_SKILL = 'agent_skill'
     ERROR = 'error'
@@ -1,18 +1,24 @@
 from .action import Action, ActionConfirmationStatus, ActionSecurityRisk
-from .commands import CmdRunAction, IPythonRunCellAction
+from .agent_skills import AgentSkillAction
+from .commands import CmdRunAction, IPythonFanOutAction, IPythonRunCellAction
 from .files import (
     FileEditAction,
     FileReadAction,
     FileWriteAction,
 )
+from .kernel import KernelCheckpointAction, KernelRestoreAction
 
 __all__ = [
     'Action',
     'ActionConfirmationStatus',
     'ActionSecurityRisk',
+    'AgentSkillAction',
     'CmdRunAction',
     'FileReadAction',
     'FileWriteAction',
     'FileEditAction',
     'IPythonRunCellAction',
+    'IPythonFanOutAction',
+    'KernelCheckpointAction',
+    'KernelRestoreAction',
 ]
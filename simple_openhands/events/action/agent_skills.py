@@ -0,0 +1,31 @@
+from dataclasses import dataclass, field
+from typing import ClassVar
+
+from simple_openhands.core.schema import ActionType
+from simple_openhands.events.action.action import Action
+
+
+@dataclass
+class AgentSkillAction(Action):
+    """Calls an agentskills function (e.g. `search_dir`) in the server process.
+
+    `arguments` are the function's keyword arguments; relative paths are resolved
+    against the session's working directory.
+    """
+
+    function: str
+    arguments: dict = field(default_factory=dict)
+    thought: str = ''
+    action: str = ActionType.AGENT_SKILL
+    runnable: ClassVar[bool] = True
+
+    @property
+    def message(self) -> str:
+        return f'Calling agent skill: {self.function}'
+
+    def __str__(self) -> str:
+        ret = '**AgentSkillAction**\n'
+        if self.thought:
+            ret += f'THOUGHT: {self.thought}\n'
+        ret += f'FUNCTION: {self.function}({self.arguments})'
+        return ret
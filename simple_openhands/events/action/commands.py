@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import ClassVar
 
 from simple_openhands.core.schema import ActionType
@@ -20,6 +20,10 @@ class CmdRunAction(Action):
     is_static: bool = False  # if True, runs the command in a separate process
     cwd: str | None = None  # current working directory, only used if is_static is True
     hidden: bool = False
+    collapse_output: bool = True  # if True, progress-bar redraws and repeated lines are collapsed in the output
+    # 'history': output since the command started; 'screen': only the visible screen;
+    # 'auto': 'screen' while a full-screen program uses the alternate screen, else 'history'
+    capture_mode: str = 'auto'
     action: str = ActionType.RUN
     runnable: ClassVar[bool] = True
     confirmation_state: ActionConfirmationStatus = ActionConfirmationStatus.CONFIRMED
@@ -49,6 +53,12 @@ class IPythonRunCellAction(Action):
     confirmation_state: ActionConfirmationStatus = ActionConfirmationStatus.CONFIRMED
     security_risk: ActionSecurityRisk | None = None
     kernel_init_code: str = ''  # code to run in the kernel (if the kernel is restarted)
+    # 'store': image_urls are short /images/<sha256>.png URLs, 'inline': base64 data URLs,
+    # '': the server default (JUPYTER_IMAGE_MODE)
+    image_mode: str = ''
+    # if True, the code runs in a fresh pre-forked worker process instead of the session's
+    # kernel: no variables from earlier cells, but near-zero dispatch latency and parallelism
+    stateless: bool = False
 
     def __str__(self) -> str:
         ret = '**IPythonRunCellAction**\n'
@@ -60,3 +70,37 @@ class IPythonRunCellAction(Action):
     @property
     def message(self) -> str:
         return f'Running Python code interactively: {self.code}'
+
+
+@dataclass
+class IPythonFanOutAction(Action):
+    """Runs `code` once per element of `inputs`, in parallel.
+
+    Each run sees its input (any JSON value) as the variable `item_name`.
+    With `stateless` the runs go to the stateless worker pool and `setup_code`
+    precedes every run; otherwise up to `max_parallel` temporary Jupyter
+    kernels each run `setup_code` once and then take inputs in turn.
+    """
+
+    code: str
+    inputs: list = field(default_factory=list)
+    item_name: str = 'item'
+    setup_code: str = ''
+    max_parallel: int = 0  # 0: the worker pool size / JUPYTER_FANOUT_MAX_KERNELS
+    stateless: bool = True
+    thought: str = ''
+    action: str = ActionType.RUN_IPYTHON_FANOUT
+    runnable: ClassVar[bool] = True
+    confirmation_state: ActionConfirmationStatus = ActionConfirmationStatus.CONFIRMED
+    security_risk: ActionSecurityRisk | None = None
+
+    def __str__(self) -> str:
+        ret = f'**IPythonFanOutAction ({len(self.inputs)} inputs)**\n'
+        if self.thought:
+            ret += f'THOUGHT: {self.thought}\n'
+        ret += f'CODE:\n{self.code}'
+        return ret
+
+    @property
+    def message(self) -> str:
+        return f'Running Python code over {len(self.inputs)} inputs in parallel: {self.code}'
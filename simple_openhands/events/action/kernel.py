@@ -0,0 +1,41 @@
+from dataclasses import dataclass
+from typing import ClassVar
+
+from simple_openhands.core.schema import ActionType
+from simple_openhands.events.action.action import Action
+
+
+@dataclass
+class KernelCheckpointAction(Action):
+    """Pickles the Jupyter kernel's user variables to disk.
+
+    The checkpoint runs in the background unless `wait` is set; `variables`
+    limits it to some variables (merged into an existing checkpoint of the
+    same name).
+    """
+
+    name: str = 'default'
+    variables: list[str] | None = None
+    wait: bool = False
+    thought: str = ''
+    action: str = ActionType.KERNEL_CHECKPOINT
+    runnable: ClassVar[bool] = True
+
+    @property
+    def message(self) -> str:
+        return f'Checkpointing kernel variables: {self.name}'
+
+
+@dataclass
+class KernelRestoreAction(Action):
+    """Loads the variables of a checkpoint into the Jupyter kernel."""
+
+    name: str = 'default'
+    variables: list[str] | None = None
+    thought: str = ''
+    action: str = ActionType.KERNEL_RESTORE
+    runnable: ClassVar[bool] = True
+
+    @property
+    def message(self) -> str:
+        return f'Restoring kernel variables: {self.name}'
@@ -1,6 +1,8 @@
+from .agent_skills import AgentSkillObservation
 from .commands import (
     CmdOutputMetadata,
     CmdOutputObservation,
+    IPythonFanOutObservation,
     IPythonRunCellObservation,
 )
 from .error import ErrorObservation
@@ -9,15 +11,20 @@ from .files import (
     FileReadObservation,
     FileWriteObservation,
 )
+from .kernel import KernelCheckpointObservation, KernelRestoreObservation
 from .observation import Observation
 
 __all__ = [
     'Observation',
+    'AgentSkillObservation',
     'CmdOutputObservation',
     'CmdOutputMetadata',
     'IPythonRunCellObservation',
+    'IPythonFanOutObservation',
     'FileReadObservation',
     'FileWriteObservation',
     'FileEditObservation',
     'ErrorObservation',
+    'KernelCheckpointObservation',
+    'KernelRestoreObservation',
 ]
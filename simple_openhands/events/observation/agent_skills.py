@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+
+from simple_openhands.core.schema import ObservationType
+from simple_openhands.events.observation.observation import Observation
+
+
+@dataclass
+class AgentSkillObservation(Observation):
+    """The printed output of an AgentSkillAction."""
+
+    function: str
+    failed: bool = False  # the function raised; the traceback is in the content
+    duration_seconds: float | None = None
+    observation: str = ObservationType.AGENT_SKILL
+
+    @property
+    def error(self) -> bool:
+        return self.failed
+
+    @property
+    def message(self) -> str:
+        return f'Agent skill {self.function} called.'
+
+    def __str__(self) -> str:
+        return f'**AgentSkillObservation**\n{self.content}'
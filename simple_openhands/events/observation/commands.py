@@ -99,6 +99,8 @@ class CmdOutputObservation(Observation):
     metadata: CmdOutputMetadata = field(default_factory=CmdOutputMetadata)
     # Whether the command output should be hidden from the user
     hidden: bool = False
+    # Set when `content` is the visible screen only: alternate_on, cursor_x/cursor_y (0-based), width, height
+    screen: dict[str, Any] | None = None
 
     def __init__(
         self,
@@ -107,12 +109,14 @@ class CmdOutputObservation(Observation):
         observation: str = ObservationType.RUN,
         metadata: dict[str, Any] | CmdOutputMetadata | None = None,
         hidden: bool = False,
+        screen: dict[str, Any] | None = None,
         **kwargs: Any,
     ) -> None:
         super().__init__(content)
         self.command = command
         self.observation = observation
         self.hidden = hidden
+        self.screen = screen
         if isinstance(metadata, dict):
             self.metadata = CmdOutputMetadata(**metadata)
         else:
@@ -171,6 +175,8 @@ class IPythonRunCellObservation(Observation):
     code: str
     observation: str = ObservationType.RUN_IPYTHON
     image_urls: list[str] | None = None
+    # Kernel resource usage of the cell: duration, CPU seconds, RSS before/after/peak
+    resources: dict | None = None
 
     @property
     def error(self) -> bool:
@@ -189,3 +195,32 @@ class IPythonRunCellObservation(Observation):
         if self.image_urls:
             result += f'\nImages: {len(self.image_urls)}'
         return result
+
+
+@dataclass
+class IPythonFanOutObservation(Observation):
+    """The outputs of an IPythonFanOutAction.
+
+    `results` holds one entry per input, in input order: `index`, `input`,
+    `status` ('ok', 'error' or 'timeout'), `output`, `image_urls` and
+    `duration_seconds`.
+    """
+
+    code: str
+    results: list[dict] = field(default_factory=list)
+    observation: str = ObservationType.RUN_IPYTHON_FANOUT
+
+    @property
+    def error(self) -> bool:
+        return any(result['status'] != 'ok' for result in self.results)
+
+    @property
+    def message(self) -> str:
+        return f'Code executed over {len(self.results)} inputs.'
+
+    @property
+    def success(self) -> bool:
+        return not self.error
+
+    def __str__(self) -> str:
+        return f'**IPythonFanOutObservation**\n{self.content}'
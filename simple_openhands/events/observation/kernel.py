@@ -0,0 +1,53 @@
+from dataclasses import dataclass, field
+
+from simple_openhands.core.schema import ObservationType
+from simple_openhands.events.observation.observation import Observation
+
+
+@dataclass
+class KernelCheckpointObservation(Observation):
+    """The result of a KernelCheckpointAction.
+
+    While the checkpoint is `in_progress`, `saved` lists the variables being
+    written; `skipped` maps variables that could not be pickled to the reason.
+    `background_report` is the report of the background checkpoint of this
+    name that finished since it was started (with an `error` if it failed).
+    """
+
+    name: str = 'default'
+    path: str = ''
+    saved: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    skipped: dict[str, str] = field(default_factory=dict)
+    in_progress: bool = False
+    background_report: dict | None = None
+    observation: str = ObservationType.KERNEL_CHECKPOINT
+
+    @property
+    def message(self) -> str:
+        return f'Kernel checkpoint {self.name}'
+
+    def __str__(self) -> str:
+        return f'**KernelCheckpointObservation**\n{self.content}'
+
+
+@dataclass
+class KernelRestoreObservation(Observation):
+    """The result of a KernelRestoreAction; `failed` maps variables to the reason.
+
+    `background_report` is as in KernelCheckpointObservation: if it has an
+    `error`, the variables came from an older checkpoint.
+    """
+
+    name: str = 'default'
+    restored: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)
+    background_report: dict | None = None
+    observation: str = ObservationType.KERNEL_RESTORE
+
+    @property
+    def message(self) -> str:
+        return f'Kernel restore {self.name}'
+
+    def __str__(self) -> str:
+        return f'**KernelRestoreObservation**\n{self.content}'
@@ -0,0 +1,244 @@
+"""Recording the event stream to compressed, append-only trajectory logs.
+
+A `TrajectoryRecorder` subscribes to an `EventStream` and appends every event
+(the `event_to_dict` output, stamped with its id, timestamp, source and
+cause) as a JSON line to gzip-compressed segment files. Event ids restart
+with the server, so every run records into its own directory:
+
+    <root>/<run>/segment-000000000000.jsonl.gz   the events from id 0 on
+    <root>/<run>/segment-000000000000.idx        one "<id> <offset>" line per event
+
+The events written together are one gzip member, so a segment is a regular
+multi-member gzip file (``zcat`` reads it) that can also be decompressed
+starting at any member; the index maps each event id to the byte offset of
+its member. Once a segment exceeds `segment_bytes` the next batch starts a
+new one, named after its first event id; with `max_segments` the oldest
+segments are deleted.
+
+Writing (encoding, compression and file I/O) happens in a worker thread; the
+request path only puts the event into the recorder's subscription queue.
+When the writer falls behind, adding an event waits up to `put_timeout`
+seconds for room and then the event is dropped from the recording (counted
+in `stats()['dropped']`). A batch that fails to be written is counted in
+`stats()['write_errors']` and the writer goes on with a new segment; if the
+writer task ends anyway, it unsubscribes so that adding events never waits
+for it.
+
+This module only uses the standard library, so the replay tool can read
+trajectories without the server's dependencies.
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import time
+import zlib
+from typing import TYPE_CHECKING, Any, Iterator
+
+if TYPE_CHECKING:
+    from simple_openhands.events.stream import EventStream, Subscription
+
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_QUEUE_SIZE = 4096
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.jsonl.gz'
+INDEX_SUFFIX = '.idx'
+
+
+def _json_default(value: Any) -> Any:
+    # e.g. the pydantic metadata of CmdOutputObservation
+    if hasattr(value, 'model_dump'):
+        return value.model_dump()
+    return str(value)
+
+
+def encode_events(records: list[dict]) -> list[bytes]:
+    return [
+        (json.dumps(record, ensure_ascii=False, default=_json_default) + '\n').encode('utf-8')
+        for record in records
+    ]
+
+
+def segment_ids(directory: str) -> list[int]:
+    """First event ids of the segments in a run directory, in order."""
+    ids = []
+    for name in os.listdir(directory):
+        if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+            try:
+                ids.append(int(name[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)]))
+            except ValueError:
+                continue
+    return sorted(ids)
+
+
+def _segment_path(directory: str, first_id: int, suffix: str) -> str:
+    return os.path.join(directory, f'{SEGMENT_PREFIX}{first_id:012d}{suffix}')
+
+
+def find_run_directory(path: str) -> str:
+    """`path` if it holds segments, else its most recent run directory."""
+    if segment_ids(path):
+        return path
+    runs = sorted(
+        name for name in os.listdir(path) if os.path.isdir(os.path.join(path, name)) and segment_ids(os.path.join(path, name))
+    )
+    if not runs:
+        raise FileNotFoundError(f'No trajectory segments in {path}')
+    return os.path.join(path, runs[-1])
+
+
+def _member_offset(index_path: str, since_id: int) -> int:
+    """Offset of the gzip member holding the first event after `since_id` (0 without an index)."""
+    offset = 0
+    try:
+        with open(index_path) as f:
+            for line in f:
+                event_id, member_offset = line.split()
+                if int(event_id) > since_id:
+                    return int(member_offset)
+                offset = int(member_offset)
+    except (OSError, ValueError):
+        return 0
+    return offset
+
+
+def read_events(directory: str, since_id: int = -1) -> Iterator[dict]:
+    """The recorded events of a run with an id greater than `since_id`, in order.
+
+    An event cut off by a crash (at the end of a segment) is skipped.
+    """
+    first_ids = segment_ids(directory)
+    # Start at the last segment beginning at or before the first wanted id
+    start = 0
+    for i, first_id in enumerate(first_ids):
+        if first_id <= since_id + 1:
+            start = i
+    for first_id in first_ids[start:]:
+        offset = _member_offset(_segment_path(directory, first_id, INDEX_SUFFIX), since_id) if first_id <= since_id else 0
+        with open(_segment_path(directory, first_id, SEGMENT_SUFFIX), 'rb') as f:
+            f.seek(offset)
+            try:
+                with gzip.GzipFile(fileobj=f) as lines:
+                    for line in lines:
+                        if not line.endswith(b'\n'):
+                            break  # cut off mid-line
+                        record = json.loads(line)
+                        if record.get('id', -1) > since_id:
+                            yield record
+            except (EOFError, gzip.BadGzipFile, zlib.error):
+                continue
+
+
+class TrajectoryRecorder:
+    def __init__(
+        self,
+        root: str,
+        segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        max_segments: int = 0,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        put_timeout: float = 1.0,
+    ) -> None:
+        if segment_bytes < 1:
+            raise ValueError(f'Invalid segment size: {segment_bytes}. Must be >= 1.')
+        self.directory = os.path.join(root, f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}')
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.queue_size = queue_size
+        self.put_timeout = put_timeout
+        self.events = 0
+        self.segments = 0
+        self.bytes_written = 0
+        self.write_errors = 0
+        self._subscription: 'Subscription | None' = None
+        self._task: asyncio.Task | None = None
+        self._segment = None
+        self._index = None
+
+    @classmethod
+    def from_env(cls) -> 'TrajectoryRecorder | None':
+        """Recorder writing under TRAJECTORY_DIR (None if unset), rotating segments at
+        TRAJECTORY_SEGMENT_MB (default 64) and keeping at most TRAJECTORY_MAX_SEGMENTS (0: all)."""
+        root = os.environ.get('TRAJECTORY_DIR')
+        if not root:
+            return None
+        return cls(
+            root,
+            segment_bytes=int(float(os.environ.get('TRAJECTORY_SEGMENT_MB', 64)) * 1024 * 1024),
+            max_segments=int(os.environ.get('TRAJECTORY_MAX_SEGMENTS', 0)),
+        )
+
+    def start(self, stream: 'EventStream') -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._subscription = stream.subscribe(maxsize=self.queue_size, block=True, put_timeout=self.put_timeout)
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        try:
+            async for record in self._subscription:
+                batch = [record, *self._subscription.drain()]
+                try:
+                    await asyncio.to_thread(self._write, batch)
+                except Exception as e:
+                    self.write_errors += 1
+                    print(f'Warning: failed to record {len(batch)} events to {self.directory}: {type(e).__name__}: {e}')
+                    # Continue in a new segment rather than after a partial write
+                    try:
+                        self._close_segment()
+                    except Exception:
+                        self._segment = self._index = None
+        finally:
+            # A writer that is gone must not make add_event wait for queue room
+            self._subscription.close()
+
+    def _write(self, batch: list[dict]) -> None:
+        if self._segment is None:
+            self._open_segment(batch[0]['id'])
+        offset = self._segment.tell()
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: a gzip member
+        data = compressor.compress(b''.join(encode_events(batch))) + compressor.flush()
+        self._segment.write(data)
+        self._segment.flush()
+        self._index.write(''.join(f'{record["id"]} {offset}\n' for record in batch))
+        self._index.flush()
+        self.events += len(batch)
+        self.bytes_written += len(data)
+        if self._segment.tell() >= self.segment_bytes:
+            self._close_segment()
+
+    def _open_segment(self, first_id: int) -> None:
+        self._segment = open(_segment_path(self.directory, first_id, SEGMENT_SUFFIX), 'ab')
+        self._index = open(_segment_path(self.directory, first_id, INDEX_SUFFIX), 'a')
+        self.segments += 1
+        if self.max_segments > 0:
+            for old_id in segment_ids(self.directory)[: -self.max_segments]:
+                for suffix in (SEGMENT_SUFFIX, INDEX_SUFFIX):
+                    try:
+                        os.remove(_segment_path(self.directory, old_id, suffix))
+                    except OSError:
+                        pass
+
+    def _close_segment(self) -> None:
+        for f in (self._segment, self._index):
+            if f is not None:
+                f.close()
+        self._segment = self._index = None
+
+    async def stop(self) -> None:
+        """Stop recording after writing the events already queued."""
+        if self._subscription is not None:
+            self._subscription.close()
+        if self._task is not None:
+            await self._task
+        self._close_segment()
+
+    def stats(self) -> dict:
+        return {
+            'directory': self.directory,
+            'events': self.events,
+            'segments': self.segments,
+            'bytes_written': self.bytes_written,
+            'queued': self._subscription.stats()['queued'] if self._subscription is not None else 0,
+            'dropped': self._subscription.dropped if self._subscription is not None else 0,
+            'write_errors': self.write_errors,
+        }
@@ -8,22 +8,30 @@ from typing import Any, Dict
 
 from simple_openhands.events.action import (
     Action,
+    AgentSkillAction,
     CmdRunAction,
     FileEditAction,
     FileReadAction,
     FileWriteAction,
+    IPythonFanOutAction,
     IPythonRunCellAction,
+    KernelCheckpointAction,
+    KernelRestoreAction,
 )
 from simple_openhands.events.observation import (
+    AgentSkillObservation,
     CmdOutputObservation,
     ErrorObservation,
     FileEditObservation,
     FileReadObservation,
     FileWriteObservation,
+    IPythonFanOutObservation,
     IPythonRunCellObservation,
+    KernelCheckpointObservation,
+    KernelRestoreObservation,
     Observation,
 )
-from simple_openhands.events.event import Event
+from simple_openhands.events.event import Event, EventSource
 
 
 # Map action types to classes
@@ -33,6 +41,10 @@ ACTION_TYPE_TO_CLASS = {
     'write': FileWriteAction,
     'edit': FileEditAction,
     'run_ipython': IPythonRunCellAction,
+    'run_ipython_fanout': IPythonFanOutAction,
+    'kernel_checkpoint': KernelCheckpointAction,
+    'kernel_restore': KernelRestoreAction,
+    'agent_skill': AgentSkillAction,
 }
 
 # Map observation types to classes
@@ -42,9 +54,37 @@ OBSERVATION_TYPE_TO_CLASS = {
     'write': FileWriteObservation,
     'edit': FileEditObservation,
     'run_ipython': IPythonRunCellObservation,
+    'run_ipython_fanout': IPythonFanOutObservation,
     'error': ErrorObservation,
+    'kernel_checkpoint': KernelCheckpointObservation,
+    'kernel_restore': KernelRestoreObservation,
+    'agent_skill': AgentSkillObservation,
 }
 
+# Set by the event stream (see simple_openhands.events.stream)
+EVENT_METADATA_KEYS = ('id', 'timestamp', 'source', 'cause')
+
+
+def _event_metadata(event: Event) -> Dict[str, Any]:
+    if event.id == Event.INVALID_ID:
+        return {}
+    metadata: Dict[str, Any] = {'id': event.id, 'timestamp': event.timestamp}
+    if event.source is not None:
+        metadata['source'] = event.source.value
+    if event.cause is not None:
+        metadata['cause'] = event.cause
+    return metadata
+
+
+def _set_event_metadata(event: Event, data: Dict[str, Any]) -> Event:
+    if data.get('id') is not None:
+        event._id = data['id']  # type: ignore[attr-defined]
+        event._timestamp = data.get('timestamp')  # type: ignore[attr-defined]
+        if data.get('source') is not None:
+            event._source = EventSource(data['source']).value  # type: ignore[attr-defined]
+        event._cause = data.get('cause')  # type: ignore[attr-defined]
+    return event
+
 
 def event_to_dict(event: Event) -> Dict[str, Any]:
     """Convert an event to a dictionary following OpenHands format."""
@@ -58,14 +98,14 @@ def event_to_dict(event: Event) -> Dict[str, Any]:
         if 'action' in props:
             # Action 格式：{"action": "run", "args": {...}}
             action_type = props.pop('action')
-            result = {'action': action_type}
+            result = {**_event_metadata(event), 'action': action_type}
             if props:
                 result['args'] = props
             return result
         elif 'observation' in props:
             # Observation 格式：{"observation": "run", "content": "...", "extras": {...}}
             obs_type = props.pop('observation')
-            result = {'observation': obs_type}
+            result = {**_event_metadata(event), 'observation': obs_type}
             if 'content' in props:
                 result['content'] = props.pop('content')
             if props:
@@ -91,7 +131,7 @@ def event_from_dict(data: Dict[str, Any]) -> Event:
             # OpenHands 标准格式：参数在 args 字段中
             args = data.get('args', {})
             # 不传递 action 参数，依赖类的默认值（与 OpenHands 一致）
-            return cls(**args)
+            return _set_event_metadata(cls(**args), data)
         else:
             raise ValueError(f"Unknown action type: {action_type}")
     
@@ -102,7 +142,9 @@ def event_from_dict(data: Dict[str, Any]) -> Event:
             cls = OBSERVATION_TYPE_TO_CLASS[obs_type]
             obs_data = data.copy()
             obs_data.pop('observation', None)
-            return cls(observation=obs_type, **obs_data)
+            for key in EVENT_METADATA_KEYS:
+                obs_data.pop(key, None)
+            return _set_event_metadata(cls(observation=obs_type, **obs_data), data)
         else:
             raise ValueError(f"Unknown observation type: {obs_type}")
     
@@ -0,0 +1,186 @@
+"""In-memory stream of the actions and observations the server processes.
+
+`EventStream.add_event` stamps an event with the next id (ids are
+consecutive, starting at 0), the current time, its source and, for an
+observation, the id of the action that caused it. The serialized event is
+kept in a ring buffer of the last `max_events` events and pushed to every
+subscriber.
+
+A `Subscription` is an async iterator over the events added after it was
+created, optionally preceded by the buffered events after `since_id`.
+Its queue is bounded: by default an event that does not fit is dropped for
+that subscriber only (the gap shows up as missing ids, and the subscriber can
+fill it from `get_events` while the events are still buffered). With
+``block=True`` the event is instead delivered once there is room, so adding
+events waits for a slow subscriber, up to `put_timeout` seconds.
+"""
+
+import asyncio
+import itertools
+from collections import deque
+from datetime import datetime
+from typing import Any
+
+from simple_openhands.events.event import Event, EventSource
+from simple_openhands.events.serialization.event import event_to_dict
+
+DEFAULT_MAX_EVENTS = 1000
+DEFAULT_QUEUE_SIZE = 256
+
+
+class Subscription:
+    def __init__(
+        self,
+        stream: 'EventStream',
+        backlog: list[dict],
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        block: bool = False,
+        put_timeout: float = 5.0,
+    ) -> None:
+        self._stream = stream
+        self._backlog = deque(backlog)
+        self._queue: asyncio.Queue[dict | None] = asyncio.Queue(maxsize)
+        self.block = block
+        self.put_timeout = put_timeout
+        self.delivered = 0
+        self.dropped = 0
+        self.closed = False
+        self._waiting = 0
+
+    def _offer(self, record: dict) -> bool:
+        """Queue `record` if there is room; False if a blocking subscriber has to wait for it."""
+        if self.closed:
+            return True
+        # Behind events that are already waiting, to keep their order
+        if not self._waiting:
+            try:
+                self._queue.put_nowait(record)
+                return True
+            except asyncio.QueueFull:
+                pass
+        if not self.block:
+            self.dropped += 1
+            return True
+        return False
+
+    async def _wait_put(self, record: dict) -> None:
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._queue.put(record), self.put_timeout)
+        except asyncio.TimeoutError:
+            self.dropped += 1
+        finally:
+            self._waiting -= 1
+
+    def close(self) -> None:
+        """Stop receiving events; a pending iteration ends once the queue is drained."""
+        if self.closed:
+            return
+        self.closed = True
+        self._stream._unsubscribe(self)
+        try:
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass  # the reader sees `closed` when it gets to the end of the queue
+
+    def drain(self) -> list[dict]:
+        """The events already waiting for this subscriber, without waiting for more."""
+        records = list(self._backlog)
+        self._backlog.clear()
+        while True:
+            try:
+                record = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if record is not None:
+                records.append(record)
+        self.delivered += len(records)
+        return records
+
+    def __aiter__(self) -> 'Subscription':
+        return self
+
+    async def __anext__(self) -> dict:
+        if self._backlog:
+            record = self._backlog.popleft()
+        else:
+            if self.closed and self._queue.empty():
+                raise StopAsyncIteration
+            record = await self._queue.get()
+            if record is None:
+                raise StopAsyncIteration
+        self.delivered += 1
+        return record
+
+    def stats(self) -> dict:
+        return {
+            'queued': self._queue.qsize() + len(self._backlog),
+            'maxsize': self._queue.maxsize,
+            'block': self.block,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+        }
+
+
+class EventStream:
+    def __init__(self, max_events: int = DEFAULT_MAX_EVENTS) -> None:
+        if max_events < 1:
+            raise ValueError(f'Invalid event buffer size: {max_events}. Must be >= 1.')
+        self._ids = itertools.count()
+        self._events: deque[dict] = deque(maxlen=max_events)
+        self._subscriptions: list[Subscription] = []
+        self.next_id = 0
+
+    @property
+    def max_events(self) -> int:
+        return self._events.maxlen or 0
+
+    async def add_event(self, event: Event, source: EventSource, cause: int | None = None) -> dict:
+        """Stamp `event`, buffer it and deliver it to the subscribers; returns its dict."""
+        # Stamping and buffering do not await, so ids follow the buffer's order
+        event._id = next(self._ids)  # type: ignore[attr-defined]
+        event.timestamp = datetime.now()
+        event._source = source.value  # type: ignore[attr-defined]
+        event._cause = cause  # type: ignore[attr-defined]
+        self.next_id = event._id + 1  # type: ignore[attr-defined]
+        record = event_to_dict(event)
+        self._events.append(record)
+        waiting = [s for s in self._subscriptions if not s._offer(record)]
+        if waiting:
+            await asyncio.gather(*(s._wait_put(record) for s in waiting))
+        return record
+
+    def get_events(self, since_id: int = -1, limit: int | None = None) -> list[dict]:
+        """Buffered events with an id greater than `since_id`, oldest first."""
+        events = [record for record in self._events if record['id'] > since_id]
+        return events[:limit] if limit is not None else events
+
+    def subscribe(
+        self,
+        since_id: int | None = None,
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        block: bool = False,
+        put_timeout: float = 5.0,
+    ) -> Subscription:
+        """Subscribe to new events, preceded by the buffered ones after `since_id` if given."""
+        backlog = self.get_events(since_id) if since_id is not None else []
+        subscription = Subscription(self, backlog, maxsize=maxsize, block=block, put_timeout=put_timeout)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+
+    def close(self) -> None:
+        for subscription in list(self._subscriptions):
+            subscription.close()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            'next_id': self.next_id,
+            'buffered': len(self._events),
+            'max_events': self.max_events,
+            'oldest_id': self._events[0]['id'] if self._events else None,
+            'subscribers': [s.stats() for s in self._subscriptions],
+        }
@@ -4,22 +4,27 @@ Simple Docker Runtime - FastAPI Server
 使用完全移植的原始bash.py
 """
 
+import json
 import os
+import re
+import shutil
 import sys
 import asyncio
 import getpass
 import subprocess
 import traceback
 import time
+import uuid
 from contextlib import asynccontextmanager
 from typing import Optional, Dict
 
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
-from simple_openhands.models import ServerInfo
+from simple_openhands.models import ServerInfo, ServiceStartRequest, SessionForkRequest
 from pydantic import BaseModel
 # 根据平台选择合适的bash实现
 if sys.platform == 'win32':
@@ -32,18 +37,75 @@ if sys.platform == 'win32':
         BashSession = None
 else:
     from simple_openhands.bash import BashSession
-from simple_openhands.events.action import CmdRunAction, FileReadAction, FileWriteAction, FileEditAction, IPythonRunCellAction
-from simple_openhands.events.observation import CmdOutputObservation, FileReadObservation, FileWriteObservation, FileEditObservation, IPythonRunCellObservation
+from simple_openhands.events.action import AgentSkillAction, CmdRunAction, FileReadAction, FileWriteAction, FileEditAction, IPythonFanOutAction, IPythonRunCellAction, KernelCheckpointAction, KernelRestoreAction
+from simple_openhands.events.observation import CmdOutputObservation, ErrorObservation, FileReadObservation, FileWriteObservation, FileEditObservation, IPythonFanOutObservation, IPythonRunCellObservation
 from simple_openhands.utils.system_stats import get_system_stats
 from simple_openhands.utils.file.file_viewer import generate_file_viewer_html
+from simple_openhands.utils.file.snapshot import break_hardlink
 
-from simple_openhands.plugins import ALL_PLUGINS, JupyterPlugin, VSCodePlugin
+from simple_openhands.plugins import ALL_PLUGINS, AgentSkillsPlugin, JupyterPlugin, VSCodePlugin
+from simple_openhands.plugins.jupyter.execute_server import NO_OUTPUT_TEXT
+from simple_openhands.plugins.jupyter.fanout import check_item_name, fan_out, item_code, summarize
+from simple_openhands.plugins.jupyter.worker_pool import StatelessWorkerPool
 from simple_openhands.events.serialization import event_from_dict, event_to_dict
+from simple_openhands.events import EventSource
+from simple_openhands.events.recorder import TrajectoryRecorder
+from simple_openhands.events.stream import EventStream
+from simple_openhands.core import logger
+from simple_openhands.core.logger import LOG_ALL_EVENTS
 
 # 全局变量
 bash_session: Optional[BashSession] = None
+# 通过 /sessions/{id}/fork 派生的会话（默认会话仍为 bash_session）
+FORKED_SESSIONS: Dict[str, BashSession] = {}
 # 已初始化的插件实例注册表
 PLUGIN_INSTANCES: Dict[str, object] = {}
+# 无状态 Python 执行的预 fork 工作进程池（IPythonRunCellAction.stateless=True，首次使用时启动）
+STATELESS_POOL: Optional[StatelessWorkerPool] = None
+_stateless_pool_lock = asyncio.Lock()
+# 服务端事件流：为每个 action/observation 分配递增 id 和时间戳，observation 的 cause 指向触发它的 action
+EVENT_STREAM = EventStream(int(os.environ.get('EVENT_STREAM_MAX_EVENTS', 1000)))
+# 设置 TRAJECTORY_DIR 时把事件流写入压缩的轨迹日志（后台线程写入，可用 oh-replay 回放）
+TRAJECTORY_RECORDER: Optional[TrajectoryRecorder] = None
+
+def _bash_session_kwargs() -> dict:
+    """bash会话的可选参数（持久化模式：设置 BASH_SESSION_STATE_FILE 后，服务器重启会重新连接原tmux会话；
+    TMUX_SOCKET_LAYOUT 控制会话所在的tmux服务器）"""
+    kwargs = {}
+    state_file = os.environ.get('BASH_SESSION_STATE_FILE')
+    if state_file and sys.platform != 'win32':
+        kwargs['state_file'] = state_file
+    # tmux服务器布局：shared（默认）、per-session 或 sharded:N
+    socket_layout = os.environ.get('TMUX_SOCKET_LAYOUT')
+    if socket_layout and sys.platform != 'win32':
+        kwargs['tmux_socket_layout'] = socket_layout
+    # 命令历史记录的内存上限（压缩后字节数）
+    history_max_bytes = os.environ.get('COMMAND_HISTORY_MAX_BYTES')
+    if history_max_bytes and sys.platform != 'win32':
+        kwargs['history_max_bytes'] = int(history_max_bytes)
+    return kwargs
+
+
+def _setup_new_bash_session(work_dir: str) -> None:
+    """新建的bash会话的初始化设置：切换到工作目录并自动配置Git"""
+    # 强制将会话目录切换到工作目录，避免不一致
+    try:
+        bash_session.execute(CmdRunAction(command=f'cd {work_dir}', cwd=work_dir, is_static=True, hidden=True))
+    except Exception:
+        pass
+    # 自动初始化Git仓库并设置safe.directory，避免“dubious ownership”问题
+    try:
+        current_cwd = getattr(bash_session, 'cwd', work_dir)
+        # 配置基础git用户信息（幂等）
+        bash_session.execute(CmdRunAction(command='git config --global user.name "simple_openhands"', cwd=current_cwd, is_static=True, hidden=True))
+        bash_session.execute(CmdRunAction(command='git config --global user.email "simple_openhands@example.com"', cwd=current_cwd, is_static=True, hidden=True))
+        # 若非git仓库则初始化（幂等）
+        bash_session.execute(CmdRunAction(command='git rev-parse --is-inside-work-tree || git init', cwd=current_cwd, is_static=True, hidden=True))
+        # 设置safe.directory，避免挂载目录所有权不一致导致的报错（幂等，可重复添加）
+        bash_session.execute(CmdRunAction(command=f'git config --global --add safe.directory "{current_cwd}"', cwd=current_cwd, is_static=True, hidden=True))
+    except Exception as e:
+        print(f"Git auto-setup skipped: {e}")
+
 
 async def _init_jupyter_async(username: str, timeout_seconds: float = 60.0) -> None:
     """Initialize Jupyter plugin in background with timeout, without blocking app start."""
@@ -62,7 +124,7 @@ async def _init_jupyter_async(username: str, timeout_seconds: float = 60.0) -> N
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理 - 使用OpenHands的分散式平台检测模式"""
-    global bash_session
+    global bash_session, TRAJECTORY_RECORDER
 
     # 检查是否有可用的bash实现
     if BashSession is None:
@@ -86,29 +148,18 @@ async def lifespan(app: FastAPI):
         bash_session = BashSession(
             work_dir=work_dir, 
             username=username,
-            no_change_timeout_seconds=120  # 增加到120秒，支持长时间运行的编译命令
+            no_change_timeout_seconds=120,  # 增加到120秒，支持长时间运行的编译命令
+            **_bash_session_kwargs(),
         )
         # Windows PowerShell不需要initialize，Linux bash需要
         if hasattr(bash_session, 'initialize'):
             bash_session.initialize()
-        print(f"Bash session initialized in {work_dir} as user {username}")
-        # 强制将会话目录切换到工作目录，避免不一致
-        try:
-            bash_session.execute(CmdRunAction(command=f'cd {work_dir}', cwd=work_dir, is_static=True, hidden=True))
-        except Exception:
-            pass
-        # 自动初始化Git仓库并设置safe.directory，避免“dubious ownership”问题
-        try:
-            current_cwd = getattr(bash_session, 'cwd', work_dir)
-            # 配置基础git用户信息（幂等）
-            bash_session.execute(CmdRunAction(command='git config --global user.name "simple_openhands"', cwd=current_cwd, is_static=True, hidden=True))
-            bash_session.execute(CmdRunAction(command='git config --global user.email "simple_openhands@example.com"', cwd=current_cwd, is_static=True, hidden=True))
-            # 若非git仓库则初始化（幂等）
-            bash_session.execute(CmdRunAction(command='git rev-parse --is-inside-work-tree || git init', cwd=current_cwd, is_static=True, hidden=True))
-            # 设置safe.directory，避免挂载目录所有权不一致导致的报错（幂等，可重复添加）
-            bash_session.execute(CmdRunAction(command=f'git config --global --add safe.directory "{current_cwd}"', cwd=current_cwd, is_static=True, hidden=True))
-        except Exception as e:
-            print(f"Git auto-setup skipped: {e}")
+        if getattr(bash_session, 'reattached', False):
+            # 重新连接到已有会话：保留其cwd、环境变量和正在运行的命令，跳过初始化设置
+            print(f"Bash session reattached (cwd: {bash_session.cwd})")
+        else:
+            print(f"Bash session initialized in {work_dir} as user {username}")
+            _setup_new_bash_session(work_dir)
     except Exception as e:
         print(f"Failed to initialize bash session: {e}")
         bash_session = None
@@ -124,11 +175,36 @@ async def lifespan(app: FastAPI):
         # AgentSkills插件无需初始化，函数立即可用
         print("AgentSkills plugin functions are always available (no initialization needed)")
 
+    TRAJECTORY_RECORDER = TrajectoryRecorder.from_env()
+    if TRAJECTORY_RECORDER is not None:
+        TRAJECTORY_RECORDER.start(EVENT_STREAM)
+        print(f"Recording trajectory to {TRAJECTORY_RECORDER.directory}")
+
+    # LOG_ALL_EVENTS=true 时把事件流中的每个事件写入日志
+    event_logger = asyncio.create_task(_log_events()) if LOG_ALL_EVENTS else None
+
     yield
 
-    # 关闭时清理
+    if event_logger is not None:
+        event_logger.cancel()
+    if TRAJECTORY_RECORDER is not None:
+        await TRAJECTORY_RECORDER.stop()
+    EVENT_STREAM.close()
+
+    # 关闭时清理（持久化模式下只断开连接，保留tmux会话供重启后重新连接）
+    for forked in FORKED_SESSIONS.values():
+        forked.close()
+    FORKED_SESSIONS.clear()
+    jupyter_plugin = PLUGIN_INSTANCES.get("jupyter")
+    if isinstance(jupyter_plugin, JupyterPlugin):
+        await jupyter_plugin.shutdown()
+    if STATELESS_POOL is not None:
+        await STATELESS_POOL.shutdown()
     if bash_session:
-        bash_session.close()
+        if getattr(bash_session, 'state_file', None):
+            bash_session.detach()
+        else:
+            bash_session.close()
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -218,9 +294,15 @@ async def get_system_stats_api():
     """
     try:
         stats = get_system_stats()
+        # Jupyter 内核的当前资源占用及每个单元格的资源历史
+        jupyter_plugin = PLUGIN_INSTANCES.get("jupyter")
+        kernel_resources = None
+        if isinstance(jupyter_plugin, JupyterPlugin) and hasattr(jupyter_plugin, "resource_limits"):
+            kernel_resources = jupyter_plugin.resource_stats()
         return {
             "status": "success",
             "system_stats": stats,
+            "kernel_resources": kernel_resources,
             "timestamp": time.time()
         }
     except Exception as e:
@@ -251,7 +333,8 @@ async def reset_session():
         bash_session = BashSession(
             work_dir=work_dir, 
             username=username,
-            no_change_timeout_seconds=120  # 增加到120秒，支持长时间运行的编译命令
+            no_change_timeout_seconds=120,  # 增加到120秒，支持长时间运行的编译命令
+            **_bash_session_kwargs(),
         )
         # Windows PowerShell不需要initialize，Linux bash需要
         if hasattr(bash_session, 'initialize'):
@@ -266,6 +349,247 @@ async def reset_session():
 
 
 
+def _get_service_manager():
+    """获取当前bash session拥有的后台服务管理器"""
+    if not bash_session or not getattr(bash_session, '_initialized', False):
+        raise HTTPException(status_code=503, detail="Bash session not available. Please check server status.")
+    services = getattr(bash_session, 'services', None)
+    if services is None:
+        raise HTTPException(status_code=400, detail="Managed services are not supported by this bash session")
+    return services
+
+
+@app.get("/services")
+async def list_services():
+    """列出当前会话管理的后台服务"""
+    services = _get_service_manager()
+    return {"services": await asyncio.to_thread(services.list_services)}
+
+
+@app.post("/services")
+async def start_service(request: ServiceStartRequest):
+    """启动一个命名的后台服务（独立日志文件，可按端口或正则检测就绪）
+
+    代替在bash会话中使用 `&` / `nohup`，避免服务输出与后续命令输出交错
+    """
+    services = _get_service_manager()
+    try:
+        return await asyncio.to_thread(
+            services.start,
+            name=request.name,
+            command=request.command,
+            cwd=request.cwd or bash_session.cwd,
+            env=request.env,
+            ready_port=request.ready_port,
+            ready_pattern=request.ready_pattern,
+            ready_timeout=request.ready_timeout,
+        )
+    except (ValueError, re.error) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/services/ports")
+async def list_listening_ports():
+    """列出正在监听的TCP端口，并标注所属服务"""
+    services = _get_service_manager()
+    return {"ports": await asyncio.to_thread(services.listening_ports)}
+
+
+@app.get("/services/{name}")
+async def get_service(name: str):
+    """获取指定服务的状态"""
+    services = _get_service_manager()
+    try:
+        return await asyncio.to_thread(services.status, name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get("/services/{name}/logs")
+async def get_service_logs(name: str, tail: int = 100):
+    """获取指定服务日志的最后若干行"""
+    services = _get_service_manager()
+    try:
+        return {"name": name, "logs": await asyncio.to_thread(services.logs, name, tail)}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.post("/services/{name}/restart")
+async def restart_service(name: str, ready_timeout: float = 30.0):
+    """重启指定服务"""
+    services = _get_service_manager()
+    try:
+        return await asyncio.to_thread(services.restart, name, ready_timeout)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.post("/services/{name}/stop")
+async def stop_service(name: str):
+    """停止指定服务（终止整个进程组）"""
+    services = _get_service_manager()
+    try:
+        return await asyncio.to_thread(services.stop, name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+def _get_work_dir() -> str:
+    """根据平台获取默认工作目录"""
+    if sys.platform == 'win32':
+        return os.environ.get('WORK_DIR', 'C\\simple_openhands\\workspace')
+    return os.environ.get('WORK_DIR', '/simple_openhands/workspace')
+
+
+def _resolve_bash_session(session_id: Optional[str]):
+    """根据session_id获取bash会话：None或'default'为默认会话，其余为派生会话"""
+    if session_id in (None, '', 'default'):
+        return bash_session
+    session = FORKED_SESSIONS.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Session '{session_id}' not found")
+    return session
+
+
+@app.get("/sessions")
+async def list_sessions():
+    """列出默认会话和所有派生会话"""
+    sessions = []
+    for session_id, session in [('default', bash_session), *FORKED_SESSIONS.items()]:
+        if session is None:
+            continue
+        sessions.append({
+            "session_id": session_id,
+            "work_dir": session.work_dir,
+            "cwd": session.cwd if getattr(session, '_initialized', False) else None,
+            "fork_info": getattr(session, 'fork_info', None),
+            "output_stats": session.output_stats.to_dict() if hasattr(session, 'output_stats') else None,
+        })
+    return {"sessions": sessions}
+
+
+@app.post("/sessions/{session_id}/fork")
+async def fork_session(session_id: str, request: SessionForkRequest):
+    """派生会话：新会话继承cwd和导出的环境变量，并对工作区做低成本快照（reflink/硬链接）
+
+    用于并行尝试多个修复方案，最后保留效果最好的会话
+    """
+    parent = _resolve_bash_session(session_id)
+    if parent is None or not hasattr(parent, 'fork'):
+        raise HTTPException(status_code=400, detail="Session fork is not supported by this bash session")
+
+    fork_id = request.fork_id or uuid.uuid4().hex[:8]
+    if not re.match(r'^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$', fork_id) or fork_id == 'default':
+        raise HTTPException(status_code=400, detail=f"Invalid fork id: {fork_id!r}")
+    if fork_id in FORKED_SESSIONS:
+        raise HTTPException(status_code=409, detail=f"Session '{fork_id}' already exists")
+
+    work_dir = request.work_dir
+    if work_dir is None and request.snapshot_mode is not None:
+        fork_root = os.environ.get('FORK_ROOT') or f"{_get_work_dir().rstrip(os.sep)}-forks"
+        work_dir = os.path.join(fork_root, fork_id)
+    try:
+        child = await asyncio.to_thread(
+            parent.fork, work_dir=work_dir, snapshot_mode=request.snapshot_mode
+        )
+    except (ValueError, OSError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    FORKED_SESSIONS[fork_id] = child
+    return {
+        "session_id": fork_id,
+        "work_dir": child.work_dir,
+        "cwd": child.cwd,
+        "fork_info": child.fork_info,
+    }
+
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str, remove_workspace: bool = False):
+    """关闭派生会话，可选删除其工作区快照"""
+    if session_id == 'default':
+        raise HTTPException(status_code=400, detail="The default session cannot be deleted, use /reset instead")
+    session = FORKED_SESSIONS.pop(session_id, None)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Session '{session_id}' not found")
+    session.close()
+    # 回收该会话的 Jupyter 内核，池会在后台补充新的内核
+    plugin = PLUGIN_INSTANCES.get("jupyter")
+    if isinstance(plugin, JupyterPlugin):
+        await plugin.release_session(session_id)
+    removed = False
+    fork_info = getattr(session, 'fork_info', None) or {}
+    if remove_workspace and fork_info.get('snapshot_mode'):
+        await asyncio.to_thread(shutil.rmtree, session.work_dir, True)
+        removed = True
+    return {"session_id": session_id, "closed": True, "workspace_removed": removed}
+
+
+def _get_command_history(session_id: str):
+    """获取会话的命令历史记录"""
+    session = _resolve_bash_session(session_id)
+    if session is None or not hasattr(session, 'history'):
+        raise HTTPException(status_code=503, detail="Command history is not available")
+    return session.history
+
+
+@app.get("/sessions/{session_id}/history")
+async def get_command_history(
+    session_id: str,
+    limit: int = 20,
+    exit_code: Optional[int] = None,
+    failed: Optional[bool] = None,
+    command: Optional[str] = None,
+    grep: Optional[str] = None,
+    ignore_case: bool = False,
+    include_output: bool = False,
+):
+    """查询命令历史：最近N条、按退出码/命令过滤，或用 grep 在历史输出中搜索（最新的在前）"""
+    history = _get_command_history(session_id)
+    try:
+        if grep:
+            records = await asyncio.to_thread(
+                history.grep, grep, limit=limit, ignore_case=ignore_case
+            )
+        else:
+            records = [
+                record.to_dict(include_output=include_output)
+                for record in history.query(
+                    limit=limit, exit_code=exit_code, failed=failed, command=command
+                )
+            ]
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid regular expression: {e}")
+    return {"records": records, "stats": history.stats()}
+
+
+@app.get("/sessions/{session_id}/history/{record_id}")
+async def get_command_history_record(session_id: str, record_id: int):
+    """获取单条历史命令及其完整输出"""
+    history = _get_command_history(session_id)
+    try:
+        return history.get(record_id).to_dict(include_output=True)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"History record {record_id} not found (it may have been evicted)")
+
+
+@app.get("/sessions/{session_id}/namespace")
+async def inspect_session_namespace(session_id: str, limit: int = 50):
+    """查看会话 Jupyter 内核中各变量的类型、形状和近似内存占用（按大小排序，静默执行，不影响命名空间）"""
+    plugin = PLUGIN_INSTANCES.get("jupyter")
+    report = None
+    if isinstance(plugin, JupyterPlugin):
+        try:
+            report = await plugin.inspect_namespace(session_id or 'default')
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="Kernel is busy, try again after the running cell finishes")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to inspect namespace: {e}")
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} has no Jupyter kernel")
+    return {**report, "variables": report["variables"][:limit] if limit > 0 else report["variables"]}
+
+
 # 移除独立的文件操作API端点，统一通过 /execute_action 处理
 # 参考 OpenHands 的架构设计
 
@@ -291,6 +615,30 @@ async def view_file(path: str):
         raise HTTPException(status_code=500, detail=f"Error viewing file: {str(e)}")
 
 
+@app.get("/images/{filename}")
+async def get_image(filename: str, request: Request):
+    """获取 Jupyter 单元格生成的图片（内容寻址，内容不变，可长期缓存）"""
+    plugin = PLUGIN_INSTANCES.get("jupyter")
+    if not isinstance(plugin, JupyterPlugin) or not hasattr(plugin, 'image_store'):
+        raise HTTPException(status_code=503, detail="Jupyter plugin is not initialized")
+    digest, _, extension = filename.partition('.')
+    try:
+        if extension != 'png':
+            raise ValueError(f"Unsupported image type: {extension}")
+        path = plugin.image_store.path(digest)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "ETag": f'"{digest}"',
+    }
+    if request.headers.get("if-none-match") == f'"{digest}"':
+        return Response(status_code=304, headers=headers)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(path, media_type="image/png", headers=headers)
+
+
 @app.get("/vscode/connection_token")
 async def get_vscode_connection_token():
     """获取VSCode连接令牌
@@ -379,7 +727,7 @@ async def get_plugins():
         elif name == "agent_skills":
             # AgentSkills无需初始化
             status = "always_available"
-            note = "Function collection, no initialization needed"
+            note = "Function collection, no initialization needed; also callable via the agent_skill action"
         else:
             # 其他插件需要手动初始化
             status = "initialized" if name in PLUGIN_INSTANCES else "not_initialized"
@@ -391,6 +739,27 @@ async def get_plugins():
             "status": status,
             "note": note
         }
+        if name == "jupyter":
+            plugin_status[name]["backend"] = getattr(
+                PLUGIN_INSTANCES.get(name), "backend", os.environ.get("JUPYTER_BACKEND", "gateway")
+            )
+            if isinstance(PLUGIN_INSTANCES.get(name), JupyterPlugin):
+                jupyter_plugin = PLUGIN_INSTANCES[name]
+                # 网关 HTTP API 就绪耗时，以及初始化到首个单元格执行完成的总耗时
+                plugin_status[name]["gateway_ready_seconds"] = jupyter_plugin.gateway_ready_seconds
+                plugin_status[name]["ready_seconds"] = jupyter_plugin.ready_seconds
+                plugin_status[name]["kernel_pool"] = jupyter_plugin.pool_stats()
+                # fork 模式下的模板进程状态（fork 次数、平均 fork 耗时）
+                zygote = getattr(jupyter_plugin, "zygote", None)
+                plugin_status[name]["kernel_zygote"] = zygote.stats() if zygote else None
+                # 输出截断统计：被截断的单元格数、丢弃的字节数和图片数
+                plugin_status[name]["output_stats"] = getattr(jupyter_plugin, "output_stats", None)
+                plugin_status[name]["restart_stats"] = getattr(jupyter_plugin, "restart_stats", None)
+                plugin_status[name]["image_mode"] = getattr(jupyter_plugin, "image_mode", None)
+                image_store = getattr(jupyter_plugin, "image_store", None)
+                plugin_status[name]["image_store"] = image_store.stats() if image_store else None
+            # 无状态执行工作进程池：大小、运行中任务数、平均分派耗时
+            plugin_status[name]["stateless_pool"] = STATELESS_POOL.stats() if STATELESS_POOL else None
     
     return {
         "available_plugins": list(ALL_PLUGINS.keys()),
@@ -426,7 +795,7 @@ async def initialize_plugin(plugin_name: str, username: str = "simple_openhands"
     if plugin_name == "agent_skills":
         raise HTTPException(
             status_code=400, 
-            detail="AgentSkills plugin is a function collection, no initialization needed. Functions can be called directly in Python code."
+            detail="AgentSkills plugin is a function collection, no initialization needed. Functions can be called directly in Python code or through the agent_skill action."
         )
     
     try:
@@ -450,8 +819,187 @@ async def initialize_plugin(plugin_name: str, username: str = "simple_openhands"
 
 class ActionRequest(BaseModel):
     action: dict
+    # 目标会话，默认为主会话；派生会话使用 /sessions/{id}/fork 返回的 session_id
+    session_id: Optional[str] = None
+
+
 
 
+async def _get_jupyter_plugin() -> JupyterPlugin:
+    """获取 Jupyter 插件实例，未初始化时自动初始化"""
+    plugin = PLUGIN_INSTANCES.get("jupyter")
+    if plugin is None or not isinstance(plugin, JupyterPlugin):
+        # 如果Jupyter未初始化，自动初始化
+        try:
+            print("Auto-initializing Jupyter plugin...")
+            jupyter_plugin = JupyterPlugin()
+            await jupyter_plugin.initialize("simple_openhands")
+            PLUGIN_INSTANCES["jupyter"] = jupyter_plugin
+            plugin = jupyter_plugin
+            print("Jupyter plugin auto-initialized successfully")
+        except Exception as e:
+            print(f"Failed to auto-initialize Jupyter plugin: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to auto-initialize Jupyter: {str(e)}")
+    return plugin
+
+
+def _get_agent_skills_plugin() -> AgentSkillsPlugin:
+    """获取 AgentSkills 插件实例（无需初始化，首次使用时创建）"""
+    plugin = PLUGIN_INSTANCES.get("agent_skills")
+    if not isinstance(plugin, AgentSkillsPlugin):
+        plugin = AgentSkillsPlugin()
+        PLUGIN_INSTANCES["agent_skills"] = plugin
+    return plugin
+
+
+async def _get_stateless_pool() -> StatelessWorkerPool:
+    """获取无状态执行工作进程池，未启动时自动启动"""
+    global STATELESS_POOL
+    async with _stateless_pool_lock:
+        if STATELESS_POOL is None:
+            pool = StatelessWorkerPool.from_env(cwd=bash_session.cwd if bash_session else None)
+            try:
+                await pool.start()
+            except Exception as e:
+                await pool.shutdown()
+                raise HTTPException(status_code=500, detail=f"Failed to start Python worker pool: {str(e)}")
+            STATELESS_POOL = pool
+    return STATELESS_POOL
+
+
+async def _stateless_outputs(result: dict, image_mode: str | None = None) -> tuple[str, list[str]]:
+    """工作进程结果的文本和图片，与内核执行的格式一致：无输出时返回相同提示，图片写入 Jupyter 插件的图片存储"""
+    output = result['output']
+    if not output and result['status'] == 'ok':
+        output = NO_OUTPUT_TEXT
+    images = result['images']
+    if images:
+        plugin = await _get_jupyter_plugin()
+        images = plugin.store_images(images, image_mode)
+    return output, images
+
+
+async def _run_stateless(action: IPythonRunCellAction, session) -> IPythonRunCellObservation:
+    """在预 fork 的工作进程中执行无状态 Python 代码（每次使用全新进程，不经过 Jupyter 内核）"""
+    if action.image_mode and action.image_mode not in JupyterPlugin.IMAGE_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid image_mode: {action.image_mode}. Expected one of {JupyterPlugin.IMAGE_MODES}.")
+    pool = await _get_stateless_pool()
+    result = await pool.run(action.code, timeout=action.timeout, cwd=session.cwd if session else None)
+    output, images = await _stateless_outputs(result, action.image_mode)
+    return IPythonRunCellObservation(
+        content=output,
+        code=action.code,
+        image_urls=images or None,
+        resources={
+            key: result[key] for key in ('duration_seconds', 'cpu_seconds', 'rss_peak') if key in result
+        },
+    )
+
+
+async def _fan_out_stateless(action: IPythonFanOutAction, session) -> IPythonFanOutObservation:
+    """在无状态工作进程池中并行执行扇出动作（每个输入使用全新进程，setup_code 在每次执行前运行）"""
+    check_item_name(action.item_name)
+    start_time = time.monotonic()
+    pool = await _get_stateless_pool()
+    parallelism = min(action.max_parallel or pool.size, len(action.inputs))
+    prefix = f'{action.setup_code}\n' if action.setup_code else ''
+
+    async def run_item(lane, index, item) -> dict:
+        result = await pool.run(
+            prefix + item_code(action.code, item, action.item_name),
+            timeout=action.timeout,
+            cwd=session.cwd if session else None,
+        )
+        output, images = await _stateless_outputs(result)
+        return {'status': result['status'], 'output': output, 'image_urls': images}
+
+    results = await fan_out(action.inputs, run_item, list(range(parallelism))) if action.inputs else []
+    return IPythonFanOutObservation(
+        content=summarize(results, parallelism, 'workers', time.monotonic() - start_time),
+        code=action.code,
+        results=results,
+    )
+
+
+def _use_stateless_pool(action) -> bool:
+    # 工作进程池依赖 fork 和 Unix 套接字，Windows 上仍在内核中执行
+    return isinstance(action, (IPythonRunCellAction, IPythonFanOutAction)) and action.stateless and sys.platform != 'win32'
+
+
+async def _observe(action, observation) -> dict:
+    """把观察结果加入事件流（cause 为触发它的 action 的 id），返回序列化结果"""
+    return await EVENT_STREAM.add_event(observation, EventSource.ENVIRONMENT, cause=action.id)
+
+
+async def _log_events() -> None:
+    subscription = EVENT_STREAM.subscribe()
+    try:
+        async for record in subscription:
+            msg_type = 'ACTION' if 'action' in record else 'OBSERVATION'
+            logger.info(json.dumps(jsonable_encoder(record), ensure_ascii=False), extra={'msg_type': msg_type})
+    finally:
+        subscription.close()
+
+
+@app.get("/events")
+async def get_events(since_id: int = -1, limit: int = 100):
+    """获取事件流缓冲区中 id 大于 since_id 的事件（按 id 升序），可用于订阅断线或丢事件后补齐"""
+    return {
+        "events": EVENT_STREAM.get_events(since_id, limit),
+        **EVENT_STREAM.stats(),
+        "recorder": TRAJECTORY_RECORDER.stats() if TRAJECTORY_RECORDER is not None else None,
+    }
+
+
+@app.websocket("/events/ws")
+async def events_websocket(websocket: WebSocket, since_id: Optional[int] = None):
+    """通过 WebSocket 实时推送事件流；指定 since_id 时先推送缓冲区中更新的事件。
+    客户端跟不上时超出队列的事件会被丢弃，表现为 id 不连续，可通过 /events 补齐"""
+    await websocket.accept()
+    subscription = EVENT_STREAM.subscribe(since_id=since_id)
+
+    async def forward() -> None:
+        async for record in subscription:
+            await websocket.send_json(jsonable_encoder(record))
+        await websocket.close()
+
+    sender = asyncio.create_task(forward())
+    try:
+        # 客户端无需发送消息，这里只用于感知断开
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        subscription.close()
+
+
+@app.post("/execute_action/stream")
+async def execute_action_stream(action_request: ActionRequest):
+    """流式执行 Python 代码（NDJSON）：每条输出消息到达时立即返回一行，最后一行为完整的观察结果"""
+    try:
+        action = event_from_dict(action_request.action)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid action: {str(e)}")
+    if not isinstance(action, IPythonRunCellAction):
+        raise HTTPException(status_code=400, detail="Streaming is only supported for IPythonRunCellAction")
+    session = _resolve_bash_session(action_request.session_id)
+    await EVENT_STREAM.add_event(action, EventSource.AGENT)
+    if _use_stateless_pool(action):
+        # 无状态执行没有增量输出，只返回最终观察结果
+        observation = await _run_stateless(action, session)
+        line = json.dumps({'type': 'observation', **await _observe(action, observation)}, ensure_ascii=False) + '\n'
+        return StreamingResponse(iter([line]), media_type="application/x-ndjson")
+    plugin = await _get_jupyter_plugin()
+
+    async def events():
+        async for event in plugin.run_stream(action, session_id=action_request.session_id or 'default'):
+            if event['type'] == 'observation':
+                event = {'type': 'observation', **await _observe(action, event['observation'])}
+            yield json.dumps(event, ensure_ascii=False) + '\n'
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
 
 
 @app.post("/execute_action")
@@ -479,35 +1027,51 @@ async def execute_action(action_request: ActionRequest):
             detail="Bash session not ready. Please check server status."
         )
 
+    session = _resolve_bash_session(action_request.session_id)
+
+    action = None
     try:
         # 从字典创建 Action 对象 - 直接传递 action_request.action
         action = event_from_dict(action_request.action)
+        await EVENT_STREAM.add_event(action, EventSource.AGENT)
         
         # 根据 Action 类型执行相应的操作
         if isinstance(action, CmdRunAction):
             # 执行 bash 命令
-            observation = bash_session.execute(action)
-            return event_to_dict(observation)
+            observation = session.execute(action)
+            return await _observe(action, observation)
             
+        elif isinstance(action, AgentSkillAction):
+            # 直接在服务进程中调用 agentskills 函数，不经过 Jupyter 内核
+            plugin = _get_agent_skills_plugin()
+            observation = await plugin.run(
+                action,
+                session_id=action_request.session_id or 'default',
+                cwd=session.cwd if session else None,
+            )
+            return await _observe(action, observation)
+
+        elif isinstance(action, IPythonFanOutAction):
+            # 并行扇出：同一段代码对每个输入各执行一次，结果按输入顺序返回
+            if _use_stateless_pool(action):
+                observation = await _fan_out_stateless(action, session)
+            else:
+                plugin = await _get_jupyter_plugin()
+                observation = await plugin.fan_out(action)
+            return await _observe(action, observation)
+
+        elif _use_stateless_pool(action):
+            observation = await _run_stateless(action, session)
+            return await _observe(action, observation)
+
         elif isinstance(action, IPythonRunCellAction):
             # 执行 Python 代码 - Jupyter自动可用
-            plugin = PLUGIN_INSTANCES.get("jupyter")
-            if plugin is None or not isinstance(plugin, JupyterPlugin):
-                # 如果Jupyter未初始化，自动初始化
-                try:
-                    print("Auto-initializing Jupyter plugin...")
-                    jupyter_plugin = JupyterPlugin()
-                    await jupyter_plugin.initialize("simple_openhands")
-                    PLUGIN_INSTANCES["jupyter"] = jupyter_plugin
-                    plugin = jupyter_plugin
-                    print("Jupyter plugin auto-initialized successfully")
-                except Exception as e:
-                    print(f"Failed to auto-initialize Jupyter plugin: {e}")
-                    raise HTTPException(status_code=500, detail=f"Failed to auto-initialize Jupyter: {str(e)}")
+            plugin = await _get_jupyter_plugin()
             
             try:
-                observation = await plugin.run(action)
-                return event_to_dict(observation)
+                # 每个会话使用独立的内核（从预热池中分配）
+                observation = await plugin.run(action, session_id=action_request.session_id or 'default')
+                return await _observe(action, observation)
             except Exception as e:
                 print(f"Error executing Python code: {e}")
                 # 返回错误观察结果
@@ -516,27 +1080,42 @@ async def execute_action(action_request: ActionRequest):
                     code=action.code,
                     image_urls=None,
                 )
-                return event_to_dict(error_obs)
+                return await _observe(action, error_obs)
+
+        elif isinstance(action, (KernelCheckpointAction, KernelRestoreAction)):
+            # 内核变量检查点：保存到磁盘 / 恢复到（新的）内核
+            plugin = await _get_jupyter_plugin()
+            session_id = action_request.session_id or 'default'
+            try:
+                if isinstance(action, KernelCheckpointAction):
+                    observation = await plugin.checkpoint(action, session_id=session_id)
+                else:
+                    observation = await plugin.restore(action, session_id=session_id)
+            except Exception as e:
+                observation = ErrorObservation(content=str(e))
+            return await _observe(action, observation)
             
         elif isinstance(action, FileReadAction):
             # 读取文件
-            observation = await read_file_action(action)
-            return event_to_dict(observation)
+            observation = await read_file_action(action, session)
+            return await _observe(action, observation)
             
         elif isinstance(action, FileWriteAction):
             # 写入文件
-            observation = await write_file_action(action)
-            return event_to_dict(observation)
+            observation = await write_file_action(action, session)
+            return await _observe(action, observation)
             
         elif isinstance(action, FileEditAction):
             # 编辑文件
-            observation = await edit_file_action(action)
-            return event_to_dict(observation)
+            observation = await edit_file_action(action, session)
+            return await _observe(action, observation)
             
         else:
             raise HTTPException(status_code=400, detail=f"Unsupported action type: {type(action).__name__}")
             
     except Exception as e:
+        if action is not None:
+            await _observe(action, ErrorObservation(content=str(e)))
         return JSONResponse(
             status_code=500,
             content={
@@ -545,12 +1124,13 @@ async def execute_action(action_request: ActionRequest):
             }
         )
 
-async def read_file_action(action: FileReadAction) -> FileReadObservation:
+async def read_file_action(action: FileReadAction, session=None) -> FileReadObservation:
     """读取文件内容"""
-    if not bash_session:
+    session = session or bash_session
+    if not session:
         raise HTTPException(status_code=503, detail="Bash session not available")
     
-    working_dir = bash_session.cwd
+    working_dir = session.cwd
     filepath = action.path if os.path.isabs(action.path) else os.path.join(working_dir, action.path)
     
     try:
@@ -581,19 +1161,21 @@ async def read_file_action(action: FileReadAction) -> FileReadObservation:
             path=filepath
         )
 
-async def write_file_action(action: FileWriteAction) -> FileWriteObservation:
+async def write_file_action(action: FileWriteAction, session=None) -> FileWriteObservation:
     """写入文件内容"""
-    if not bash_session:
+    session = session or bash_session
+    if not session:
         raise HTTPException(status_code=503, detail="Bash session not available")
     
-    working_dir = bash_session.cwd
+    working_dir = session.cwd
     filepath = action.path if os.path.isabs(action.path) else os.path.join(working_dir, action.path)
     
     try:
         # 确保目录存在
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
         
-        # 写入文件
+        # 写入文件（硬链接快照中的文件先复制一份，避免同时修改另一个工作区）
+        break_hardlink(filepath)
         with open(filepath, 'w', encoding='utf-8') as file:
             file.write(action.content)
             
@@ -608,12 +1190,13 @@ async def write_file_action(action: FileWriteAction) -> FileWriteObservation:
             path=filepath
         )
 
-async def edit_file_action(action: FileEditAction) -> FileEditObservation:
+async def edit_file_action(action: FileEditAction, session=None) -> FileEditObservation:
     """编辑文件内容"""
-    if not bash_session:
+    session = session or bash_session
+    if not session:
         raise HTTPException(status_code=503, detail="Bash session not available")
     
-    working_dir = bash_session.cwd
+    working_dir = session.cwd
     filepath = action.path if os.path.isabs(action.path) else os.path.join(working_dir, action.path)
     
     try:
@@ -634,6 +1217,7 @@ async def edit_file_action(action: FileEditAction) -> FileEditObservation:
             new_content = old_content
         
         # 写入新内容
+        break_hardlink(filepath)
         with open(filepath, 'w', encoding='utf-8') as file:
             file.write(new_content)
             
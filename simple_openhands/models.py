@@ -6,4 +6,20 @@ class ServerInfo(BaseModel):
     version: str
     cwd: str
     username: Optional[str] = None
-    resources: Optional[Dict[str, Any]] = None
\ No newline at end of file
+    resources: Optional[Dict[str, Any]] = None
+
+class ServiceStartRequest(BaseModel):
+    name: str
+    command: str
+    cwd: Optional[str] = None
+    env: Optional[Dict[str, str]] = None
+    ready_port: Optional[int] = None
+    ready_pattern: Optional[str] = None
+    ready_timeout: float = 30.0
+
+
+class SessionForkRequest(BaseModel):
+    fork_id: Optional[str] = None
+    # auto / reflink / hardlink / copy; None 表示与父会话共享工作区
+    snapshot_mode: Optional[str] = 'auto'
+    work_dir: Optional[str] = None
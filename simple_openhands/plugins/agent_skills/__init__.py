@@ -1,11 +1,14 @@
+import asyncio
+import time
 from dataclasses import dataclass
 
 from simple_openhands.events.event import Event
-from simple_openhands.events.action import Action
-from simple_openhands.events.observation import Observation
+from simple_openhands.events.action import Action, AgentSkillAction
+from simple_openhands.events.observation import AgentSkillObservation, ErrorObservation, Observation
 from . import agentskills
 from ..requirement import Plugin, PluginRequirement
 from .agentskills import *
+from .runner import SkillState, bind_arguments, call_skill, get_skill, install_capture
 
 
 @dataclass
@@ -16,11 +19,42 @@ class AgentSkillsRequirement(PluginRequirement):
 
 class AgentSkillsPlugin(Plugin):
     name: str = 'agent_skills'
+    # Session that calls without a session id use
+    DEFAULT_SESSION = 'default'
+
+    def __init__(self) -> None:
+        self.state = SkillState()
 
     async def initialize(self, username: str) -> None:
         """Initialize the plugin."""
         pass
 
-    async def run(self, action: Action) -> Observation:
-        """Run the plugin for a given action."""
-        raise NotImplementedError('AgentSkillsPlugin does not support run method')
+    async def run(
+        self, action: Action, session_id: str | None = None, cwd: str | None = None
+    ) -> Observation:
+        """Call the agentskills function named by an AgentSkillAction.
+
+        The call runs in a worker thread of the server process, so calls do
+        not depend on a Jupyter kernel and can run in parallel. Relative paths
+        are resolved against `cwd`. An unknown function or arguments that do
+        not match its signature give an ErrorObservation.
+        """
+        if not isinstance(action, AgentSkillAction):
+            raise ValueError(f'AgentSkillsPlugin only supports AgentSkillAction, but got {action}')
+        try:
+            func = get_skill(action.function)
+            bound = bind_arguments(func, action.arguments, cwd)
+        except (KeyError, TypeError) as e:
+            message = e.args[0] if isinstance(e, KeyError) else f'Invalid arguments for {action.function}: {e}'
+            return ErrorObservation(content=message)
+        install_capture()
+        start_time = time.monotonic()
+        output, failed = await asyncio.to_thread(
+            call_skill, action.function, func, bound, session_id or self.DEFAULT_SESSION, self.state
+        )
+        return AgentSkillObservation(
+            content=output,
+            function=action.function,
+            failed=failed,
+            duration_seconds=round(time.monotonic() - start_time, 3),
+        )
@@ -0,0 +1,124 @@
+"""Calling agentskills functions directly in the server process.
+
+The functions report their results by printing. `call_skill` captures what
+one call prints through a `sys.stdout`/`sys.stderr` proxy that routes writes
+to the buffer of the current call (a context variable, so concurrent calls in
+different threads do not mix their output) and passes everything else
+through.
+
+Path arguments (including defaults like ``dir_path='./'``) are resolved
+against the caller's working directory, since the server's own cwd is not
+the session's. `open_file`, `goto_line`, `scroll_*` and `search_file` share
+the "currently open file" kept in module globals of `file_ops`; their calls
+are serialized and each session gets its own copy of that state.
+"""
+
+import contextvars
+import inspect
+import io
+import os
+import sys
+import threading
+import traceback
+from typing import Any, Callable
+
+from . import agentskills
+from .file_ops import file_ops
+
+PATH_PARAMETERS = ('path', 'file_path', 'dir_path', 'root')
+# Functions that read or write file_ops.CURRENT_FILE / CURRENT_LINE / WINDOW
+STATEFUL_FUNCTIONS = frozenset({'open_file', 'goto_line', 'scroll_down', 'scroll_up', 'search_file'})
+STATE_NAMES = ('CURRENT_FILE', 'CURRENT_LINE', 'WINDOW')
+
+_output: contextvars.ContextVar[io.StringIO | None] = contextvars.ContextVar('agent_skill_output', default=None)
+
+
+class _CapturingStream:
+    def __init__(self, stream) -> None:
+        self._stream = stream
+
+    def write(self, text: str) -> int:
+        buffer = _output.get()
+        if buffer is None:
+            return self._stream.write(text)
+        return buffer.write(text)
+
+    def flush(self) -> None:
+        if _output.get() is None:
+            self._stream.flush()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+def install_capture() -> None:
+    """Wrap sys.stdout/sys.stderr (again, if something replaced them since)."""
+    if not isinstance(sys.stdout, _CapturingStream):
+        sys.stdout = _CapturingStream(sys.stdout)
+    if not isinstance(sys.stderr, _CapturingStream):
+        sys.stderr = _CapturingStream(sys.stderr)
+
+
+def get_skill(name: str) -> Callable:
+    """The public agentskills function `name`; KeyError if there is none."""
+    if name.startswith('_') or name not in agentskills.__all__:
+        raise KeyError(f'Unknown agent skill: {name!r}. Available: {", ".join(sorted(agentskills.__all__))}')
+    return getattr(agentskills, name)
+
+
+def bind_arguments(func: Callable, args: dict, cwd: str | None) -> inspect.BoundArguments:
+    """Bind JSON arguments to `func` (TypeError if they do not match), resolving paths against `cwd`."""
+    bound = inspect.signature(func).bind(**args)
+    bound.apply_defaults()
+    if cwd:
+        for name in PATH_PARAMETERS:
+            value = bound.arguments.get(name)
+            if isinstance(value, str) and not os.path.isabs(value):
+                bound.arguments[name] = os.path.normpath(os.path.join(cwd, value))
+    return bound
+
+
+class SkillState:
+    """Per-session copies of the file_ops "currently open file" globals."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sessions: dict[str, dict[str, Any]] = {}
+
+    def call(self, session_id: str, func: Callable, bound: inspect.BoundArguments) -> Any:
+        with self._lock:
+            saved = {name: getattr(file_ops, name) for name in STATE_NAMES}
+            state = self._sessions.get(session_id, {'CURRENT_FILE': None, 'CURRENT_LINE': 1, 'WINDOW': file_ops.WINDOW})
+            for name, value in state.items():
+                setattr(file_ops, name, value)
+            try:
+                return func(*bound.args, **bound.kwargs)
+            finally:
+                self._sessions[session_id] = {name: getattr(file_ops, name) for name in STATE_NAMES}
+                for name, value in saved.items():
+                    setattr(file_ops, name, value)
+
+    def forget(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+
+def call_skill(
+    name: str, func: Callable, bound: inspect.BoundArguments, session_id: str, state: SkillState
+) -> tuple[str, bool]:
+    """Call a skill (in a worker thread); returns its printed output and whether it raised."""
+    buffer = io.StringIO()
+    token = _output.set(buffer)
+    failed = False
+    try:
+        if name in STATEFUL_FUNCTIONS:
+            result = state.call(session_id, func, bound)
+        else:
+            result = func(*bound.args, **bound.kwargs)
+        if result is not None:
+            print(result)
+    except Exception:
+        failed = True
+        traceback.print_exc(file=buffer)
+    finally:
+        _output.reset(token)
+    return buffer.getvalue(), failed
@@ -1,17 +1,84 @@
 import asyncio
+import functools
 import os
 import subprocess
 import sys
 import time
+import uuid
+from collections import deque
 from dataclasses import dataclass
+from typing import AsyncIterator
+
+import psutil
 
 from simple_openhands.core import logger
-from simple_openhands.events.action import Action, IPythonRunCellAction
-from simple_openhands.events.observation import Observation, IPythonRunCellObservation
-from .execute_server import JupyterKernel
+from simple_openhands.events.action import (
+    Action,
+    IPythonFanOutAction,
+    IPythonRunCellAction,
+    KernelCheckpointAction,
+    KernelRestoreAction,
+)
+from simple_openhands.events.observation import (
+    Observation,
+    IPythonFanOutObservation,
+    IPythonRunCellObservation,
+    KernelCheckpointObservation,
+    KernelRestoreObservation,
+)
+from .checkpoint import (
+    checkpoint_expression,
+    checkpoint_path,
+    default_checkpoint_dir,
+    parse_result,
+    restore_expression,
+    wait_for_result,
+)
+from .execute_server import JupyterKernel, KernelDiedError, OutputCallback, wait_for_gateway
+from .fanout import LaneFailed, check_item_name, fan_out, item_code, summarize
+from .image_store import ImageStore
+from .kernel_pool import KernelPool
+from .namespace_inspector import inspect_expression, parse_inspection
+from .output_buffer import OutputLimits
+from .resources import MB, CellResourceMeter, ResourceLimits, process_usage
+from .warmup import WarmupProfile
 from ..requirement import Plugin, PluginRequirement
 
 
+# Seconds to wait for the kernel gateway HTTP API to come up
+GATEWAY_READY_TIMEOUT = 60
+
+
+def kernel_restarted_marker(reason: str, replayed_init_code: bool) -> str:
+    text = f'[Kernel restarted: {reason}. All variables and imports were lost'
+    if replayed_init_code:
+        text += '; kernel_init_code was re-run'
+    return text + '.]\n'
+
+
+def _checkpoint_report_lines(title: str, report: dict) -> list[str]:
+    lines = [
+        f'{title}: {len(report["saved"])} saved, '
+        f'{len(report["unchanged"])} unchanged, {report["bytes"]} bytes'
+    ]
+    if report['skipped']:
+        lines.append(f'{len(report["skipped"])} variables could not be checkpointed:')
+        lines += [f'  {name}: {reason}' for name, reason in report['skipped'].items()]
+    return lines
+
+
+def _background_report_lines(name: str, report: dict | None) -> list[str]:
+    """How the background checkpoint started before the current action ended."""
+    if report is None:
+        return []
+    if 'error' in report:
+        return [
+            f'The background checkpoint {name!r} started earlier failed: {report["error"]}. '
+            'Its files still hold the checkpoint written before it.'
+        ]
+    return _checkpoint_report_lines(f'The background checkpoint {name!r} started earlier finished', report)
+
+
 def should_continue() -> bool:
     """Simple helper function to check if execution should continue."""
     return True
@@ -24,14 +91,44 @@ class JupyterRequirement(PluginRequirement):
 
 class JupyterPlugin(Plugin):
     name: str = 'jupyter'
+    # 'gateway': jupyter kernelgateway over HTTP + WebSocket
+    # 'local': ipykernel driven directly through jupyter_client (no gateway process)
+    BACKENDS = ('gateway', 'local')
+    backend: str
     kernel_gateway_port: int
     kernel_id: str
     gateway_process: asyncio.subprocess.Process | subprocess.Popen
     python_interpreter_path: str
+    pool: KernelPool
+    # 'store' (content-addressed files served by /images) or 'inline' (base64 data URLs)
+    IMAGE_MODES = ('store', 'inline')
+    image_mode: str
+    image_store: ImageStore
+    output_limits: OutputLimits
+    warmup: WarmupProfile
+    # Template process new local kernels are forked from (JUPYTER_KERNEL_FORK=1)
+    zygote = None
+    output_stats: dict
+    restart_stats: dict
+    resource_limits: ResourceLimits
+    resource_history: dict[str, deque]
+    # Seconds until the gateway HTTP API answered (None for the local backend)
+    gateway_ready_seconds: float | None = None
+    # Seconds until initialize() had a kernel that ran its first cell
+    ready_seconds: float | None = None
+    # Session that plugin-level calls without a session id run in
+    DEFAULT_SESSION = 'default'
+
+    @property
+    def kernel(self):
+        """The kernel of the default session, if it has been assigned one."""
+        pool = getattr(self, 'pool', None)
+        return pool.get(self.DEFAULT_SESSION) if pool is not None else None
 
     async def initialize(
         self, username: str, kernel_id: str = 'simple_openhands-default'
     ) -> None:
+        start_time = time.monotonic()
         # 使用固定端口，避免防火墙问题
         self.kernel_gateway_port = int(os.environ.get('JUPYTER_PORT', '8001'))
         
@@ -40,6 +137,46 @@ class JupyterPlugin(Plugin):
             raise ValueError(f"Invalid JUPYTER_PORT: {self.kernel_gateway_port}. Port must be between 1024 and 65535.")
         
         self.kernel_id = kernel_id
+        self.backend = os.environ.get('JUPYTER_BACKEND', 'gateway')
+        if self.backend not in self.BACKENDS:
+            raise ValueError(f"Invalid JUPYTER_BACKEND: {self.backend}. Expected one of {self.BACKENDS}.")
+        pool_size = int(os.environ.get('JUPYTER_KERNEL_POOL_SIZE', '1'))
+        if pool_size < 0:
+            raise ValueError(f"Invalid JUPYTER_KERNEL_POOL_SIZE: {pool_size}. Must be >= 0.")
+        # 单元格输出的内存上限（头部+尾部保留，超出部分写入溢出文件）
+        self.output_limits = OutputLimits.from_env()
+        # 内核预热：启动后、进入内核池之前预先导入模块并执行初始化代码
+        self.warmup = WarmupProfile.from_env()
+        self.output_stats = {'cells': 0, 'truncated_cells': 0, 'dropped_bytes': 0, 'dropped_images': 0}
+        # 内核崩溃后自动重启，并重放会话记录的 kernel_init_code
+        self.restart_stats = {'restarts': 0, 'last_reason': None, 'last_restart_seconds': None}
+        self._kernel_init_code: dict[str, str] = {}
+        self._restart_locks: dict[str, asyncio.Lock] = {}
+        # 每个单元格的内核资源统计（耗时、CPU、RSS），以及可选的 RSS 上限
+        self.resource_limits = ResourceLimits.from_env()
+        self.resource_history = {}
+        self._background_tasks: set[asyncio.Task] = set()
+        # 命名空间内存检查结果，按内核执行计数缓存
+        self._namespace_cache: dict[str, tuple[tuple[int, int], dict]] = {}
+        # 内核变量检查点（按变量增量 pickle 到磁盘，后台子进程写入）
+        self.checkpoint_root = os.environ.get('JUPYTER_CHECKPOINT_DIR') or default_checkpoint_dir()
+        self.checkpoint_timeout = float(os.environ.get('JUPYTER_CHECKPOINT_TIMEOUT', '300'))
+        self._checkpoint_locks: dict[str, asyncio.Lock] = {}
+        self._pending_checkpoints: dict[str, str] = {}
+        # Reports of finished background checkpoints, returned with the next
+        # checkpoint or restore of the same name
+        self._background_reports: dict[str, dict] = {}
+        # 并行扇出（run_ipython_fanout，stateless=false）最多同时使用的临时内核数
+        self.fanout_max_kernels = int(os.environ.get('JUPYTER_FANOUT_MAX_KERNELS', '4'))
+        # 图片输出：默认写入内容寻址存储，观察结果中只返回短URL
+        self.image_mode = os.environ.get('JUPYTER_IMAGE_MODE', 'store')
+        if self.image_mode not in self.IMAGE_MODES:
+            raise ValueError(f"Invalid JUPYTER_IMAGE_MODE: {self.image_mode}. Expected one of {self.IMAGE_MODES}.")
+        self.image_store = ImageStore(
+            os.environ.get('JUPYTER_IMAGE_DIR') or None,
+            max_bytes=int(os.environ.get('JUPYTER_IMAGE_STORE_MAX_BYTES', str(256 * 1024 * 1024))),
+        )
+        self.image_base_url = os.environ.get('JUPYTER_IMAGE_BASE_URL', '').rstrip('/')
         is_local_runtime = os.environ.get('LOCAL_RUNTIME_MODE') == '1'
         is_windows = sys.platform == 'win32'
 
@@ -68,7 +205,36 @@ class JupyterPlugin(Plugin):
             # The correct environment is ensured by the PATH in LocalRuntime.
             poetry_prefix = f'cd {code_repo_path}\n'
 
-        if is_windows:
+        if self.backend == 'local':
+            from .local_kernel import LocalJupyterKernel
+
+            env = None
+            if not is_local_runtime:
+                # Same module search path as the gateway launched through poetry_prefix
+                env = dict(os.environ)
+                env['PYTHONPATH'] = os.pathsep.join(
+                    [code_repo_path, os.path.join(code_repo_path, 'simple_openhands'), env.get('PYTHONPATH', '')]
+                )
+            cwd = code_repo_path if os.path.isdir(code_repo_path) else None
+            if os.environ.get('JUPYTER_KERNEL_FORK') == '1':
+                # 从预先导入了预热模块的模板进程 fork 新内核（写时复制共享已导入的模块）
+                if is_windows:
+                    logger.warning('JUPYTER_KERNEL_FORK is not supported on Windows, spawning kernels instead')
+                else:
+                    from .zygote import KernelZygote
+
+                    self.zygote = KernelZygote(self.warmup.modules, cwd=cwd, env=env)
+                    await self.zygote.start()
+            kernel_factory = functools.partial(
+                LocalJupyterKernel,
+                self.kernel_id,
+                cwd=cwd,
+                env=env,
+                output_limits=self.output_limits,
+                warmup=self.warmup,
+                zygote=self.zygote,
+            )
+        elif is_windows:
             # Windows-specific command format
             if not is_local_runtime:
                 # For non-local runtime, use the same approach as OpenHands official implementation
@@ -167,64 +333,464 @@ class JupyterPlugin(Plugin):
                 stderr=asyncio.subprocess.STDOUT,
                 stdout=asyncio.subprocess.PIPE,
             )
-            # read stdout until the kernel gateway is ready
-            output = ''
-            while should_continue() and self.gateway_process.stdout is not None:
-                line_bytes = await self.gateway_process.stdout.readline()
-                line = line_bytes.decode('utf-8')
-                output += line
-                if 'at' in line:
-                    break
-                await asyncio.sleep(1)
-                logger.debug('Waiting for jupyter kernel gateway to start...')
-
+            # 网关日志需要持续读取，否则管道写满后网关会阻塞
+            self._gateway_output: deque[str] = deque(maxlen=50)
+            self._gateway_output_task = asyncio.create_task(self._drain_gateway_output())
+            # 指数退避探测 HTTP API，直到 /api/kernels 可以响应
+            try:
+                self.gateway_ready_seconds = await wait_for_gateway(
+                    f'http://localhost:{self.kernel_gateway_port}',
+                    timeout=GATEWAY_READY_TIMEOUT,
+                    process=self.gateway_process,
+                )
+            except (ConnectionRefusedError, RuntimeError) as e:
+                output = ''.join(self._gateway_output)
+                logger.error(f'Jupyter kernel gateway did not become ready: {e}. Output: {output}')
+                raise
             logger.debug(
-                f'Jupyter kernel gateway started at port {self.kernel_gateway_port}. Output: {output}'
+                f'Jupyter kernel gateway ready at port {self.kernel_gateway_port} '
+                f'after {self.gateway_ready_seconds:.2f}s'
             )
 
-        # 测试Jupyter服务器是否正常工作
+        if self.backend != 'local':
+            kernel_factory = functools.partial(
+                JupyterKernel,
+                f'localhost:{self.kernel_gateway_port}',
+                self.kernel_id,
+                output_limits=self.output_limits,
+                warmup=self.warmup,
+            )
+        # 每个会话独占一个内核；池中预热 pool_size 个空闲内核
+        self.pool = KernelPool(kernel_factory, size=pool_size)
+
+        # 测试Jupyter服务器是否正常工作（同时为默认会话分配内核并开始预热）
         try:
             _obs = await self._run(
                 IPythonRunCellAction(code='import sys; print(sys.executable)')
             )
             self.python_interpreter_path = _obs.content.strip()
+            self.ready_seconds = time.monotonic() - start_time
             logger.info(f"Jupyter plugin initialized successfully. Python path: {self.python_interpreter_path}")
         except Exception as e:
             logger.error(f"Failed to test Jupyter plugin: {e}")
             raise
 
-    async def _run(self, action: Action) -> IPythonRunCellObservation:
-        """Internal method to run a code cell in the jupyter kernel."""
+    async def _drain_gateway_output(self) -> None:
+        """Keep reading the gateway's output, retaining the last lines for errors."""
+        stdout = self.gateway_process.stdout
+        while stdout is not None:
+            line_bytes = await stdout.readline()
+            if not line_bytes:
+                break
+            line = line_bytes.decode('utf-8', errors='replace')
+            self._gateway_output.append(line)
+            logger.debug(f'Jupyter output: {line.rstrip()}')
+
+    async def _run(
+        self,
+        action: Action,
+        session_id: str = DEFAULT_SESSION,
+        on_output: OutputCallback | None = None,
+    ) -> IPythonRunCellObservation:
+        """Internal method to run a code cell in the session's jupyter kernel."""
         if not isinstance(action, IPythonRunCellAction):
             raise ValueError(
                 f'Jupyter plugin only supports IPythonRunCellAction, but got {action}'
             )
 
-        if not hasattr(self, 'kernel'):
-            self.kernel = JupyterKernel(
-                f'localhost:{self.kernel_gateway_port}', self.kernel_id
-            )
+        if action.image_mode and action.image_mode not in self.IMAGE_MODES:
+            raise ValueError(f'Invalid image_mode: {action.image_mode}. Expected one of {self.IMAGE_MODES}.')
+
+        if action.kernel_init_code:
+            self._kernel_init_code[session_id] = action.kernel_init_code
 
-        if not self.kernel.initialized:
-            await self.kernel.initialize()
+        kernel = await self.pool.acquire(session_id)
+        if not kernel.initialized:
+            await kernel.initialize()
 
+        marker = ''
+        if not await kernel.is_alive():
+            # Died between cells (e.g. killed for memory); run this cell in a fresh kernel
+            kernel, marker = await self._restart_kernel(session_id, kernel, 'kernel died after the previous cell')
+
+        meter = CellResourceMeter(
+            kernel.pid,
+            self.resource_limits,
+            on_exceeded=functools.partial(self._on_rss_limit_exceeded, session_id, kernel),
+        )
+        meter.start()
         # Execute the code and get structured output
-        output = await self.kernel.execute(action.code, timeout=action.timeout)
+        try:
+            output = await kernel.execute(action.code, timeout=action.timeout, on_output=on_output)
+        except KernelDiedError as e:
+            resources = self._record_resources(session_id, action.code, meter.stop())
+            if meter.exceeded:
+                reason = f'kernel exceeded the RSS limit of {self.resource_limits.max_rss_bytes // MB} MB'
+            else:
+                reason = f'kernel died while running this cell ({e})'
+            # The cell itself probably killed the kernel: do not run it a second time
+            _, marker = await self._restart_kernel(session_id, kernel, reason)
+            return IPythonRunCellObservation(content=marker, code=action.code, resources=resources)
+        resources = self._record_resources(session_id, action.code, meter.stop())
 
         # Extract text content and image URLs from the structured output
-        text_content = output.get('text', '')
-        image_urls = output.get('images', [])
+        text_content = marker + output.get('text', '')
+        if meter.exceeded and self.resource_limits.on_exceeded == 'interrupt':
+            text_content += (
+                f'\n[Execution interrupted: kernel RSS exceeded the limit of '
+                f'{self.resource_limits.max_rss_bytes // MB} MB.]'
+            )
+        image_urls = self.store_images(output.get('images', []), action.image_mode)
+        self._record_output_stats(output.get('truncation'))
 
         return IPythonRunCellObservation(
             content=text_content,
             code=action.code,
             image_urls=image_urls if image_urls else None,
+            resources=resources,
+        )
+
+    def _on_rss_limit_exceeded(self, session_id: str, kernel, rss: int) -> None:
+        """Interrupt the cell or kill the kernel (restarted by `_run`)."""
+        logger.warning(
+            f'Jupyter kernel of session {session_id} uses {rss // MB} MB RSS, over the limit of '
+            f'{self.resource_limits.max_rss_bytes // MB} MB; action: {self.resource_limits.on_exceeded}'
+        )
+        if self.resource_limits.on_exceeded == 'interrupt':
+            task = asyncio.create_task(kernel.interrupt())
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+            return
+        pid = kernel.pid
+        if pid is not None:
+            try:
+                parent = psutil.Process(pid)
+                for proc in [*parent.children(recursive=True), parent]:
+                    proc.kill()
+            except psutil.NoSuchProcess:
+                pass
+        kernel.router.fail_all(KernelDiedError('RSS limit exceeded'))
+
+    def _record_resources(self, session_id: str, code: str, record: dict) -> dict:
+        history = self.resource_history.setdefault(
+            session_id, deque(maxlen=self.resource_limits.history_size)
         )
+        history.append({**record, 'code': code[:200]})
+        return record
 
-    async def run(self, action: Action) -> IPythonRunCellObservation:
-        """Execute Python code in Jupyter kernel"""
+    async def inspect_namespace(self, session_id: str, timeout: float = 30) -> dict | None:
+        """Variables of the session's kernel ranked by approximate deep size.
+
+        Runs as a silent execute, so the user namespace is not touched. The
+        report is cached until the next cell runs in that kernel. None if the
+        session has no kernel.
+        """
+        pool = getattr(self, 'pool', None)
+        kernel = pool.get(session_id) if pool is not None else None
+        if kernel is None:
+            return None
+        key = (id(kernel), kernel.execution_count)
+        cached = self._namespace_cache.get(session_id)
+        if cached is not None and cached[0] == key:
+            return {**cached[1], 'cached': True}
+        start_time = time.monotonic()
+        result = await kernel.evaluate({'namespace': inspect_expression()}, timeout=timeout)
+        inspection = parse_inspection(result['namespace'])
+        report = {
+            'session_id': session_id,
+            'execution_count': kernel.execution_count,
+            'total_size': sum(v['size'] for v in inspection['variables']),
+            'variables': inspection['variables'],
+            'inspect_seconds': round(time.monotonic() - start_time, 3),
+        }
+        self._namespace_cache[session_id] = (key, report)
+        return {**report, 'cached': False}
+
+    async def fan_out(self, action: IPythonFanOutAction) -> IPythonFanOutObservation:
+        """Run the action's code over its inputs on temporary kernels in parallel.
+
+        Each kernel runs `setup_code` once, then takes inputs in turn. A kernel
+        that dies is replaced for the remaining inputs. The kernels are shut
+        down afterwards.
+        """
+        check_item_name(action.item_name)
+        start_time = time.monotonic()
+        if not action.inputs:
+            return IPythonFanOutObservation(content=summarize([], 0, 'kernels', 0), code=action.code)
+        parallelism = min(action.max_parallel or self.fanout_max_kernels, len(action.inputs))
+        prefix = f'fanout-{uuid.uuid4().hex[:8]}'
+        lanes = [f'{prefix}-{i}' for i in range(parallelism)]
+        kernels = {}
+
+        async def start_lane(session_id: str) -> None:
+            kernel = await self.pool.acquire(session_id)
+            if not kernel.initialized:
+                await kernel.initialize()
+            if action.setup_code:
+                result = await kernel.execute(action.setup_code, timeout=action.timeout)
+                if result.get('status') != 'ok':
+                    raise RuntimeError(f'setup_code failed:\n{result["text"]}')
+            kernels[session_id] = kernel
+
+        async def run_item(session_id: str, index: int, item) -> dict:
+            kernel = kernels.get(session_id)
+            if kernel is None:
+                raise LaneFailed('[This lane has no kernel.]')
+            try:
+                result = await kernel.execute(item_code(action.code, item, action.item_name), timeout=action.timeout)
+            except KernelDiedError as e:
+                # Never reuse the released kernel: execute() would start an untracked one
+                kernels.pop(session_id, None)
+                await self.pool.release(session_id)
+                try:
+                    await start_lane(session_id)
+                except Exception as restart_error:
+                    raise LaneFailed(
+                        f'[Kernel died while running this item ({e}); replacing it failed: {restart_error}]'
+                    ) from restart_error
+                return {'status': 'error', 'output': f'[Kernel died while running this item ({e}); it was replaced.]'}
+            image_urls = self.store_images(result.get('images', []))
+            return {'status': result.get('status', 'ok'), 'output': result['text'], 'image_urls': image_urls}
+
+        try:
+            await asyncio.gather(*(start_lane(session_id) for session_id in lanes))
+            results = await fan_out(action.inputs, run_item, lanes)
+        finally:
+            await asyncio.gather(*(self.release_session(session_id) for session_id in lanes))
+        return IPythonFanOutObservation(
+            content=summarize(results, parallelism, 'kernels', time.monotonic() - start_time),
+            code=action.code,
+            results=results,
+        )
+
+    async def checkpoint(
+        self, action: KernelCheckpointAction, session_id: str = DEFAULT_SESSION
+    ) -> KernelCheckpointObservation:
+        """Pickle the session kernel's user variables, one file per variable.
+
+        The pickling runs in a forked child of the kernel, so unless
+        `action.wait` is set this returns as soon as the fork happened, with
+        `in_progress` set; its report (or error) comes with the next
+        checkpoint or restore of the same name. Variables that cannot be
+        pickled are listed in `skipped` with the reason.
+        """
+        directory = checkpoint_path(self.checkpoint_root, session_id, action.name)
+        kernel = self.pool.get(session_id)
+        if kernel is None:
+            raise ValueError(f'Session {session_id} has no kernel to checkpoint')
+        async with self._checkpoint_locks.setdefault(directory, asyncio.Lock()):
+            # Checkpoints of the same name update the same files: one at a time
+            await self._wait_for_checkpoint(directory)
+            previous = self._background_reports.pop(directory, None)
+            token = uuid.uuid4().hex
+            result = await kernel.evaluate(
+                {'checkpoint': checkpoint_expression(directory, action.variables, token, background=True)},
+                timeout=self.checkpoint_timeout,
+            )
+            report = parse_result(result['checkpoint'])
+            if report.get('background'):
+                self._pending_checkpoints[directory] = token
+                if not action.wait:
+                    lines = [
+                        f'Checkpoint {action.name!r} of {len(report["variables"])} variables '
+                        f'is being written in the background to {directory}'
+                    ]
+                    return KernelCheckpointObservation(
+                        content='\n'.join(lines + _background_report_lines(action.name, previous)),
+                        name=action.name,
+                        path=directory,
+                        saved=report['variables'],
+                        in_progress=True,
+                        background_report=previous,
+                    )
+                report = await self._wait_for_checkpoint(directory)
+                self._background_reports.pop(directory, None)
+                if report is None:
+                    raise TimeoutError(f'Checkpoint {action.name!r} did not finish in {self.checkpoint_timeout} seconds')
+        if 'error' in report:
+            raise RuntimeError(f'Checkpoint {action.name!r} failed: {report["error"]}')
+        lines = _checkpoint_report_lines(f'Checkpoint {action.name!r} written to {directory}', report)
+        return KernelCheckpointObservation(
+            content='\n'.join(lines + _background_report_lines(action.name, previous)),
+            name=action.name,
+            path=directory,
+            saved=report['saved'],
+            unchanged=report['unchanged'],
+            skipped=report['skipped'],
+            background_report=previous,
+        )
+
+    async def _wait_for_checkpoint(self, directory: str) -> dict | None:
+        """Wait for the background checkpoint writing `directory`, if any.
+
+        Its report is kept in `_background_reports` (with an `error` if it
+        failed or timed out) and also returned (None on timeout).
+        """
+        token = self._pending_checkpoints.get(directory)
+        if token is None:
+            return None
+        result = await wait_for_result(directory, token, self.checkpoint_timeout)
+        if result is None:
+            logger.warning(f'Background checkpoint in {directory} did not finish in {self.checkpoint_timeout} seconds')
+            self._background_reports[directory] = {'error': f'did not finish in {self.checkpoint_timeout} seconds'}
+        else:
+            if 'error' in result:
+                logger.warning(f'Background checkpoint in {directory} failed: {result["error"]}')
+            self._background_reports[directory] = result
+        self._pending_checkpoints.pop(directory, None)
+        return result
+
+    async def restore(
+        self, action: KernelRestoreAction, session_id: str = DEFAULT_SESSION
+    ) -> KernelRestoreObservation:
+        """Load a checkpoint's variables into the session's kernel (started if needed)."""
+        directory = checkpoint_path(self.checkpoint_root, session_id, action.name)
+        async with self._checkpoint_locks.setdefault(directory, asyncio.Lock()):
+            await self._wait_for_checkpoint(directory)
+            previous = self._background_reports.pop(directory, None)
+            if not os.path.exists(os.path.join(directory, 'manifest.json')):
+                raise ValueError(
+                    '\n'.join(
+                        [f'No checkpoint named {action.name!r} for session {session_id}']
+                        + _background_report_lines(action.name, previous)
+                    )
+                )
+            kernel = await self.pool.acquire(session_id)
+            if not kernel.initialized:
+                await kernel.initialize()
+            result = await kernel.evaluate(
+                {'restore': restore_expression(directory, action.variables)},
+                timeout=self.checkpoint_timeout,
+            )
+        report = parse_result(result['restore'])
+        # The silent execute does not bump the execution count the cache is keyed on
+        self._namespace_cache.pop(session_id, None)
+        lines = [f'Restored {len(report["restored"])} variables from checkpoint {action.name!r}']
+        if report['failed']:
+            lines.append(f'{len(report["failed"])} variables could not be restored:')
+            lines += [f'  {name}: {reason}' for name, reason in report['failed'].items()]
+        return KernelRestoreObservation(
+            content='\n'.join(lines + _background_report_lines(action.name, previous)),
+            name=action.name,
+            restored=report['restored'],
+            failed=report['failed'],
+            background_report=previous,
+        )
+
+    def resource_stats(self) -> dict:
+        """Current usage and per-cell history of every session's kernel."""
+        sessions = {}
+        pool = getattr(self, 'pool', None)
+        for session_id in sorted(set(self.resource_history) | set(pool.stats()['sessions'] if pool else [])):
+            kernel = pool.get(session_id) if pool else None
+            pid = kernel.pid if kernel is not None else None
+            usage = process_usage(pid) if pid is not None else None
+            sessions[session_id] = {
+                'pid': pid,
+                'rss': usage[0] if usage else None,
+                'cpu_seconds': round(usage[1], 3) if usage else None,
+                'history': list(self.resource_history.get(session_id, [])),
+            }
+        return {
+            'max_rss_bytes': self.resource_limits.max_rss_bytes,
+            'on_exceeded': self.resource_limits.on_exceeded,
+            'sessions': sessions,
+        }
+
+    async def _restart_kernel(self, session_id: str, dead_kernel, reason: str) -> tuple:
+        """Replace the session's dead kernel by a pre-warmed one and replay its
+        kernel_init_code. Returns the new kernel and the marker for the observation."""
+        lock = self._restart_locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            if self.pool.get(session_id) is not dead_kernel:
+                # A concurrent cell of the same session already restarted it
+                kernel = await self.pool.acquire(session_id)
+                return kernel, kernel_restarted_marker(reason, session_id in self._kernel_init_code)
+            start_time = time.monotonic()
+            logger.warning(f'Jupyter kernel of session {session_id} died ({reason}), restarting')
+            await self.pool.release(session_id)
+            kernel = await self.pool.acquire(session_id)
+            if not kernel.initialized:
+                await kernel.initialize()
+            init_code = self._kernel_init_code.get(session_id)
+            if init_code:
+                result = await kernel.execute(init_code)
+                logger.debug(f'Replayed kernel_init_code of session {session_id}:\n{result["text"]}')
+            self.restart_stats['restarts'] += 1
+            self.restart_stats['last_reason'] = reason
+            self.restart_stats['last_restart_seconds'] = round(time.monotonic() - start_time, 3)
+        return kernel, kernel_restarted_marker(reason, bool(init_code))
+
+    def store_images(self, image_urls: list[str], image_mode: str | None = None) -> list[str]:
+        """Cell images as returned in observations: in 'store' mode (the default
+        is JUPYTER_IMAGE_MODE) stored and replaced by their /images URL."""
+        if image_urls and (image_mode or self.image_mode) == 'store':
+            return [self._store_image(url) for url in image_urls]
+        return image_urls
+
+    def _store_image(self, url: str) -> str:
+        """Replace a base64 data URL by the URL of the stored image."""
+        digest = self.image_store.put_data_url(url)
+        if digest is None:
+            return url
+        return f'{self.image_base_url}/images/{digest}.png'
+
+    def _record_output_stats(self, truncation: dict | None) -> None:
+        self.output_stats['cells'] += 1
+        if truncation:
+            self.output_stats['truncated_cells'] += 1
+            self.output_stats['dropped_bytes'] += truncation['dropped_bytes']
+            self.output_stats['dropped_images'] += truncation['dropped_images']
+            self.output_stats['last_spill_path'] = truncation['spill_path']
+
+    async def release_session(self, session_id: str) -> bool:
+        """Shut down the kernel assigned to a session; the pool starts a fresh one."""
+        pool = getattr(self, 'pool', None)
+        if pool is None:
+            return False
+        self._kernel_init_code.pop(session_id, None)
+        self._restart_locks.pop(session_id, None)
+        self.resource_history.pop(session_id, None)
+        self._namespace_cache.pop(session_id, None)
+        return await pool.release(session_id)
+
+    def pool_stats(self) -> dict | None:
+        pool = getattr(self, 'pool', None)
+        return pool.stats() if pool is not None else None
+
+    async def shutdown(self) -> None:
+        """Shut down all kernels and, for the gateway backend, the gateway process tree."""
+        pool = getattr(self, 'pool', None)
+        if pool is not None:
+            await pool.shutdown()
+        if self.zygote is not None:
+            await self.zygote.shutdown()
+        output_task = getattr(self, '_gateway_output_task', None)
+        if output_task is not None:
+            output_task.cancel()
+        gateway_process = getattr(self, 'gateway_process', None)
+        if gateway_process is not None and gateway_process.returncode is None:
+            try:
+                parent = psutil.Process(gateway_process.pid)
+                for proc in [*parent.children(recursive=True), parent]:
+                    proc.terminate()
+            except psutil.NoSuchProcess:
+                pass
+            if isinstance(gateway_process, asyncio.subprocess.Process):
+                try:
+                    await asyncio.wait_for(gateway_process.wait(), 10)
+                except asyncio.TimeoutError:
+                    gateway_process.kill()
+
+    async def run(
+        self,
+        action: Action,
+        session_id: str | None = None,
+        on_output: OutputCallback | None = None,
+    ) -> IPythonRunCellObservation:
+        """Execute Python code in the Jupyter kernel of the given session"""
         try:
-            obs = await self._run(action)
+            obs = await self._run(action, session_id or self.DEFAULT_SESSION, on_output)
             return obs
         except Exception as e:
             logger.error(f"Error executing Python code: {e}")
@@ -234,3 +800,30 @@ class JupyterPlugin(Plugin):
                 code=action.code if hasattr(action, 'code') else "unknown",
                 image_urls=None,
             )
+
+    async def run_stream(
+        self, action: Action, session_id: str | None = None
+    ) -> AsyncIterator[dict]:
+        """Execute Python code, yielding each output message as it arrives.
+
+        Yields `{'type': 'output', 'msg_type': ..., 'content': ...}` for every
+        stream/display_data/execute_result/error message and finally
+        `{'type': 'observation', 'observation': IPythonRunCellObservation}`.
+        If the consumer stops early the cell keeps running to completion.
+        """
+        messages: asyncio.Queue[dict] = asyncio.Queue()
+        task = asyncio.create_task(self.run(action, session_id, on_output=messages.put_nowait))
+        next_message: asyncio.Future | None = None
+        try:
+            while True:
+                next_message = asyncio.ensure_future(messages.get())
+                await asyncio.wait({next_message, task}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_message.done():
+                    break
+                yield {'type': 'output', **next_message.result()}
+            while not messages.empty():
+                yield {'type': 'output', **messages.get_nowait()}
+            yield {'type': 'observation', 'observation': task.result()}
+        finally:
+            if next_message is not None and not next_message.done():
+                next_message.cancel()
@@ -0,0 +1,210 @@
+"""Checkpoint and restore of a kernel's user namespace.
+
+A checkpoint pickles every user variable (or a chosen subset) into its own
+file under ``<root>/<session>/<name>/``, next to a ``manifest.json``
+describing them. Variables are handled one at a time: a variable that cannot
+be pickled is reported with the reason and does not affect the others, and a
+variable whose pickle did not change since the last checkpoint is not
+rewritten.
+
+Like the namespace inspector, the helpers run as `user_expressions` of a
+silent execute, so nothing is bound in the user namespace. On POSIX the
+checkpoint runs in a (double-)forked child of the kernel: the child pickles a
+copy-on-write snapshot of the namespace while the kernel keeps serving cells,
+and writes ``result.json`` when done. Restore loads the files back into the
+namespace of (typically) a fresh kernel.
+"""
+
+import ast
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
+
+NAME_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+
+def default_checkpoint_dir() -> str:
+    return os.path.join(tempfile.gettempdir(), 'simple_openhands-checkpoints')
+
+
+def checkpoint_path(root: str, session_id: str, name: str) -> str:
+    """Directory of a checkpoint; ValueError for names unsafe as path components."""
+    for part in (session_id, name):
+        if not NAME_PATTERN.match(part) or part in ('.', '..'):
+            raise ValueError(f'Invalid checkpoint name: {part!r}')
+    return os.path.join(root, session_id, name)
+
+
+CHECKPOINT_SOURCE = r'''
+def checkpoint(shell, directory, names, token, background):
+    import hashlib
+    import json
+    import os
+    import pickle
+    import types
+
+    namespace = shell.user_ns
+    hidden = getattr(shell, 'user_ns_hidden', {})
+    if names is None:
+        candidates = [
+            name for name, value in namespace.items()
+            if not name.startswith('_')
+            and not (name in hidden and hidden[name] is value)
+            and not isinstance(value, types.ModuleType)
+        ]
+    else:
+        candidates = list(names)
+
+    def write_json(path, data):
+        with open(path + '.tmp', 'w') as f:
+            json.dump(data, f)
+        os.replace(path + '.tmp', path)
+
+    def run():
+        os.makedirs(directory, exist_ok=True)
+        manifest_path = os.path.join(directory, 'manifest.json')
+        try:
+            with open(manifest_path) as f:
+                previous = json.load(f)['variables']
+        except (OSError, ValueError, KeyError):
+            previous = {}
+        variables = {} if names is None else dict(previous)
+        saved, unchanged, skipped = [], [], {}
+        for name in candidates:
+            if name not in namespace:
+                skipped[name] = 'not defined'
+                continue
+            value = namespace[name]
+            if isinstance(value, (types.FunctionType, type)) and getattr(value, '__module__', None) == '__main__':
+                # Pickled by reference only; re-run the cell that defines it instead
+                skipped[name] = f'{type(value).__name__} defined in the kernel cannot be pickled by value'
+                continue
+            try:
+                data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                skipped[name] = f'{type(e).__name__}: {e}'
+                continue
+            digest = hashlib.sha256(data).hexdigest()
+            path = os.path.join(directory, name + '.pkl')
+            entry = previous.get(name)
+            if entry and entry['sha256'] == digest and os.path.exists(path):
+                unchanged.append(name)
+            else:
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(data)
+                os.replace(path + '.tmp', path)
+                saved.append(name)
+            cls = type(value)
+            variables[name] = {
+                'sha256': digest,
+                'size': len(data),
+                'type': cls.__qualname__ if cls.__module__ == 'builtins' else f'{cls.__module__}.{cls.__qualname__}',
+            }
+        for name in set(previous) - set(variables):
+            try:
+                os.remove(os.path.join(directory, name + '.pkl'))
+            except OSError:
+                pass
+        write_json(manifest_path, {'variables': variables})
+        return {
+            'token': token,
+            'saved': saved,
+            'unchanged': unchanged,
+            'skipped': skipped,
+            'bytes': sum(v['size'] for v in variables.values()),
+        }
+
+    def run_and_report():
+        try:
+            result = run()
+        except BaseException as e:
+            result = {'token': token, 'error': f'{type(e).__name__}: {e}'}
+        write_json(os.path.join(directory, 'result.json'), result)
+        return result
+
+    if background and hasattr(os, 'fork'):
+        os.makedirs(directory, exist_ok=True)
+        pid = os.fork()
+        if pid == 0:
+            # Fork again so the worker is not left as a zombie of the kernel
+            try:
+                if os.fork() == 0:
+                    try:
+                        run_and_report()
+                    finally:
+                        os._exit(0)
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        return json.dumps({'token': token, 'background': True, 'variables': candidates})
+    return json.dumps(run_and_report())
+'''
+
+RESTORE_SOURCE = r'''
+def restore(shell, directory, names):
+    import json
+    import os
+    import pickle
+
+    with open(os.path.join(directory, 'manifest.json')) as f:
+        variables = json.load(f)['variables']
+    restored, failed = [], {}
+    for name in variables if names is None else names:
+        if name not in variables:
+            failed[name] = 'not in checkpoint'
+            continue
+        try:
+            with open(os.path.join(directory, name + '.pkl'), 'rb') as f:
+                shell.user_ns[name] = pickle.load(f)
+            restored.append(name)
+        except Exception as e:
+            failed[name] = f'{type(e).__name__}: {e}'
+    return json.dumps({'restored': restored, 'failed': failed})
+'''
+
+
+def _expression(source: str, function: str, *args) -> str:
+    call_args = ', '.join(['get_ipython()', *(repr(a) for a in args)])
+    return (
+        f'(lambda ns: (exec(ns.pop("source"), ns), ns[{function!r}]({call_args}))[1])'
+        f'({{"source": {source!r}}})'
+    )
+
+
+def checkpoint_expression(directory: str, names: list[str] | None, token: str, background: bool) -> str:
+    return _expression(CHECKPOINT_SOURCE, 'checkpoint', directory, names, token, background)
+
+
+def restore_expression(directory: str, names: list[str] | None) -> str:
+    return _expression(RESTORE_SOURCE, 'restore', directory, names)
+
+
+def parse_result(result: dict) -> dict:
+    """Decode the `user_expressions` entry of a checkpoint/restore expression."""
+    if result.get('status') != 'ok':
+        raise RuntimeError(f'{result.get("ename")}: {result.get("evalue")}')
+    # The expression's value is a str, so its text/plain repr is a string literal
+    return json.loads(ast.literal_eval(result['data']['text/plain']))
+
+
+def read_result(directory: str, token: str) -> dict | None:
+    """The result of the checkpoint `token`, if it has finished."""
+    try:
+        with open(os.path.join(directory, 'result.json')) as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return result if result.get('token') == token else None
+
+
+async def wait_for_result(directory: str, token: str, timeout: float, interval: float = 0.05) -> dict | None:
+    """Poll for the result of a background checkpoint; None on timeout."""
+    deadline = time.monotonic() + timeout
+    while True:
+        result = read_result(directory, token)
+        if result is not None or time.monotonic() > deadline:
+            return result
+        await asyncio.sleep(interval)
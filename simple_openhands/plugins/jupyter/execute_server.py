@@ -4,17 +4,91 @@ import asyncio
 import logging
 import os
 import re
+import time
+from typing import Any, Awaitable, Callable
 from uuid import uuid4
 
+import psutil
 import tornado
 import tornado.websocket
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_fixed
 from tornado.escape import json_decode, json_encode, url_escape
-from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError, HTTPRequest
 from tornado.ioloop import PeriodicCallback
 from tornado.websocket import websocket_connect
 
 from simple_openhands.core import logger
+from simple_openhands.plugins.jupyter.message_router import KernelDiedError, MessageRouter
+from simple_openhands.plugins.jupyter.output_buffer import CellOutputBuffer, OutputLimits
+from simple_openhands.plugins.jupyter.warmup import WarmupProfile
+
+
+# Text of a cell that finished without printing anything
+NO_OUTPUT_TEXT = '[Code executed successfully with no output]'
+
+# Exponential backoff used while waiting for the gateway HTTP API
+PROBE_INITIAL_DELAY = 0.01
+PROBE_MAX_DELAY = 0.5
+# HTTP statuses that mean "not up yet" (599 is tornado's connection error);
+# any other status is an answer and is not retried
+RETRY_HTTP_CODES = (503, 599)
+
+
+async def retry_with_backoff(
+    probe: Callable[[], Awaitable[Any]],
+    timeout: float,
+    initial_delay: float = PROBE_INITIAL_DELAY,
+    max_delay: float = PROBE_MAX_DELAY,
+) -> Any:
+    """Await `probe` until it stops failing with a connection error.
+
+    Connection errors are OSErrors and HTTPClientErrors with a status in
+    RETRY_HTTP_CODES. The delay between attempts doubles from `initial_delay`
+    up to `max_delay`. Raises ConnectionRefusedError once `timeout` seconds
+    have passed; any other exception raised by `probe` (including other HTTP
+    errors, with their status) is propagated immediately.
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while True:
+        try:
+            return await probe()
+        except (OSError, HTTPClientError) as e:
+            if isinstance(e, HTTPClientError) and e.code not in RETRY_HTTP_CODES:
+                raise
+            if time.monotonic() + delay > deadline:
+                raise ConnectionRefusedError(f'Not ready after {timeout} seconds: {e}') from e
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+
+async def wait_for_gateway(
+    base_url: str, timeout: float = 60, process: Any | None = None
+) -> float:
+    """Probe `GET /api/kernels` until the kernel gateway answers HTTP.
+
+    Returns the number of seconds it took. If `process` (the gateway process)
+    exits while waiting, a RuntimeError is raised instead of waiting out the
+    timeout.
+    """
+    client = AsyncHTTPClient()
+    start_time = time.monotonic()
+
+    async def probe() -> None:
+        if process is not None and process.returncode is not None:
+            raise RuntimeError(
+                f'Jupyter kernel gateway exited with code {process.returncode}'
+            )
+        try:
+            await client.fetch(f'{base_url}/api/kernels', request_timeout=5)
+        except HTTPClientError as e:
+            # Any HTTP status means the server is up: the gateway answers 403
+            # unless list_kernels is enabled. 599 is tornado's connection error.
+            if e.code == 599:
+                raise
+
+    await retry_with_backoff(probe, timeout)
+    return time.monotonic() - start_time
 
 
 def strip_ansi(o: str) -> str:
@@ -50,14 +124,136 @@ def strip_ansi(o: str) -> str:
     return stripped
 
 
+def collect_output(msg_type: str, content: dict, outputs: list[dict]) -> bool:
+    """Append the output carried by a kernel message to `outputs`.
+
+    Returns True when the message ends the execution (`error` / `execute_reply`).
+    """
+    if msg_type == 'error':
+        traceback = '\n'.join(content['traceback'])
+        outputs.append({'type': 'text', 'content': traceback})
+        return True
+    elif msg_type == 'stream':
+        outputs.append({'type': 'text', 'content': content['text']})
+    elif msg_type in ['execute_result', 'display_data']:
+        outputs.append({'type': 'text', 'content': content['data']['text/plain']})
+        if 'image/png' in content['data']:
+            # Store image data in structured format
+            image_url = f'data:image/png;base64,{content["data"]["image/png"]}'
+            outputs.append({'type': 'image', 'content': image_url})
+    elif msg_type == 'execute_reply':
+        return True
+    return False
+
+
+def format_outputs(
+    outputs: list[dict] | CellOutputBuffer, execution_done: bool
+) -> dict[str, list[str] | str]:
+    """Turn collected outputs into the `{'text': ..., 'images': [...]}` result of `execute`.
+
+    When a `CellOutputBuffer` dropped output, its counters are added as `truncation`.
+    """
+    text_outputs = []
+    image_outputs = []
+
+    for output in outputs:
+        if output['type'] == 'text':
+            text_outputs.append(output['content'])
+        elif output['type'] == 'image':
+            image_outputs.append(output['content'])
+
+    if not text_outputs and execution_done:
+        text_content = NO_OUTPUT_TEXT
+    else:
+        text_content = ''.join(text_outputs)
+
+    # Remove ANSI from text content
+    text_content = strip_ansi(text_content)
+
+    # Return a dictionary with text content and image URLs
+    result = {'text': text_content, 'images': image_outputs}
+    if isinstance(outputs, CellOutputBuffer) and outputs.truncated:
+        result['truncation'] = outputs.stats()
+    return result
+
+
+# Receives every output message of a cell as it arrives (streaming execution)
+OutputCallback = Callable[[dict], None]
+# iopub message types that carry cell output
+OUTPUT_MSG_TYPES = frozenset(
+    {'stream', 'display_data', 'update_display_data', 'execute_result', 'error', 'clear_output'}
+)
+
+
+async def wait_for_execution(
+    queue: asyncio.Queue,
+    outputs: list[dict] | CellOutputBuffer,
+    on_output: OutputCallback | None = None,
+) -> dict:
+    """Collect the outputs of one execute_request from its routed messages.
+
+    Returns the content of the execute_reply. Waits for both the reply (shell
+    channel) and the `idle` status (iopub channel): the two channels are not
+    ordered relative to each other, so the reply can arrive before the last
+    output does. An exception put on the queue is raised. `on_output` is
+    called with `{'msg_type': ..., 'content': ...}` for each output message.
+    """
+    reply = None
+    idle = False
+    while reply is None or not idle:
+        msg = await queue.get()
+        if isinstance(msg, BaseException):
+            raise msg
+        msg_type = msg['msg_type']
+        if os.environ.get('DEBUG'):
+            logging.info(f'MSG TYPE: {msg_type.upper()}\nCONTENT: {msg["content"]}')
+        if msg_type == 'status':
+            idle = idle or msg['content'].get('execution_state') == 'idle'
+        elif msg_type == 'execute_reply':
+            reply = msg['content']
+        else:
+            collect_output(msg_type, msg['content'], outputs)
+            if on_output is not None and msg_type in OUTPUT_MSG_TYPES:
+                on_output({'msg_type': msg_type, 'content': msg['content']})
+    return reply
+
+
 class JupyterKernel:
-    def __init__(self, url_suffix: str, convid: str, lang: str = 'python') -> None:
+    # Seconds to keep retrying kernel creation while the gateway starts up
+    CREATE_KERNEL_TIMEOUT = 30
+    # How often a request the kernel answered with status 'aborted' is re-sent
+    ABORTED_RETRIES = 3
+
+    def __init__(
+        self,
+        url_suffix: str,
+        convid: str,
+        lang: str = 'python',
+        output_limits: OutputLimits | None = None,
+        warmup: WarmupProfile | None = None,
+    ) -> None:
         self.base_url = f'http://{url_suffix}'
         self.base_ws_url = f'ws://{url_suffix}'
         self.lang = lang
         self.kernel_id: str | None = None
         self.ws: tornado.websocket.WebSocketClientConnection | None = None
         self.convid = convid
+        self.output_limits = output_limits
+        self.warmup = warmup
+        self.warmup_seconds: float | None = None
+        # Stable websocket session: the server buffers messages while we are
+        # disconnected and replays them when the same session reconnects
+        self.session_id = uuid4().hex
+        self.router = MessageRouter()
+        self.router.on_kernel_lost = self._on_kernel_lost
+        # Set once the gateway reports the kernel restarted/dead or it disappears
+        self.dead = False
+        self._connect_lock = asyncio.Lock()
+        self._reader_task: asyncio.Task | None = None
+        self._closing = False
+        self._pid: int | None = None
+        # Cells run through execute() (store_history=False leaves the kernel's own counter alone)
+        self.execution_count = 0
         logging.info(
             f'Jupyter kernel created for conversation {convid} at {url_suffix}'
         )
@@ -68,30 +264,75 @@ class JupyterKernel:
 
     async def initialize(self) -> None:
         await self.execute(r'%colors nocolor')
-        # pre-defined tools
-        self.tools_to_run: list[str] = [
-            # TODO: You can add code for your pre-defined tools here
-        ]
+        # pre-defined tools: the warm-up profile (module preloads + setup code)
+        self.tools_to_run: list[str] = self.warmup.cells() if self.warmup else []
+        start_time = time.monotonic()
         for tool in self.tools_to_run:
             res = await self.execute(tool)
             logging.info(f'Tool [{tool}] initialized:\n{res}')
+        self.warmup_seconds = time.monotonic() - start_time
         self.initialized = True
 
+    def _on_kernel_lost(self, state: str) -> None:
+        logging.warning(f'Jupyter kernel {self.kernel_id} is {state}')
+        self.dead = True
+        self.router.fail_all(KernelDiedError(f'Kernel {state}'))
+
+    async def is_alive(self) -> bool:
+        return not self.dead
+
+    @property
+    def pid(self) -> int | None:
+        """Pid of the kernel process, when the gateway runs on this machine."""
+        if self._pid is not None and psutil.pid_exists(self._pid):
+            return self._pid
+        self._pid = None
+        if not self.kernel_id:
+            return None
+        # The gateway starts kernels with their connection file kernel-<id>.json
+        connection_file = f'kernel-{self.kernel_id}.json'
+        for proc in psutil.process_iter(['pid', 'cmdline']):
+            cmdline = proc.info['cmdline'] or []
+            if any(arg.endswith(connection_file) for arg in cmdline):
+                self._pid = proc.info['pid']
+                break
+        return self._pid
+
+    async def _check_kernel_exists(self) -> None:
+        """Mark the kernel dead when the gateway no longer knows it."""
+        if not self.kernel_id or self.dead:
+            return
+        try:
+            await AsyncHTTPClient().fetch(
+                f'{self.base_url}/api/kernels/{self.kernel_id}', request_timeout=5
+            )
+        except HTTPClientError as e:
+            if e.code == 404:
+                self._on_kernel_lost('gone')
+        except OSError:
+            pass  # gateway unreachable; the websocket reconnect handles that
+
     async def _send_heartbeat(self) -> None:
         if not self.ws:
             return
+        await self._check_kernel_exists()
         try:
             self.ws.ping()
             # logging.info('Heartbeat sent...')
         except tornado.iostream.StreamClosedError:
             # logging.info('Heartbeat failed, reconnecting...')
             try:
-                await self._connect()
+                await self._ensure_connected()
             except ConnectionRefusedError:
                 logging.info(
                     'ConnectionRefusedError: Failed to reconnect to kernel websocket - Is the kernel still running?'
                 )
 
+    async def _ensure_connected(self) -> None:
+        async with self._connect_lock:
+            if not self.ws or self.ws.stream.closed():
+                await self._connect()
+
     async def _connect(self) -> None:
         if self.ws:
             self.ws.close()
@@ -99,31 +340,26 @@ class JupyterKernel:
 
         client = AsyncHTTPClient()
         if not self.kernel_id:
-            n_tries = 5
-            while n_tries > 0:
-                try:
-                    response = await client.fetch(
-                        '{}/api/kernels'.format(self.base_url),
-                        method='POST',
-                        body=json_encode({'name': self.lang}),
-                    )
-                    kernel = json_decode(response.body)
-                    self.kernel_id = kernel['id']
-                    break
-                except Exception:
-                    # kernels are not ready yet
-                    n_tries -= 1
-                    await asyncio.sleep(1)
 
-            if n_tries == 0:
-                raise ConnectionRefusedError('Failed to connect to kernel')
+            async def create_kernel() -> str:
+                response = await client.fetch(
+                    '{}/api/kernels'.format(self.base_url),
+                    method='POST',
+                    body=json_encode({'name': self.lang}),
+                )
+                return json_decode(response.body)['id']
+
+            # The gateway may not be ready yet; raises ConnectionRefusedError on timeout,
+            # while an error status (e.g. an unknown kernel name) is raised at once
+            self.kernel_id = await retry_with_backoff(create_kernel, self.CREATE_KERNEL_TIMEOUT)
 
         ws_req = HTTPRequest(
-            url='{}/api/kernels/{}/channels'.format(
-                self.base_ws_url, url_escape(self.kernel_id)
+            url='{}/api/kernels/{}/channels?session_id={}'.format(
+                self.base_ws_url, url_escape(self.kernel_id), self.session_id
             )
         )
         self.ws = await websocket_connect(ws_req)
+        self._reader_task = asyncio.create_task(self._read_messages(self.ws))
         logging.info('Connected to kernel websocket')
 
         # Setup heartbeat
@@ -134,26 +370,41 @@ class JupyterKernel:
         )
         self.heartbeat_callback.start()
 
-    @retry(
-        retry=retry_if_exception_type(ConnectionRefusedError),
-        stop=stop_after_attempt(3),
-        wait=wait_fixed(2),
-    )  # type: ignore
-    async def execute(
-        self, code: str, timeout: int = 120
-    ) -> dict[str, list[str] | str]:
-        if not self.ws or self.ws.stream.closed():
-            await self._connect()
+    async def _read_messages(
+        self, ws: tornado.websocket.WebSocketClientConnection
+    ) -> None:
+        """Route every message of one websocket connection until it closes."""
 
-        msg_id = uuid4().hex
+        async def read_message() -> dict | None:
+            msg = await ws.read_message()
+            return json_decode(msg) if msg is not None else None
+
+        await self.router.pump(read_message)
+        if self._closing or self.ws is not ws or not self.router.pending:
+            return
+        # The connection dropped while executions are in flight: reconnect with
+        # the same session so their remaining messages are replayed to us
+        logging.info('Kernel websocket closed with pending executions, reconnecting')
+        try:
+            await self._ensure_connected()
+        except Exception as e:
+            self.router.fail_all(ConnectionRefusedError(f'Lost kernel websocket: {e}'))
+
+    async def _send_execute_request(
+        self,
+        code: str,
+        msg_id: str,
+        silent: bool = False,
+        user_expressions: dict[str, str] | None = None,
+    ) -> None:
         assert self.ws is not None
-        res = await self.ws.write_message(
+        await self.ws.write_message(
             json_encode(
                 {
                     'header': {
                         'username': '',
                         'version': '5.0',
-                        'session': '',
+                        'session': self.session_id,
                         'msg_id': msg_id,
                         'msg_type': 'execute_request',
                     },
@@ -161,9 +412,9 @@ class JupyterKernel:
                     'channel': 'shell',
                     'content': {
                         'code': code,
-                        'silent': False,
+                        'silent': silent,
                         'store_history': False,
-                        'user_expressions': {},
+                        'user_expressions': user_expressions or {},
                         'allow_stdin': False,
                     },
                     'metadata': {},
@@ -171,92 +422,96 @@ class JupyterKernel:
                 }
             )
         )
-        logging.info(f'Executed code in jupyter kernel:\n{res}')
 
-        outputs: list[dict] = []
+    @retry(
+        retry=retry_if_exception_type(ConnectionRefusedError),
+        stop=stop_after_attempt(3),
+        wait=wait_fixed(2),
+    )  # type: ignore
+    async def execute(
+        self, code: str, timeout: int = 120, on_output: OutputCallback | None = None
+    ) -> dict[str, list[str] | str]:
+        if self.dead:
+            raise KernelDiedError('Kernel is dead')
+        await self._ensure_connected()
+
+        outputs = CellOutputBuffer(self.output_limits)
+        msg_id = ''
+        queue: asyncio.Queue | None = None
+        status = 'ok'
 
         async def wait_for_messages() -> bool:
-            execution_done = False
-            while not execution_done:
-                assert self.ws is not None
-                msg = await self.ws.read_message()
-                if msg is None:
-                    continue
-                msg_dict = json_decode(msg)
-                msg_type = msg_dict['msg_type']
-                parent_msg_id = msg_dict['parent_header'].get('msg_id', None)
-
-                if parent_msg_id != msg_id:
-                    continue
-
-                if os.environ.get('DEBUG'):
-                    logging.info(
-                        f'MSG TYPE: {msg_type.upper()} DONE:{execution_done}\nCONTENT: {msg_dict["content"]}'
-                    )
-
-                if msg_type == 'error':
-                    traceback = '\n'.join(msg_dict['content']['traceback'])
-                    outputs.append({'type': 'text', 'content': traceback})
-                    execution_done = True
-                elif msg_type == 'stream':
-                    outputs.append(
-                        {'type': 'text', 'content': msg_dict['content']['text']}
-                    )
-                elif msg_type in ['execute_result', 'display_data']:
-                    outputs.append(
-                        {
-                            'type': 'text',
-                            'content': msg_dict['content']['data']['text/plain'],
-                        }
-                    )
-                    if 'image/png' in msg_dict['content']['data']:
-                        # Store image data in structured format
-                        image_url = f'data:image/png;base64,{msg_dict["content"]["data"]["image/png"]}'
-                        outputs.append({'type': 'image', 'content': image_url})
-
-                elif msg_type == 'execute_reply':
-                    execution_done = True
-            return execution_done
-
-        async def interrupt_kernel() -> None:
-            client = AsyncHTTPClient()
-            if self.kernel_id is None:
-                return
-            interrupt_response = await client.fetch(
-                f'{self.base_url}/api/kernels/{self.kernel_id}/interrupt',
-                method='POST',
-                body=json_encode({'kernel_id': self.kernel_id}),
-            )
-            logging.info(f'Kernel interrupted: {interrupt_response}')
+            nonlocal msg_id, queue, status
+            for attempt in range(self.ABORTED_RETRIES + 1):
+                outputs.clear()
+                msg_id = uuid4().hex
+                queue = self.router.register(msg_id)
+                await self._send_execute_request(code, msg_id)
+                logging.info(f'Executed code in jupyter kernel, msg_id {msg_id}')
+                reply = await wait_for_execution(queue, outputs, on_output)
+                status = reply.get('status', 'ok')
+                if status != 'aborted':
+                    break
+                # Right after an interrupted cell the kernel still drops queued
+                # requests without running them, so it is safe to send it again
+                self.router.unregister(msg_id)
+                await asyncio.sleep(0.05 * (attempt + 1))
+            return True
 
+        self.execution_count += 1
         try:
             execution_done = await asyncio.wait_for(wait_for_messages(), timeout)
         except asyncio.TimeoutError:
-            await interrupt_kernel()
-            return {'text': f'[Execution timed out ({timeout} seconds).]', 'images': []}
-
-        # Process structured outputs
-        text_outputs = []
-        image_outputs = []
-
-        for output in outputs:
-            if output['type'] == 'text':
-                text_outputs.append(output['content'])
-            elif output['type'] == 'image':
-                image_outputs.append(output['content'])
-
-        if not text_outputs and execution_done:
-            text_content = '[Code executed successfully with no output]'
-        else:
-            text_content = ''.join(text_outputs)
-
-        # Remove ANSI from text content
-        text_content = strip_ansi(text_content)
+            await self.interrupt()
+            # Requests sent before the interrupted cell has replied get aborted
+            # by the kernel, so wait for that reply before returning
+            if queue is not None:
+                try:
+                    await asyncio.wait_for(wait_for_execution(queue, []), 5)
+                except (asyncio.TimeoutError, ConnectionRefusedError, KernelDiedError):
+                    logging.warning('Jupyter kernel did not reply after interrupt')
+            return {'text': f'[Execution timed out ({timeout} seconds).]', 'images': [], 'status': 'timeout'}
+        finally:
+            self.router.unregister(msg_id)
+            outputs.close()
+
+        # 'ok' or 'error' from the execute_reply
+        return {**format_outputs(outputs, execution_done), 'status': status}
+
+    async def evaluate(self, expressions: dict[str, str], timeout: float = 30) -> dict:
+        """Evaluate `user_expressions` in a silent execute request.
+
+        Nothing is added to the history or the execution count. Returns the
+        reply's `user_expressions` (one `{'status', 'data', ...}` per name).
+        """
+        if self.dead:
+            raise KernelDiedError('Kernel is dead')
+        await self._ensure_connected()
+        msg_id = uuid4().hex
+        queue = self.router.register(msg_id)
+        try:
+            await self._send_execute_request('', msg_id, silent=True, user_expressions=expressions)
+            reply = await asyncio.wait_for(wait_for_execution(queue, []), timeout)
+        finally:
+            self.router.unregister(msg_id)
+        return reply.get('user_expressions', {})
 
-        # Return a dictionary with text content and image URLs
-        return {'text': text_content, 'images': image_outputs}
+    async def interrupt(self) -> None:
+        client = AsyncHTTPClient()
+        if self.kernel_id is None:
+            return
+        interrupt_response = await client.fetch(
+            f'{self.base_url}/api/kernels/{self.kernel_id}/interrupt',
+            method='POST',
+            body=json_encode({'kernel_id': self.kernel_id}),
+        )
+        logging.info(f'Kernel interrupted: {interrupt_response}')
 
     async def shutdown_async(self) -> None:
+        self._closing = True
+        if self.heartbeat_callback:
+            self.heartbeat_callback.stop()
+            self.heartbeat_callback = None
         if self.kernel_id:
             client = AsyncHTTPClient()
             await client.fetch(
@@ -264,9 +519,12 @@ class JupyterKernel:
                 method='DELETE',
             )
             self.kernel_id = None
-            if self.ws:
-                self.ws.close()
-                self.ws = None
+        if self.ws:
+            self.ws.close()
+            self.ws = None
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
 
 
 class ExecuteHandler(tornado.web.RequestHandler):
@@ -0,0 +1,96 @@
+"""Parallel fan-out of one code template over a list of inputs.
+
+Each input is bound to a variable (``item`` by default) in front of the
+template, and the resulting snippets are spread over a set of "lanes": the
+workers of the stateless pool, or temporary Jupyter kernels. A lane runs one
+snippet at a time and takes the next pending input when it is done; the
+results come back in input order, each with its status, output and timing.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Hashable
+
+# run_item(lane, index, item) -> {'status', 'output', 'image_urls'}
+RunItem = Callable[[Hashable, int, Any], Awaitable[dict]]
+
+
+class LaneFailed(Exception):
+    """Raised by `run_item` when its lane cannot run any more items.
+
+    The item becomes an error result and the lane is retired: the remaining
+    inputs go to the other lanes, or fail once no lane is left.
+    """
+
+
+def check_item_name(item_name: str) -> None:
+    if not item_name.isidentifier():
+        raise ValueError(f'Invalid item_name: {item_name!r}')
+
+
+def item_code(code: str, item: Any, item_name: str = 'item') -> str:
+    """The template `code` preceded by the assignment of `item` (JSON-serializable)."""
+    check_item_name(item_name)
+    return f'{item_name} = __import__("json").loads({json.dumps(item)!r})\n{code}'
+
+
+async def fan_out(inputs: list, run_item: RunItem, lanes: list[Hashable]) -> list[dict]:
+    """Run every input on the first free lane; results are in input order.
+
+    An exception raised by `run_item` becomes an error result for that input.
+    """
+    if not lanes:
+        raise ValueError('fan_out needs at least one lane')
+    free: asyncio.Queue = asyncio.Queue()
+    for lane in lanes:
+        free.put_nowait(lane)
+    live = len(lanes)
+
+    async def run(index: int, item: Any) -> dict:
+        nonlocal live
+        lane = await free.get()
+        start_time = time.monotonic()
+        if lane is None:
+            # Every lane failed; pass the marker on to the other waiting inputs
+            free.put_nowait(None)
+            result = {'status': 'error', 'output': 'Not run: every lane failed'}
+        else:
+            retire = False
+            try:
+                result = await run_item(lane, index, item)
+            except LaneFailed as e:
+                retire = True
+                result = {'status': 'error', 'output': str(e)}
+            except Exception as e:
+                result = {'status': 'error', 'output': f'{type(e).__name__}: {e}'}
+            finally:
+                if not retire:
+                    free.put_nowait(lane)
+                else:
+                    live -= 1
+                    if live == 0:
+                        free.put_nowait(None)
+        return {
+            'index': index,
+            'input': item,
+            'status': result['status'],
+            'output': result['output'],
+            'image_urls': result.get('image_urls') or None,
+            'duration_seconds': round(time.monotonic() - start_time, 3),
+        }
+
+    return list(await asyncio.gather(*(run(index, item) for index, item in enumerate(inputs))))
+
+
+def summarize(results: list[dict], lanes: int, backend: str, seconds: float) -> str:
+    """Observation text: a summary line, then each item's output under a header."""
+    failed = sum(1 for r in results if r['status'] != 'ok')
+    lines = [
+        f'Ran {len(results)} items on {lanes} {backend} in {seconds:.2f}s: '
+        f'{len(results) - failed} ok, {failed} failed'
+    ]
+    for result in results:
+        lines.append(f'--- [{result["index"]}] {result["status"]} ({result["duration_seconds"]:.2f}s) ---')
+        lines.append(result['output'].rstrip('\n'))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,106 @@
+"""Content-addressed storage for images produced by Jupyter cells.
+
+Instead of shipping every ``image/png`` output as a base64 data URL inside the
+observation, the PNG is written once to ``<root>/<sha256>.png`` and the
+observation references it by a short URL (``/images/<sha256>.png``). Identical
+images (e.g. a plot re-rendered without changes) are stored once. The store is
+bounded by ``max_bytes``; the least recently stored or re-used images are
+evicted first.
+"""
+
+import base64
+import hashlib
+import os
+import re
+import tempfile
+import threading
+
+DATA_URL_PREFIX = 'data:image/png;base64,'
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def default_image_dir() -> str:
+    return os.path.join(tempfile.gettempdir(), 'simple_openhands-images')
+
+
+class ImageStore:
+    def __init__(self, root: str | None = None, max_bytes: int = 256 * 1024 * 1024) -> None:
+        if max_bytes <= 0:
+            raise ValueError('max_bytes must be positive')
+        self.root = root or default_image_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._bytes = sum(size for _, size, _ in self._scan())
+        self.stored = 0
+        self.deduplicated = 0
+        self.evicted = 0
+
+    def _scan(self) -> list[tuple[float, int, str]]:
+        """(mtime, size, path) of every stored image."""
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith('.png') or not DIGEST_PATTERN.match(name[:-4]):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def path(self, digest: str) -> str:
+        """Path of the image with this digest; ValueError for malformed digests."""
+        if not DIGEST_PATTERN.match(digest):
+            raise ValueError(f'Invalid image digest: {digest!r}')
+        return os.path.join(self.root, f'{digest}.png')
+
+    def put(self, data: bytes) -> str:
+        """Store PNG bytes and return their sha256 digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        with self._lock:
+            if os.path.exists(path):
+                # Refresh mtime so re-used images are evicted last
+                os.utime(path)
+                self.deduplicated += 1
+                return digest
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._bytes += len(data)
+            self.stored += 1
+            if self._bytes > self.max_bytes:
+                self._evict(keep=path)
+        return digest
+
+    def put_data_url(self, url: str) -> str | None:
+        """Store a ``data:image/png;base64,`` URL; None for any other URL."""
+        if not url.startswith(DATA_URL_PREFIX):
+            return None
+        return self.put(base64.b64decode(url[len(DATA_URL_PREFIX):]))
+
+    def _evict(self, keep: str) -> None:
+        for _, size, path in sorted(self._scan()):
+            if self._bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._bytes -= size
+            self.evicted += 1
+
+    def stats(self) -> dict:
+        return {
+            'root': self.root,
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'stored': self.stored,
+            'deduplicated': self.deduplicated,
+            'evicted': self.evicted,
+        }
@@ -0,0 +1,154 @@
+"""Pool of pre-warmed Jupyter kernels, one kernel per session.
+
+Starting a kernel (process spawn, connection, ``%colors nocolor``) takes about a
+second, which the first Python cell of a session would otherwise pay. The pool
+keeps ``size`` initialized kernels idle, hands one to a session on its first
+cell, and starts a replacement in the background. Kernels are never reused
+across sessions: releasing a session shuts its kernel down and the pool is
+refilled with a fresh one.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable
+
+
+class KernelPool:
+    def __init__(self, kernel_factory: Callable[[], Any], size: int = 1) -> None:
+        if size < 0:
+            raise ValueError('Kernel pool size must be >= 0')
+        self.kernel_factory = kernel_factory
+        self.size = size
+        self._idle: list[Any] = []
+        self._assigned: dict[str, Any] = {}
+        self._starting = 0
+        self._tasks: set[asyncio.Task] = set()
+        self._session_locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._startup_seconds: deque[float] = deque(maxlen=100)
+        self._warmup_seconds: deque[float] = deque(maxlen=100)
+        self._closed = False
+        self.hits = 0  # sessions served by a pre-warmed kernel
+        self.misses = 0  # sessions that had to wait for a kernel to start
+        self.recycled = 0
+        self.failures = 0
+
+    async def _start_kernel(self) -> Any:
+        start_time = time.time()
+        kernel = self.kernel_factory()
+        try:
+            await kernel.initialize()
+        except BaseException:
+            # The process (or gateway kernel) may already be running; also on cancellation
+            try:
+                await kernel.shutdown_async()
+            except Exception as e:
+                logging.warning(f'Failed to shut down jupyter kernel after a failed start: {e}')
+            raise
+        self._startup_seconds.append(time.time() - start_time)
+        # Part of the startup spent in the kernel's warm-up profile
+        warmup_seconds = getattr(kernel, 'warmup_seconds', None)
+        if warmup_seconds is not None:
+            self._warmup_seconds.append(warmup_seconds)
+        return kernel
+
+    async def _warm_one(self) -> None:
+        try:
+            kernel = await self._start_kernel()
+        except Exception as e:
+            self.failures += 1
+            logging.error(f'Failed to pre-warm jupyter kernel: {e}')
+            return
+        finally:
+            self._starting -= 1
+        if self._closed:
+            await kernel.shutdown_async()
+        else:
+            self._idle.append(kernel)
+
+    def fill(self) -> None:
+        """Start kernels in the background until `size` are idle or starting."""
+        while not self._closed and len(self._idle) + self._starting < self.size:
+            self._starting += 1
+            task = asyncio.create_task(self._warm_one())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def get(self, session_id: str) -> Any | None:
+        """The kernel assigned to a session, if any."""
+        return self._assigned.get(session_id)
+
+    async def acquire(self, session_id: str) -> Any:
+        """Return the session's kernel, assigning a pre-warmed one on first use."""
+        async with self._session_locks[session_id]:
+            kernel = self._assigned.get(session_id)
+            if kernel is not None:
+                return kernel
+            if self._idle:
+                kernel = self._idle.pop(0)
+                self.hits += 1
+            else:
+                self.misses += 1
+                self._starting += 1
+                try:
+                    kernel = await self._start_kernel()
+                finally:
+                    self._starting -= 1
+            self._assigned[session_id] = kernel
+        self.fill()
+        return kernel
+
+    async def release(self, session_id: str) -> bool:
+        """Shut down the session's kernel and refill the pool."""
+        kernel = self._assigned.pop(session_id, None)
+        self._session_locks.pop(session_id, None)
+        if kernel is None:
+            return False
+        try:
+            await kernel.shutdown_async()
+        except Exception as e:
+            logging.warning(f'Failed to shut down jupyter kernel of session {session_id}: {e}')
+        self.recycled += 1
+        self.fill()
+        return True
+
+    async def shutdown(self) -> None:
+        self._closed = True
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        # Let kernels that were still starting shut themselves down
+        await asyncio.gather(*tasks, return_exceptions=True)
+        kernels = self._idle + list(self._assigned.values())
+        self._idle = []
+        self._assigned = {}
+        for kernel in kernels:
+            try:
+                await kernel.shutdown_async()
+            except Exception as e:
+                logging.warning(f'Failed to shut down jupyter kernel: {e}')
+
+    @staticmethod
+    def _summary(samples: deque[float]) -> dict:
+        values = list(samples)
+        return {
+            'last': round(values[-1], 3) if values else None,
+            'avg': round(sum(values) / len(values), 3) if values else None,
+            'max': round(max(values), 3) if values else None,
+        }
+
+    def stats(self) -> dict:
+        return {
+            'size': self.size,
+            'idle': len(self._idle),
+            'starting': self._starting,
+            'assigned': len(self._assigned),
+            'sessions': sorted(self._assigned),
+            'hits': self.hits,
+            'misses': self.misses,
+            'recycled': self.recycled,
+            'failures': self.failures,
+            'startup_seconds': self._summary(self._startup_seconds),
+            'warmup_seconds': self._summary(self._warmup_seconds),
+        }
@@ -0,0 +1,220 @@
+"""In-process kernel management with jupyter_client, without the kernel gateway.
+
+`LocalJupyterKernel` starts ipykernel as a child process through
+`AsyncKernelManager` and talks to it over ZMQ channels directly, saving the
+HTTP + WebSocket hops of the gateway path and its slow startup. With a
+`zygote.KernelZygote` the kernel is forked from a pre-initialized template
+process instead. It exposes the same interface as `execute_server.JupyterKernel`.
+"""
+
+import asyncio
+import logging
+import time
+from uuid import uuid4
+
+from jupyter_client.manager import AsyncKernelManager
+
+from .execute_server import KernelDiedError, OutputCallback, format_outputs, wait_for_execution
+from .message_router import MessageRouter
+from .output_buffer import CellOutputBuffer, OutputLimits
+from .warmup import WarmupProfile
+from .zygote import ForkedKernelManager, KernelZygote
+
+
+class LocalJupyterKernel:
+    # How often a request the kernel answered with status 'aborted' is re-sent
+    ABORTED_RETRIES = 3
+    # Seconds between liveness checks of the kernel process while a cell runs
+    LIVENESS_INTERVAL = 0.5
+
+    def __init__(
+        self,
+        convid: str,
+        kernel_name: str = 'python3',
+        cwd: str | None = None,
+        env: dict[str, str] | None = None,
+        output_limits: OutputLimits | None = None,
+        warmup: WarmupProfile | None = None,
+        zygote: KernelZygote | None = None,
+    ) -> None:
+        self.convid = convid
+        self.kernel_name = kernel_name
+        self.cwd = cwd
+        self.env = env
+        self.output_limits = output_limits
+        self.warmup = warmup
+        self.warmup_seconds: float | None = None
+        # Fork kernels from this template process instead of spawning them
+        self.zygote = zygote
+        self.kernel_manager: AsyncKernelManager | ForkedKernelManager | None = None
+        self.client = None
+        self.kernel_id: str | None = None
+        self.startup_seconds: float | None = None
+        self.initialized = False
+        # Cells run through execute() (store_history=False leaves the kernel's own counter alone)
+        self.execution_count = 0
+        self.router = MessageRouter()
+        self._reader_tasks: list[asyncio.Task] = []
+
+    async def start(self, timeout: float = 60) -> None:
+        """Start the kernel process and wait until it answers on the shell channel."""
+        start_time = time.time()
+        if self.zygote is not None:
+            try:
+                self.kernel_manager = ForkedKernelManager(self.zygote)
+                await self.kernel_manager.start_kernel(cwd=self.cwd)
+            except Exception as e:
+                logging.warning(f'Failed to fork jupyter kernel, spawning it instead: {e}')
+                self.kernel_manager = None
+        if self.kernel_manager is None:
+            self.kernel_manager = AsyncKernelManager(kernel_name=self.kernel_name)
+            kwargs = {}
+            if self.cwd:
+                kwargs['cwd'] = self.cwd
+            if self.env is not None:
+                kwargs['env'] = self.env
+            await self.kernel_manager.start_kernel(**kwargs)
+        self.kernel_id = uuid4().hex
+        self.client = self.kernel_manager.client()
+        self.client.start_channels()
+        if isinstance(self.kernel_manager, ForkedKernelManager):
+            await self.kernel_manager.wait_for_ready(self.client, timeout=timeout)
+        else:
+            await self.client.wait_for_ready(timeout=timeout)
+        # One reader per channel routes replies and outputs to their requests
+        self._reader_tasks = [
+            asyncio.create_task(self.router.pump(self.client.get_iopub_msg)),
+            asyncio.create_task(self.router.pump(self.client.get_shell_msg)),
+        ]
+        self.startup_seconds = time.time() - start_time
+        logging.info(
+            f'Local jupyter kernel for conversation {self.convid} ready in {self.startup_seconds:.2f}s'
+        )
+
+    async def initialize(self) -> None:
+        if self.client is None:
+            await self.start()
+        await self.execute(r'%colors nocolor')
+        start_time = time.time()
+        for cell in self.warmup.cells() if self.warmup else []:
+            result = await self.execute(cell)
+            logging.info(f'Warm-up cell ran in local jupyter kernel:\n{result["text"]}')
+        self.warmup_seconds = time.time() - start_time
+        self.initialized = True
+
+    async def execute(
+        self, code: str, timeout: int = 120, on_output: OutputCallback | None = None
+    ) -> dict[str, list[str] | str]:
+        if self.client is None:
+            await self.start()
+        assert self.client is not None
+
+        outputs = CellOutputBuffer(self.output_limits)
+        msg_id = ''
+        queue: asyncio.Queue | None = None
+        status = 'ok'
+
+        async def wait_for_messages() -> bool:
+            nonlocal msg_id, queue, status
+            for attempt in range(self.ABORTED_RETRIES + 1):
+                outputs.clear()
+                msg_id = self.client.execute(
+                    code, silent=False, store_history=False, allow_stdin=False
+                )
+                # Registered before yielding to the loop, so nothing is missed
+                queue = self.router.register(msg_id)
+                reply = await wait_for_execution(queue, outputs, on_output)
+                status = reply.get('status', 'ok')
+                if status != 'aborted':
+                    break
+                # Right after an interrupted cell the kernel still drops queued
+                # requests without running them, so it is safe to send it again
+                self.router.unregister(msg_id)
+                await asyncio.sleep(0.05 * (attempt + 1))
+            return True
+
+        async def watch_liveness() -> None:
+            # A killed kernel (e.g. by the OOM killer) never sends the reply
+            while True:
+                await asyncio.sleep(self.LIVENESS_INTERVAL)
+                if not await self.is_alive():
+                    self.router.fail_all(KernelDiedError('Kernel process exited'))
+                    return
+
+        if not await self.is_alive():
+            raise KernelDiedError('Kernel process exited')
+        self.execution_count += 1
+        watcher = asyncio.create_task(watch_liveness())
+        try:
+            execution_done = await asyncio.wait_for(wait_for_messages(), timeout)
+        except asyncio.TimeoutError:
+            await self.interrupt()
+            # Requests sent before the interrupted cell has replied get aborted
+            # by the kernel, so wait for that reply before returning
+            if queue is not None:
+                try:
+                    await asyncio.wait_for(wait_for_execution(queue, []), 5)
+                except (asyncio.TimeoutError, KernelDiedError):
+                    logging.warning('Local jupyter kernel did not reply after interrupt')
+            return {'text': f'[Execution timed out ({timeout} seconds).]', 'images': [], 'status': 'timeout'}
+        finally:
+            watcher.cancel()
+            self.router.unregister(msg_id)
+            outputs.close()
+        # 'ok' or 'error' from the execute_reply
+        return {**format_outputs(outputs, execution_done), 'status': status}
+
+    async def evaluate(self, expressions: dict[str, str], timeout: float = 30) -> dict:
+        """Evaluate `user_expressions` in a silent execute request.
+
+        Nothing is added to the history or the execution count. Returns the
+        reply's `user_expressions` (one `{'status', 'data', ...}` per name).
+        """
+        if self.client is None:
+            await self.start()
+        assert self.client is not None
+        if not await self.is_alive():
+            raise KernelDiedError('Kernel process exited')
+        msg_id = self.client.execute(
+            '', silent=True, store_history=False, user_expressions=expressions, allow_stdin=False
+        )
+        queue = self.router.register(msg_id)
+        try:
+            reply = await asyncio.wait_for(wait_for_execution(queue, []), timeout)
+        finally:
+            self.router.unregister(msg_id)
+        return reply.get('user_expressions', {})
+
+    @property
+    def forked(self) -> bool:
+        return isinstance(self.kernel_manager, ForkedKernelManager)
+
+    @property
+    def pid(self) -> int | None:
+        if isinstance(self.kernel_manager, ForkedKernelManager):
+            return self.kernel_manager.pid
+        provisioner = self.kernel_manager.provisioner if self.kernel_manager else None
+        return getattr(provisioner, 'pid', None)
+
+    async def is_alive(self) -> bool:
+        if self.kernel_manager is None:
+            return False
+        return await self.kernel_manager.is_alive()
+
+    async def interrupt(self) -> None:
+        if self.kernel_manager is not None:
+            await self.kernel_manager.interrupt_kernel()
+            logging.info('Local jupyter kernel interrupted')
+
+    async def shutdown_async(self) -> None:
+        for task in self._reader_tasks:
+            task.cancel()
+        self._reader_tasks = []
+        if self.client is not None:
+            self.client.stop_channels()
+            self.client = None
+        if self.kernel_manager is not None:
+            await self.kernel_manager.shutdown_kernel(now=True)
+            self.kernel_manager = None
+        self.kernel_id = None
+        self.initialized = False
@@ -0,0 +1,80 @@
+"""Routing of kernel messages to the requests waiting for them.
+
+A kernel connection carries the replies and outputs of every request sent on
+it. Instead of each `execute()` reading the connection itself (and discarding
+messages that belong to other requests), one reader task per connection hands
+every message to `MessageRouter.dispatch`, which puts it on the queue
+registered for its `parent_header.msg_id`. Concurrent executions on the same
+kernel therefore each see exactly their own messages.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+
+class KernelDiedError(RuntimeError):
+    """The kernel process died or was restarted; its state is gone."""
+
+
+class MessageRouter:
+    # Kernel-wide status broadcasts (no parent request) that mean the kernel
+    # lost its state
+    LOST_STATES = frozenset({'restarting', 'autorestarting', 'dead'})
+
+    def __init__(self) -> None:
+        self._queues: dict[str, asyncio.Queue] = {}
+        self.dropped = 0  # messages whose request was not (or no longer) registered
+        # Called with the execution_state of a LOST_STATES broadcast
+        self.on_kernel_lost: Callable[[str], None] | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._queues)
+
+    def register(self, msg_id: str) -> asyncio.Queue:
+        """Create the queue receiving the messages of request `msg_id`.
+
+        Must be called before the request is sent so no message is missed.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._queues[msg_id] = queue
+        return queue
+
+    def unregister(self, msg_id: str) -> None:
+        self._queues.pop(msg_id, None)
+
+    def dispatch(self, msg: dict) -> None:
+        parent_msg_id = (msg.get('parent_header') or {}).get('msg_id')
+        if parent_msg_id is None and msg.get('msg_type') == 'status':
+            state = msg.get('content', {}).get('execution_state')
+            if state in self.LOST_STATES and self.on_kernel_lost is not None:
+                self.on_kernel_lost(state)
+                return
+        queue = self._queues.get(parent_msg_id)
+        if queue is None:
+            self.dropped += 1
+            return
+        queue.put_nowait(msg)
+
+    def fail_all(self, error: BaseException) -> None:
+        """Wake every pending request with `error` (e.g. the connection is gone)."""
+        for queue in self._queues.values():
+            queue.put_nowait(error)
+
+    async def pump(self, read_message: Callable[[], Awaitable[dict | None]]) -> None:
+        """Dispatch messages from `read_message` until it returns None."""
+        while True:
+            try:
+                msg = await read_message()
+            except Exception as e:
+                # Without a reader no reply can arrive: fail the waiting requests now
+                logging.error(f'Reading kernel messages failed: {type(e).__name__}: {e}')
+                self.fail_all(KernelDiedError(f'Lost the kernel connection: {type(e).__name__}: {e}'))
+                return
+            if msg is None:
+                return
+            try:
+                self.dispatch(msg)
+            except Exception as e:
+                logging.warning(f'Failed to route kernel message: {e}')
@@ -0,0 +1,125 @@
+"""Memory inspection of a kernel's user namespace.
+
+The inspection runs as a `user_expressions` entry of a silent execute
+request: the kernel evaluates one expression and nothing is bound in the user
+namespace, added to the history or counted as an execution. The expression
+``exec``s `INSPECT_SOURCE` in a private dict, so the helper never becomes
+visible to the user's code.
+
+Sizes are approximate: each variable's object graph is walked (containers,
+instance ``__dict__``/``__slots__``) summing ``sys.getsizeof``, with numpy
+arrays counted by ``nbytes`` and pandas objects by ``memory_usage(deep=True)``.
+Modules, classes and functions reached from a variable are not descended
+into, and an object shared by two variables is counted for both. The walk
+stops after `max_objects` objects per variable (``complete`` is then False).
+"""
+
+import ast
+import json
+
+DEFAULT_MAX_OBJECTS = 100_000
+
+INSPECT_SOURCE = r'''
+def inspect(shell, max_objects):
+    import json
+    import sys
+    import types
+
+    opaque = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+    def type_name(obj):
+        cls = type(obj)
+        module = cls.__module__
+        return cls.__qualname__ if module == 'builtins' else f'{module}.{cls.__qualname__}'
+
+    def shape(obj):
+        value = getattr(obj, 'shape', None)
+        if isinstance(value, tuple) and all(isinstance(n, int) for n in value):
+            return list(value)
+        if isinstance(obj, (str, bytes, bytearray, list, tuple, dict, set, frozenset)):
+            return [len(obj)]
+        return None
+
+    def deep_size(root):
+        seen = set()
+        stack = [root]
+        total = 0
+        while stack:
+            obj = stack.pop()
+            if id(obj) in seen:
+                continue
+            if len(seen) >= max_objects:
+                return total, False
+            seen.add(id(obj))
+            module = type(obj).__module__
+            if module.startswith('pandas') and callable(getattr(obj, 'memory_usage', None)):
+                try:
+                    usage = obj.memory_usage(deep=True)
+                    total += int(usage.sum() if hasattr(usage, 'sum') else usage)
+                    continue
+                except Exception:
+                    pass
+            try:
+                size = sys.getsizeof(obj)
+            except Exception:
+                size = 0
+            if module.startswith('numpy') and isinstance(getattr(obj, 'nbytes', None), int):
+                # Views do not include the data they reference in getsizeof
+                size = max(size, obj.nbytes)
+                total += size
+                continue
+            total += size
+            if obj is not root and isinstance(obj, opaque):
+                continue
+            if isinstance(obj, dict):
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                stack.extend(obj)
+            elif not isinstance(obj, (str, bytes, bytearray, int, float, complex, bool) + opaque):
+                attributes = getattr(obj, '__dict__', None)
+                if isinstance(attributes, dict):
+                    stack.append(attributes)
+                for slot in getattr(type(obj), '__slots__', ()):
+                    if isinstance(slot, str) and hasattr(obj, slot):
+                        stack.append(getattr(obj, slot))
+        return total, True
+
+    hidden = getattr(shell, 'user_ns_hidden', {})
+    variables = []
+    for name, value in list(shell.user_ns.items()):
+        if name.startswith('_') or isinstance(value, types.ModuleType):
+            continue
+        if name in hidden and hidden[name] is value:
+            continue
+        size, complete = deep_size(value)
+        variables.append(
+            {
+                'name': name,
+                'type': type_name(value),
+                'shape': shape(value),
+                'size': size,
+                'complete': complete,
+            }
+        )
+    variables.sort(key=lambda v: v['size'], reverse=True)
+    return json.dumps({'execution_count': shell.execution_count, 'variables': variables})
+'''
+
+
+def inspect_expression(max_objects: int = DEFAULT_MAX_OBJECTS) -> str:
+    """The user expression that evaluates to the JSON inspection report."""
+    return (
+        '(lambda ns: (exec(ns.pop("source"), ns), ns["inspect"](get_ipython(), '
+        f'{int(max_objects)}))[1])({{"source": {INSPECT_SOURCE!r}}})'
+    )
+
+
+def parse_inspection(result: dict) -> dict:
+    """Decode the `user_expressions` entry returned for `inspect_expression`."""
+    if result.get('status') != 'ok':
+        raise RuntimeError(
+            f'Namespace inspection failed: {result.get("ename")}: {result.get("evalue")}'
+        )
+    # The expression's value is a str, so its text/plain repr is a string literal
+    return json.loads(ast.literal_eval(result['data']['text/plain']))
@@ -0,0 +1,214 @@
+"""Bounded buffering of the outputs of one Jupyter cell.
+
+A cell that prints a huge DataFrame or logs in a loop for minutes would
+otherwise keep every chunk in memory until it finishes. `CellOutputBuffer`
+keeps the first `head_bytes` and the last `tail_bytes` of text output. Once
+the head is full, the complete text (head included) is also written to a
+spill file so nothing is lost, and the dropped middle part is replaced by a
+truncation marker. Images beyond `max_image_bytes` are dropped.
+
+The buffer supports the list operations `collect_output` and `format_outputs`
+use (`append`, `clear`, iteration), so it can stand in for the outputs list.
+"""
+
+import logging
+import os
+import tempfile
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Iterator
+from uuid import uuid4
+
+
+def _default_spill_dir() -> str:
+    return os.path.join(tempfile.gettempdir(), 'simple_openhands-jupyter-output')
+
+
+@dataclass
+class OutputLimits:
+    head_bytes: int = 128 * 1024
+    tail_bytes: int = 128 * 1024
+    max_image_bytes: int = 16 * 1024 * 1024
+    # None disables spilling; the dropped text is then only counted
+    spill_dir: str | None = field(default_factory=_default_spill_dir)
+    # Older spill files are deleted so the directory stays bounded
+    max_spill_files: int = 20
+
+    def __post_init__(self) -> None:
+        if self.head_bytes < 0 or self.tail_bytes < 0 or self.max_image_bytes < 0:
+            raise ValueError('Output limits must be >= 0')
+
+    @classmethod
+    def from_env(cls) -> 'OutputLimits':
+        """Limits from JUPYTER_OUTPUT_{HEAD,TAIL,MAX_IMAGE}_BYTES and JUPYTER_OUTPUT_SPILL_DIR
+        (an empty JUPYTER_OUTPUT_SPILL_DIR disables spilling)."""
+        limits = cls()
+        for name in ('head_bytes', 'tail_bytes', 'max_image_bytes'):
+            value = os.environ.get(f'JUPYTER_OUTPUT_{name.upper()}')
+            if value:
+                setattr(limits, name, int(value))
+        spill_dir = os.environ.get('JUPYTER_OUTPUT_SPILL_DIR')
+        if spill_dir is not None:
+            limits.spill_dir = spill_dir or None
+        limits.__post_init__()
+        return limits
+
+
+class CellOutputBuffer:
+    def __init__(self, limits: OutputLimits | None = None) -> None:
+        self.limits = limits or OutputLimits()
+        self._spill_file = None
+        self.spill_path: str | None = None
+        self.clear()
+
+    def clear(self) -> None:
+        self._head: list[dict] = []
+        self._head_bytes = 0
+        self._tail: deque[str] = deque()
+        self._tail_bytes = 0
+        self._images: list[dict] = []
+        self._image_bytes = 0
+        self.total_bytes = 0
+        self.dropped_bytes = 0
+        self.dropped_images = 0
+        self._remove_spill_file()
+
+    @property
+    def truncated(self) -> bool:
+        return self.dropped_bytes > 0 or self.dropped_images > 0
+
+    def append(self, output: dict) -> None:
+        if output['type'] == 'image':
+            self._append_image(output)
+        else:
+            self._append_text(output['content'])
+
+    def _append_image(self, output: dict) -> None:
+        size = len(output['content'])
+        if self._image_bytes + size > self.limits.max_image_bytes:
+            self.dropped_images += 1
+            return
+        self._image_bytes += size
+        self._images.append(output)
+
+    def _append_text(self, text: str) -> None:
+        data = text.encode('utf-8', errors='replace')
+        self.total_bytes += len(data)
+        room = self.limits.head_bytes - self._head_bytes
+        if not self._tail and len(data) <= room:
+            self._head.append({'type': 'text', 'content': text})
+            self._head_bytes += len(data)
+            return
+        if not self._tail and room > 0:
+            # Fill the head up to its budget; the rest continues in the tail
+            self._head.append({'type': 'text', 'content': data[:room].decode('utf-8', errors='ignore')})
+            self._head_bytes += room
+            self._spill_head()
+            self._spill(data[room:])
+            data = data[room:]
+        else:
+            self._spill_head()
+            self._spill(data)
+        self._tail.append(data.decode('utf-8', errors='ignore'))
+        self._tail_bytes += len(data)
+        self._trim_tail()
+
+    def _trim_tail(self) -> None:
+        while self._tail_bytes > self.limits.tail_bytes and self._tail:
+            excess = self._tail_bytes - self.limits.tail_bytes
+            first = self._tail[0].encode('utf-8', errors='replace')
+            if len(first) <= excess:
+                self._tail.popleft()
+                self._tail_bytes -= len(first)
+                self.dropped_bytes += len(first)
+            else:
+                self._tail[0] = first[excess:].decode('utf-8', errors='ignore')
+                self._tail_bytes -= excess
+                self.dropped_bytes += excess
+
+    def _spill_head(self) -> None:
+        if not self.limits.spill_dir or self._spill_file is not None:
+            return
+        try:
+            os.makedirs(self.limits.spill_dir, exist_ok=True)
+            self.spill_path = os.path.join(self.limits.spill_dir, f'cell-{uuid4().hex}.txt')
+            self._spill_file = open(self.spill_path, 'wb')
+            for output in self._head:
+                self._spill_file.write(output['content'].encode('utf-8', errors='replace'))
+        except OSError as e:
+            logging.warning(f'Failed to create jupyter output spill file: {e}')
+            self._remove_spill_file()
+            return
+        self._prune_spill_dir()
+
+    def _spill(self, data: bytes) -> None:
+        if self._spill_file is None:
+            return
+        try:
+            self._spill_file.write(data)
+        except OSError as e:
+            logging.warning(f'Failed to write jupyter output spill file: {e}')
+
+    def _prune_spill_dir(self) -> None:
+        spill_dir = self.limits.spill_dir
+        assert spill_dir is not None
+        files = []
+        for name in os.listdir(spill_dir):
+            if name.startswith('cell-') and name.endswith('.txt'):
+                path = os.path.join(spill_dir, name)
+                try:
+                    files.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass  # removed concurrently by another cell
+        files.sort()
+        for _, path in files[: max(0, len(files) - self.limits.max_spill_files)]:
+            if path != self.spill_path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _remove_spill_file(self) -> None:
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+        if self.spill_path:
+            try:
+                os.remove(self.spill_path)
+            except OSError:
+                pass
+            self.spill_path = None
+
+    def close(self) -> None:
+        """Flush the spill file; call once the cell has finished."""
+        if not self.dropped_bytes:
+            # Everything fit into head + tail, the spill file adds nothing
+            self._remove_spill_file()
+        elif self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def marker(self) -> str:
+        text = f'[... {self.dropped_bytes} bytes of output truncated'
+        if self.spill_path:
+            text += f'; full output saved to {self.spill_path}'
+        return f'\n{text} ...]\n'
+
+    def __iter__(self) -> Iterator[dict]:
+        yield from self._head
+        if self.dropped_bytes:
+            yield {'type': 'text', 'content': self.marker()}
+        if self._tail:
+            yield {'type': 'text', 'content': ''.join(self._tail)}
+        yield from self._images
+
+    def __len__(self) -> int:
+        return len(self._head) + len(self._tail) + len(self._images)
+
+    def stats(self) -> dict:
+        return {
+            'total_bytes': self.total_bytes,
+            'dropped_bytes': self.dropped_bytes,
+            'dropped_images': self.dropped_images,
+            'spill_path': self.spill_path,
+        }
@@ -0,0 +1,142 @@
+"""Resource accounting for Jupyter kernel processes.
+
+Each cell is metered by sampling the kernel process (and any processes it
+spawned) before, during and after the execution: wall-clock duration, CPU
+seconds, and RSS before/after/peak. While the cell runs, the sampler also
+enforces an optional RSS ceiling so a runaway cell is interrupted or its
+kernel restarted before it takes down the machine.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import psutil
+
+MB = 1024 * 1024
+
+
+@dataclass
+class ResourceLimits:
+    # 0 disables the ceiling
+    max_rss_bytes: int = 0
+    # 'interrupt' raises KeyboardInterrupt in the cell, 'restart' kills the kernel
+    on_exceeded: str = 'restart'
+    sample_interval: float = 0.5
+    # Cells kept in the per-session resource history
+    history_size: int = 100
+
+    ACTIONS = ('interrupt', 'restart')
+
+    def __post_init__(self) -> None:
+        if self.on_exceeded not in self.ACTIONS:
+            raise ValueError(f'Invalid RSS limit action: {self.on_exceeded}. Expected one of {self.ACTIONS}.')
+        if self.max_rss_bytes < 0 or self.sample_interval <= 0 or self.history_size < 0:
+            raise ValueError('Resource limits must be positive')
+
+    @classmethod
+    def from_env(cls) -> 'ResourceLimits':
+        """Limits from JUPYTER_KERNEL_MAX_RSS_MB, JUPYTER_KERNEL_RSS_ACTION,
+        JUPYTER_RESOURCE_SAMPLE_INTERVAL and JUPYTER_RESOURCE_HISTORY_SIZE."""
+        limits = cls()
+        limits.max_rss_bytes = int(float(os.environ.get('JUPYTER_KERNEL_MAX_RSS_MB', '0')) * MB)
+        limits.on_exceeded = os.environ.get('JUPYTER_KERNEL_RSS_ACTION', limits.on_exceeded)
+        limits.sample_interval = float(os.environ.get('JUPYTER_RESOURCE_SAMPLE_INTERVAL', limits.sample_interval))
+        limits.history_size = int(os.environ.get('JUPYTER_RESOURCE_HISTORY_SIZE', limits.history_size))
+        limits.__post_init__()
+        return limits
+
+
+def process_usage(pid: int) -> tuple[int, float] | None:
+    """(RSS bytes, CPU seconds) of a process and its children; None if it is gone."""
+    try:
+        parent = psutil.Process(pid)
+        processes = [parent, *parent.children(recursive=True)]
+    except psutil.NoSuchProcess:
+        return None
+    rss = 0
+    cpu_seconds = 0.0
+    for proc in processes:
+        try:
+            with proc.oneshot():
+                rss += proc.memory_info().rss
+                cpu = proc.cpu_times()
+                cpu_seconds += cpu.user + cpu.system
+        except psutil.NoSuchProcess:
+            continue  # exited between listing and sampling
+    return rss, cpu_seconds
+
+
+class CellResourceMeter:
+    """Meters one cell; `on_exceeded` is called once if RSS crosses the ceiling."""
+
+    def __init__(
+        self,
+        pid: int | None,
+        limits: ResourceLimits,
+        on_exceeded: Callable[[int], None] | None = None,
+    ) -> None:
+        self.pid = pid
+        self.limits = limits
+        self.on_exceeded = on_exceeded
+        self.exceeded = False
+        self._start_time = 0.0
+        self._before: tuple[int, float] | None = None
+        self._peak_rss = 0
+        self._task: asyncio.Task | None = None
+
+    def _sample(self) -> tuple[int, float] | None:
+        if self.pid is None:
+            return None
+        usage = process_usage(self.pid)
+        if usage is not None:
+            self._peak_rss = max(self._peak_rss, usage[0])
+            if (
+                self.limits.max_rss_bytes
+                and usage[0] > self.limits.max_rss_bytes
+                and not self.exceeded
+            ):
+                self.exceeded = True
+                if self.on_exceeded is not None:
+                    self.on_exceeded(usage[0])
+        return usage
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.limits.sample_interval)
+            try:
+                self._sample()
+            except Exception as e:
+                logging.warning(f'Failed to sample jupyter kernel resources: {e}')
+
+    def start(self) -> None:
+        self._start_time = time.monotonic()
+        self._before = self._sample()
+        if self._before is not None:
+            self._task = asyncio.create_task(self._watch())
+
+    def stop(self) -> dict:
+        """Stop sampling and return the cell's resource record."""
+        if self._task is not None:
+            self._task.cancel()
+        record: dict = {
+            'timestamp': time.time(),
+            'duration_seconds': round(time.monotonic() - self._start_time, 3),
+        }
+        after = self._sample() if self._before is not None else None
+        if self._before is not None and after is not None:
+            record.update(
+                {
+                    'cpu_seconds': round(after[1] - self._before[1], 3),
+                    'rss_before': self._before[0],
+                    'rss_after': after[0],
+                    'rss_delta': after[0] - self._before[0],
+                    'rss_peak': self._peak_rss,
+                }
+            )
+        if self.exceeded:
+            record['rss_limit_exceeded'] = True
+        return record
@@ -0,0 +1,50 @@
+"""Warm-up profile run in every kernel before it serves its first cell.
+
+Importing agentskills (~1s) or libraries like pandas otherwise happens in the
+first user cell that needs them. The profile preloads modules into
+``sys.modules`` without binding names in the user namespace, so a later
+``import pandas`` is a dictionary lookup, and can run additional setup code.
+Kernels from the pool are warmed up before they are handed to a session.
+"""
+
+import os
+from dataclasses import dataclass, field
+
+DEFAULT_WARMUP_MODULES = ['simple_openhands.plugins.agent_skills.agentskills']
+
+
+@dataclass
+class WarmupProfile:
+    modules: list[str] = field(default_factory=lambda: list(DEFAULT_WARMUP_MODULES))
+    code: str = ''
+
+    @classmethod
+    def from_env(cls) -> 'WarmupProfile':
+        """Profile from JUPYTER_WARMUP_MODULES (comma-separated, empty for none)
+        and JUPYTER_WARMUP_CODE."""
+        profile = cls()
+        modules = os.environ.get('JUPYTER_WARMUP_MODULES')
+        if modules is not None:
+            profile.modules = [m.strip() for m in modules.split(',') if m.strip()]
+        profile.code = os.environ.get('JUPYTER_WARMUP_CODE', '')
+        return profile
+
+    def cells(self) -> list[str]:
+        """Code cells to execute, in order."""
+        cells = []
+        if self.modules:
+            # A module that fails to import is reported but does not stop the warm-up
+            cells.append(
+                'def __warmup(names):\n'
+                '    import importlib\n'
+                '    for name in names:\n'
+                '        try:\n'
+                '            importlib.import_module(name)\n'
+                '        except Exception as e:\n'
+                "            print(f'warm-up import of {name} failed: {e!r}')\n"
+                f'__warmup({self.modules!r})\n'
+                'del __warmup'
+            )
+        if self.code.strip():
+            cells.append(self.code)
+        return cells
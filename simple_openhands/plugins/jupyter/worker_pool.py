@@ -0,0 +1,197 @@
+"""Stateless Python execution in pre-forked worker processes.
+
+An alternative to the Jupyter kernels for one-off snippets that need no state
+from earlier cells: `StatelessWorkerPool` runs `worker_server.py`, which
+keeps a few workers forked from a process that already imported the
+preloaded modules. Dispatching a snippet is a Unix socket round trip, every
+snippet gets a fresh process (the worker exits afterwards and is replaced in
+the background), and snippets run in parallel on up to `size` cores.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from collections import deque
+
+from .execute_server import retry_with_backoff
+from .output_buffer import OutputLimits
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'worker_server.py')
+
+DEFAULT_WORKER_MODULES = ['matplotlib.pyplot']
+DEFAULT_TIMEOUT = 120
+# Seconds past the job's own timeout before the worker is killed from outside
+KILL_GRACE = 5
+# A result line carries the (already truncated) output and the images
+READ_LIMIT = 128 * 1024 * 1024
+
+
+class StatelessWorkerPool:
+    def __init__(
+        self,
+        size: int,
+        modules: list[str] | None = None,
+        cwd: str | None = None,
+        env: dict[str, str] | None = None,
+        output_limits: OutputLimits | None = None,
+        python: str = sys.executable,
+    ) -> None:
+        if size < 1:
+            raise ValueError(f'Invalid worker pool size: {size}. Must be >= 1.')
+        self.size = size
+        self.modules = list(DEFAULT_WORKER_MODULES) if modules is None else modules
+        self.cwd = cwd
+        self.env = env
+        self.output_limits = output_limits or OutputLimits()
+        self.python = python
+        self.process: asyncio.subprocess.Process | None = None
+        self.socket_path: str | None = None
+        self.ready_seconds: float | None = None
+        self.jobs = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.running = 0
+        self._dispatch_seconds: deque[float] = deque(maxlen=100)
+
+    @classmethod
+    def from_env(cls, cwd: str | None = None) -> 'StatelessWorkerPool':
+        """Pool sized by PYTHON_WORKER_POOL_SIZE (default: number of CPUs) that preloads
+        PYTHON_WORKER_MODULES (comma-separated, default matplotlib.pyplot)."""
+        size = int(os.environ.get('PYTHON_WORKER_POOL_SIZE') or os.cpu_count() or 1)
+        modules = os.environ.get('PYTHON_WORKER_MODULES')
+        return cls(
+            size,
+            modules=[m.strip() for m in modules.split(',') if m.strip()] if modules is not None else None,
+            cwd=cwd,
+            env={**os.environ, 'MPLBACKEND': 'Agg'},
+            output_limits=OutputLimits.from_env(),
+        )
+
+    async def start(self, timeout: float = 60) -> None:
+        """Start the worker server and wait until its workers accept requests."""
+        start_time = time.monotonic()
+        self._socket_dir = tempfile.mkdtemp(prefix='simple_openhands-workers-')
+        self.socket_path = os.path.join(self._socket_dir, 'workers.sock')
+        self.process = await asyncio.create_subprocess_exec(
+            self.python,
+            SERVER_SCRIPT,
+            self.socket_path,
+            str(self.size),
+            *self.modules,
+            stdin=asyncio.subprocess.PIPE,
+            cwd=self.cwd,
+            env=self.env,
+        )
+
+        async def probe() -> None:
+            if self.process.returncode is not None:
+                raise RuntimeError(f'Python worker server exited with code {self.process.returncode}')
+            reader, writer = await asyncio.open_unix_connection(self.socket_path)
+            try:
+                # Answered by a worker, i.e. after preloading; it then exits and is replaced
+                await reader.readline()
+            finally:
+                writer.close()
+
+        await retry_with_backoff(probe, timeout)
+        self.ready_seconds = time.monotonic() - start_time
+        logging.info(f'Python worker pool of {self.size} ready in {self.ready_seconds:.2f}s (preloaded {self.modules})')
+
+    async def run(self, code: str, timeout: float | None = None, cwd: str | None = None) -> dict:
+        """Run `code` in a fresh worker.
+
+        Returns `status` ('ok', 'error' or 'timeout'), `output` (stdout and
+        stderr, truncated like a Jupyter cell's), `images` (PNG data URLs of
+        the matplotlib figures left open), `duration_seconds`, `cpu_seconds`
+        and `rss_peak`.
+        """
+        if self.process is None or self.process.returncode is not None:
+            raise RuntimeError('Python worker pool is not running')
+        timeout = timeout or DEFAULT_TIMEOUT
+        start_time = time.monotonic()
+        self.running += 1
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.socket_path, limit=READ_LIMIT)
+            try:
+                pid = json.loads(await reader.readline() or b'{}').get('pid')
+                if pid is None:
+                    raise RuntimeError('Python worker exited before accepting the request')
+                self._dispatch_seconds.append(time.monotonic() - start_time)
+                request = {
+                    'code': code,
+                    'timeout': timeout,
+                    'cwd': cwd or self.cwd,
+                    'head_bytes': self.output_limits.head_bytes,
+                    'tail_bytes': self.output_limits.tail_bytes,
+                    'max_image_bytes': self.output_limits.max_image_bytes,
+                }
+                writer.write((json.dumps(request) + '\n').encode())
+                await writer.drain()
+                timed_out = False
+                try:
+                    line = await asyncio.wait_for(reader.readline(), timeout + KILL_GRACE)
+                except asyncio.TimeoutError:
+                    line = b''
+                    timed_out = True
+                    # Stuck where the alarm cannot interrupt it (e.g. in C code)
+                    try:
+                        os.killpg(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+            finally:
+                writer.close()
+        finally:
+            self.running -= 1
+        self.jobs += 1
+        if not line:
+            if timed_out:
+                self.timeouts += 1
+                status, output = 'timeout', f'Execution timed out after {timeout} seconds; the worker was killed'
+            else:
+                self.errors += 1
+                status, output = 'error', 'The Python worker exited without returning a result'
+            return {
+                'status': status,
+                'output': output,
+                'images': [],
+                'duration_seconds': round(time.monotonic() - start_time, 3),
+            }
+        result = json.loads(line)
+        if result['status'] == 'timeout':
+            self.timeouts += 1
+        elif result['status'] == 'error':
+            self.errors += 1
+        return result
+
+    async def shutdown(self) -> None:
+        if self.process is not None and self.process.returncode is None:
+            # Closing stdin tells the server to exit; it kills its workers
+            if self.process.stdin is not None:
+                self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), 5)
+            except asyncio.TimeoutError:
+                self.process.kill()
+        if getattr(self, '_socket_dir', None):
+            shutil.rmtree(self._socket_dir, ignore_errors=True)
+
+    def stats(self) -> dict:
+        dispatch_seconds = list(self._dispatch_seconds)
+        return {
+            'pid': self.process.pid if self.process is not None else None,
+            'alive': self.process is not None and self.process.returncode is None,
+            'size': self.size,
+            'modules': self.modules,
+            'ready_seconds': round(self.ready_seconds, 3) if self.ready_seconds is not None else None,
+            'running': self.running,
+            'jobs': self.jobs,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'dispatch_ms_avg': round(sum(dispatch_seconds) / len(dispatch_seconds) * 1000, 2) if dispatch_seconds else None,
+        }
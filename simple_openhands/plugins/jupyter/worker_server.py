@@ -0,0 +1,235 @@
+"""Pre-forked worker processes for stateless Python execution.
+
+Run as a script, like `zygote_server.py`:
+
+    python worker_server.py SOCKET_PATH WORKERS [MODULE ...]
+
+The server imports the given modules once and then keeps WORKERS forked
+children blocked in ``accept()`` on a Unix socket. A client connects and is
+served by whichever worker accepts: the worker answers ``{"pid": ...}``,
+reads one JSON request ``{"code", "timeout", "cwd", "head_bytes",
+"tail_bytes", "max_image_bytes"}``, runs the code in a fresh namespace with stdout/stderr
+captured, answers with the result and exits. The server forks a replacement
+right away, so no state survives from one request to the next and requests
+are served in parallel by up to WORKERS processes.
+
+Like a notebook cell, the value of a trailing expression is printed, and
+open matplotlib figures are returned as PNG data URLs.
+
+The server uses only the standard library itself and exits (killing its idle
+workers) when its stdin is closed.
+"""
+
+import ast
+import base64
+import gc
+import importlib
+import io
+import json
+import os
+import resource
+import select
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+
+
+def preload(modules: list[str]) -> None:
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ModuleNotFoundError:
+            pass  # optional, e.g. matplotlib is not installed
+        except Exception as e:
+            print(f'worker: preloading {name} failed: {e!r}', file=sys.stderr, flush=True)
+
+
+def execute(code: str, namespace: dict) -> None:
+    """Run `code`, printing the value of a trailing expression."""
+    tree = ast.parse(code, '<cell>', 'exec')
+    last = None
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        last = ast.Expression(tree.body.pop().value)
+    exec(compile(tree, '<cell>', 'exec'), namespace)
+    if last is not None:
+        value = eval(compile(last, '<cell>', 'eval'), namespace)
+        if value is not None:
+            print(repr(value))
+
+
+def capture_figures(max_bytes: int) -> list[str]:
+    """Open matplotlib figures as PNG data URLs, up to `max_bytes` in total."""
+    pyplot = sys.modules.get('matplotlib.pyplot')
+    if pyplot is None:
+        return []
+    images = []
+    total = 0
+    for number in pyplot.get_fignums():
+        buffer = io.BytesIO()
+        pyplot.figure(number).savefig(buffer, format='png', bbox_inches='tight')
+        total += buffer.tell()
+        if total > max_bytes:
+            print(f'[figure {number} dropped: images exceed {max_bytes} bytes]')
+            continue
+        images.append('data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode())
+    pyplot.close('all')
+    return images
+
+
+def read_output(f, head_bytes: int, tail_bytes: int) -> str:
+    """The captured output, keeping only its head and tail if it is too long."""
+    size = os.fstat(f.fileno()).st_size
+    f.seek(0)
+    if size <= head_bytes + tail_bytes:
+        return f.read().decode('utf-8', errors='replace')
+    head = f.read(head_bytes).decode('utf-8', errors='replace')
+    f.seek(size - tail_bytes)
+    tail = f.read().decode('utf-8', errors='replace')
+    return f'{head}\n[... {size - head_bytes - tail_bytes} bytes of output truncated ...]\n{tail}'
+
+
+def run_job(request: dict) -> dict:
+    start_time = time.monotonic()
+    status = 'ok'
+    timed_out = False
+    images: list[str] = []
+    output = tempfile.TemporaryFile()
+    # Capture at the file descriptor level so subprocesses' output is included
+    os.dup2(output.fileno(), 1)
+    os.dup2(output.fileno(), 2)
+    sys.stdout = open(1, 'w', buffering=1, closefd=False)
+    sys.stderr = open(2, 'w', buffering=1, closefd=False)
+
+    def on_timeout(signum, frame):
+        nonlocal timed_out
+        timed_out = True
+        raise TimeoutError(f'Execution timed out after {request["timeout"]} seconds')
+
+    signal.signal(signal.SIGALRM, on_timeout)
+    try:
+        if request.get('cwd'):
+            os.chdir(request['cwd'])
+        if request.get('timeout'):
+            signal.setitimer(signal.ITIMER_REAL, request['timeout'])
+        try:
+            execute(request['code'], {'__name__': '__main__', '__builtins__': __builtins__})
+            images = capture_figures(request.get('max_image_bytes', 16 * 1024 * 1024))
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            status = 'error'
+            print(f'SystemExit: {e.code}', file=sys.stderr)
+    except BaseException as e:
+        status = 'timeout' if timed_out else 'error'
+        # Show only the user's frames, like a notebook cell's traceback
+        error = traceback.TracebackException.from_exception(e)
+        error.stack = traceback.StackSummary.from_list(
+            [frame for frame in error.stack if frame.filename not in (__file__, ast.__file__)]
+        )
+        print(''.join(error.format()), end='', file=sys.stderr)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        'status': status,
+        'output': read_output(output, request.get('head_bytes', 128 * 1024), request.get('tail_bytes', 128 * 1024)),
+        'images': images,
+        'duration_seconds': round(time.monotonic() - start_time, 3),
+        'cpu_seconds': round(own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime, 3),
+        # ru_maxrss is in kilobytes on Linux, bytes on macOS
+        'rss_peak': own.ru_maxrss * (1 if sys.platform == 'darwin' else 1024),
+    }
+
+
+def reply(conn: socket.socket, response: dict) -> None:
+    try:
+        conn.sendall((json.dumps(response) + '\n').encode())
+    except OSError:
+        pass  # the requester went away
+
+
+def serve_one(server: socket.socket) -> None:
+    """Body of a worker: serve a single request."""
+    os.setsid()  # own process group, so a timed-out job is killed with its subprocesses
+    conn, _ = server.accept()
+    server.close()
+    with conn:
+        reply(conn, {'pid': os.getpid()})
+        line = conn.makefile('r').readline()
+        if not line:
+            return  # readiness probe
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            reply(conn, {'status': 'error', 'output': f'Invalid request: {e}'})
+            return
+        reply(conn, run_job(request))
+
+
+def serve(socket_path: str, workers: int, modules: list[str]) -> None:
+    preload(modules)
+    # Keep the preloaded objects' pages shared with the workers (see zygote_server)
+    gc.collect()
+    gc.freeze()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(128)
+    # SIGCHLD wakes up the select below through this pipe
+    wakeup_read, wakeup_write = os.pipe()
+    os.set_blocking(wakeup_write, False)
+    signal.set_wakeup_fd(wakeup_write)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    children: set[int] = set()
+    try:
+        while True:
+            while len(children) < workers:
+                pid = os.fork()
+                if pid == 0:
+                    signal.set_wakeup_fd(-1)
+                    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                    os.close(wakeup_read)
+                    os.close(wakeup_write)
+                    devnull = os.open(os.devnull, os.O_RDONLY)
+                    os.dup2(devnull, 0)
+                    os.close(devnull)
+                    try:
+                        serve_one(server)
+                    except BaseException:
+                        traceback.print_exc()
+                    finally:
+                        os._exit(0)
+                children.add(pid)
+            readable, _, _ = select.select([sys.stdin, wakeup_read], [], [])
+            if sys.stdin in readable and not os.read(sys.stdin.fileno(), 1024):
+                return  # parent is gone
+            if wakeup_read in readable:
+                os.read(wakeup_read, 1024)
+            while children:
+                try:
+                    pid, _ = os.waitpid(-1, os.WNOHANG)
+                except ChildProcessError:
+                    children.clear()
+                    break
+                if pid == 0:
+                    break
+                children.discard(pid)
+    finally:
+        for pid in children:
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+
+if __name__ == '__main__':
+    # Resolve imports against the working directory (see zygote_server)
+    if sys.path and os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+        sys.path[0] = os.getcwd()
+    serve(sys.argv[1], int(sys.argv[2]), sys.argv[3:])
@@ -0,0 +1,221 @@
+"""Kernels forked from a pre-initialized template process.
+
+`KernelZygote` runs `zygote_server.py`, a process that has imported ipykernel
+and the warm-up modules once. `ForkedKernelManager` asks it for a new kernel:
+the zygote forks, so the kernel starts in milliseconds with everything already
+imported, and the imported modules' pages are shared copy-on-write between all
+kernels instead of being loaded into each of them.
+
+`ForkedKernelManager` implements the part of jupyter_client's
+`AsyncKernelManager` interface `LocalJupyterKernel` uses. The forked kernel is
+a child of the zygote, not of this process, so it is managed by pid.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from collections import deque
+from queue import Empty
+
+import psutil
+from jupyter_client.asynchronous import AsyncKernelClient
+from jupyter_client.connect import write_connection_file
+
+from .execute_server import retry_with_backoff
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'zygote_server.py')
+# A kernel_info request still unanswered after this long is sent again
+KERNEL_INFO_RESEND_SECONDS = 1.0
+
+
+class KernelZygote:
+    def __init__(
+        self,
+        modules: list[str],
+        cwd: str | None = None,
+        env: dict[str, str] | None = None,
+        python: str = sys.executable,
+    ) -> None:
+        self.modules = modules
+        self.cwd = cwd
+        self.env = env
+        self.python = python
+        self.process: asyncio.subprocess.Process | None = None
+        self.socket_path: str | None = None
+        self.ready_seconds: float | None = None
+        self.forks = 0
+        self.failures = 0
+        self._fork_seconds: deque[float] = deque(maxlen=100)
+
+    async def start(self, timeout: float = 60) -> None:
+        """Start the zygote and wait until it accepts fork requests."""
+        start_time = time.monotonic()
+        self._socket_dir = tempfile.mkdtemp(prefix='simple_openhands-zygote-')
+        self.socket_path = os.path.join(self._socket_dir, 'zygote.sock')
+        self.process = await asyncio.create_subprocess_exec(
+            self.python,
+            SERVER_SCRIPT,
+            self.socket_path,
+            *self.modules,
+            stdin=asyncio.subprocess.PIPE,
+            cwd=self.cwd,
+            env=self.env,
+        )
+
+        async def probe() -> None:
+            if self.process.returncode is not None:
+                raise RuntimeError(f'Kernel zygote exited with code {self.process.returncode}')
+            _, writer = await asyncio.open_unix_connection(self.socket_path)
+            writer.close()
+
+        # The zygote listens only after preloading, so a connection means it is ready
+        await retry_with_backoff(probe, timeout)
+        self.ready_seconds = time.monotonic() - start_time
+        logging.info(f'Kernel zygote ready in {self.ready_seconds:.2f}s (preloaded {self.modules})')
+
+    async def fork(self, connection_file: str, cwd: str | None = None) -> int:
+        """Fork a kernel listening on the ports of `connection_file`; returns its pid."""
+        if self.process is None or self.process.returncode is not None:
+            raise RuntimeError('Kernel zygote is not running')
+        start_time = time.monotonic()
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.socket_path)
+            try:
+                request = {'connection_file': connection_file, 'cwd': cwd or self.cwd}
+                writer.write((json.dumps(request) + '\n').encode())
+                await writer.drain()
+                response = json.loads(await reader.readline() or b'{}')
+            finally:
+                writer.close()
+            if 'pid' not in response:
+                raise RuntimeError(f'Kernel zygote failed to fork: {response.get("error", "no response")}')
+        except Exception:
+            self.failures += 1
+            raise
+        self.forks += 1
+        self._fork_seconds.append(time.monotonic() - start_time)
+        return response['pid']
+
+    async def shutdown(self) -> None:
+        if self.process is not None and self.process.returncode is None:
+            # Closing stdin tells the zygote to exit; kernels still running follow it
+            if self.process.stdin is not None:
+                self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), 5)
+            except asyncio.TimeoutError:
+                self.process.kill()
+        if getattr(self, '_socket_dir', None):
+            shutil.rmtree(self._socket_dir, ignore_errors=True)
+
+    def stats(self) -> dict:
+        fork_seconds = list(self._fork_seconds)
+        return {
+            'pid': self.process.pid if self.process is not None else None,
+            'running': self.process is not None and self.process.returncode is None,
+            'modules': self.modules,
+            'ready_seconds': round(self.ready_seconds, 3) if self.ready_seconds is not None else None,
+            'forks': self.forks,
+            'failures': self.failures,
+            'fork_ms_avg': round(sum(fork_seconds) / len(fork_seconds) * 1000, 2) if fork_seconds else None,
+        }
+
+
+class ForkedKernelManager:
+    """Drop-in for the `AsyncKernelManager` calls made by `LocalJupyterKernel`."""
+
+    def __init__(self, zygote: KernelZygote) -> None:
+        self.zygote = zygote
+        self.pid: int | None = None
+        self.connection_file: str | None = None
+
+    async def start_kernel(self, cwd: str | None = None, **kwargs) -> None:
+        fd, self.connection_file = tempfile.mkstemp(prefix='kernel-', suffix='.json')
+        os.close(fd)
+        write_connection_file(self.connection_file, ip='127.0.0.1')
+        try:
+            self.pid = await self.zygote.fork(self.connection_file, cwd)
+        except Exception:
+            self._remove_connection_file()
+            raise
+
+    def client(self) -> AsyncKernelClient:
+        client = AsyncKernelClient()
+        client.load_connection_file(self.connection_file)
+        return client
+
+    async def wait_for_ready(self, client: AsyncKernelClient, timeout: float = 60) -> None:
+        """Wait until the kernel answers kernel_info and its IOPub is connected.
+
+        `client.wait_for_ready` polls heartbeats in 0.2s steps for clients not
+        created by a jupyter_client KernelManager, which alone would cost more
+        than the fork; the process is checked by pid here instead.
+        """
+        deadline = time.monotonic() + timeout
+        msg_id: str | None = None
+        sent = 0.0
+        while True:
+            if msg_id is None or time.monotonic() - sent > KERNEL_INFO_RESEND_SECONDS:
+                msg_id, sent = client.kernel_info(), time.monotonic()
+            try:
+                msg = await client.shell_channel.get_msg(timeout=0.02)
+            except Empty:
+                pass
+            else:
+                # Replies to the earlier requests arrive before this one and are dropped
+                if msg['msg_type'] == 'kernel_info_reply' and msg['parent_header'].get('msg_id') == msg_id:
+                    try:
+                        # IOPub subscriptions join late; the reply's status messages prove it works
+                        await client.iopub_channel.get_msg(timeout=0.02)
+                        return
+                    except Empty:
+                        msg_id = None  # ask again for more status messages
+            if not await self.is_alive():
+                raise RuntimeError('Forked kernel died before replying to kernel_info')
+            if time.monotonic() > deadline:
+                raise RuntimeError(f'Forked kernel did not reply to kernel_info in {timeout} seconds')
+
+    async def is_alive(self) -> bool:
+        if self.pid is None:
+            return False
+        try:
+            return psutil.Process(self.pid).status() != psutil.STATUS_ZOMBIE
+        except psutil.NoSuchProcess:
+            return False
+
+    async def signal_kernel(self, signum: int) -> None:
+        if self.pid is None:
+            return
+        try:
+            # The kernel leads its own process group (setsid in the zygote)
+            os.killpg(self.pid, signum)
+        except ProcessLookupError:
+            pass
+
+    async def interrupt_kernel(self) -> None:
+        await self.signal_kernel(signal.SIGINT)
+
+    async def shutdown_kernel(self, now: bool = False) -> None:
+        if not now and await self.is_alive():
+            await self.signal_kernel(signal.SIGTERM)
+            for _ in range(50):
+                if not await self.is_alive():
+                    break
+                await asyncio.sleep(0.1)
+        await self.signal_kernel(signal.SIGKILL)
+        self.pid = None
+        self._remove_connection_file()
+
+    def _remove_connection_file(self) -> None:
+        if self.connection_file:
+            try:
+                os.remove(self.connection_file)
+            except OSError:
+                pass
+            self.connection_file = None
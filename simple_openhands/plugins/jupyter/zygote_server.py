@@ -0,0 +1,123 @@
+"""Fork server ("zygote") for Jupyter kernels.
+
+Run as a script, not imported from the package, so the zygote only holds the
+modules it preloads:
+
+    python zygote_server.py SOCKET_PATH [MODULE ...]
+
+It imports ipykernel and the given modules once, freezes the garbage
+collector's view of them, and then serves fork requests on a Unix socket.
+Each request is one JSON line ``{"connection_file": ..., "cwd": ...}``; the
+zygote forks, the child becomes an ipykernel listening on the ports of the
+connection file, and the zygote answers ``{"pid": ...}``. Children share the
+preloaded modules' memory pages copy-on-write and skip the import time.
+
+The zygote uses only the standard library itself and exits when its stdin
+is closed (i.e. when the process that started it goes away); its kernels
+poll their parent and exit with it.
+"""
+
+import gc
+import importlib
+import json
+import os
+import select
+import signal
+import socket
+import sys
+import traceback
+
+# What IPKernelApp.initialize/start imports anyway
+KERNEL_MODULES = [
+    'ipykernel.kernelapp',
+    'ipykernel.ipkernel',
+    'ipykernel.zmqshell',
+    'ipykernel.debugger',  # pulls in debugpy, ~0.1s
+    'psutil',
+    'IPython.core.interactiveshell',
+    'IPython.core.completer',
+]
+
+
+def preload(modules: list[str]) -> None:
+    for name in KERNEL_MODULES + modules:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f'zygote: preloading {name} failed: {e!r}', file=sys.stderr, flush=True)
+
+
+def run_kernel(connection_file: str, cwd: str | None) -> None:
+    """Body of a forked child: become an independent ipykernel."""
+    os.setsid()  # own process group, so interrupts and kills reach only this kernel
+    for signum in (signal.SIGCHLD, signal.SIGTERM, signal.SIGPIPE):
+        signal.signal(signum, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+    if cwd:
+        os.chdir(cwd)
+    from ipykernel.kernelapp import IPKernelApp
+
+    app = IPKernelApp.instance()
+    # Like a spawned kernel, exit when the parent (the zygote) goes away
+    app.initialize(['-f', connection_file, f'--IPKernelApp.parent_handle={os.getppid()}'])
+    app.start()
+
+
+def reply(conn: socket.socket, response: dict) -> None:
+    try:
+        conn.sendall((json.dumps(response) + '\n').encode())
+    except OSError:
+        pass  # the requester went away
+
+
+def serve(socket_path: str, modules: list[str]) -> None:
+    preload(modules)
+    # Move the preloaded objects out of the collector's generations: collections
+    # in a child would otherwise write to (and so copy) every shared page
+    gc.collect()
+    gc.freeze()
+    # Children are reaped automatically; the parent checks them by pid
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen()
+    while True:
+        readable, _, _ = select.select([server, sys.stdin], [], [])
+        if sys.stdin in readable and not os.read(sys.stdin.fileno(), 1024):
+            return  # parent is gone
+        if server not in readable:
+            continue
+        conn, _ = server.accept()
+        with conn:
+            try:
+                line = conn.makefile('r').readline()
+                if not line:
+                    continue  # readiness probe
+                request = json.loads(line)
+                pid = os.fork()
+            except Exception as e:
+                reply(conn, {'error': repr(e)})
+                continue
+            if pid == 0:
+                server.close()
+                conn.close()
+                try:
+                    run_kernel(request['connection_file'], request.get('cwd'))
+                except BaseException:
+                    traceback.print_exc()
+                    os._exit(1)
+                os._exit(0)
+            reply(conn, {'pid': pid})
+
+
+if __name__ == '__main__':
+    # Running the file as a script put this directory first on sys.path; like
+    # `python -m ipykernel_launcher`, resolve imports against the working
+    # directory instead of the plugin's own modules
+    if sys.path and os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+        sys.path[0] = os.getcwd()
+    serve(sys.argv[1], sys.argv[2:])
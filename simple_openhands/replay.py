@@ -0,0 +1,222 @@
+"""Replay a recorded trajectory against a runtime.
+
+Reads the actions recorded by the trajectory recorder (``TRAJECTORY_DIR``),
+re-issues them one by one through ``/execute_action`` and compares each
+response with the observation recorded for that action: the content (and
+the exit code of commands) must match exactly, otherwise the action is
+reported as diverged together with a similarity ratio. Latency is reported
+for both the recording and the replay.
+
+Usage:
+    oh-replay /path/to/trajectories --url http://127.0.0.1:8000
+    oh-replay /path/to/trajectories/20250101-120000-42 --since-id 100 --types run,read --show-diff
+"""
+
+import argparse
+import difflib
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+from simple_openhands.events.recorder import find_run_directory, read_events
+
+# Longer contents are compared by their first SIMILARITY_CHARS characters only
+SIMILARITY_CHARS = 20000
+
+
+def load_steps(
+    directory: str,
+    since_id: int = -1,
+    until_id: Optional[int] = None,
+    types: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """The recorded actions, each with the observation it caused (or None)."""
+    actions: List[Dict[str, Any]] = []
+    observations: Dict[int, Dict[str, Any]] = {}
+    for record in read_events(directory, since_id):
+        if 'action' in record:
+            # Observations after `until_id` are still read: they may belong to the last actions
+            if (until_id is None or record['id'] <= until_id) and (types is None or record['action'] in types):
+                actions.append(record)
+        elif record.get('cause') is not None:
+            observations.setdefault(record['cause'], record)
+    return [{'action': action, 'observation': observations.get(action['id'])} for action in actions]
+
+
+def _recorded_seconds(action: Dict[str, Any], observation: Optional[Dict[str, Any]]) -> Optional[float]:
+    try:
+        start = datetime.fromisoformat(action['timestamp'])
+        end = datetime.fromisoformat(observation['timestamp'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return round((end - start).total_seconds(), 3)
+
+
+def _exit_code(observation: Dict[str, Any]) -> Any:
+    metadata = (observation.get('extras') or {}).get('metadata')
+    return metadata.get('exit_code') if isinstance(metadata, dict) else None
+
+
+def compare(recorded: Optional[Dict[str, Any]], replayed: Dict[str, Any]) -> Dict[str, Any]:
+    """Whether a replayed observation matches the recorded one."""
+    if recorded is None:
+        return {'match': None, 'similarity': None}
+    before = str(recorded.get('content', ''))
+    after = str(replayed.get('content', ''))
+    match = (
+        recorded.get('observation') == replayed.get('observation')
+        and before == after
+        and _exit_code(recorded) == _exit_code(replayed)
+    )
+    similarity = 1.0 if before == after else difflib.SequenceMatcher(
+        None, before[:SIMILARITY_CHARS], after[:SIMILARITY_CHARS]
+    ).ratio()
+    return {'match': match, 'similarity': round(similarity, 3)}
+
+
+def replay(
+    steps: List[Dict[str, Any]],
+    execute: Callable[[Dict[str, Any]], Dict[str, Any]],
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """Re-issue the actions of `steps` in order through `execute` (action dict -> observation dict)."""
+    results = []
+    for step in steps:
+        action = step['action']
+        request = {'action': action['action'], 'args': action.get('args', {})}
+        start = time.monotonic()
+        try:
+            replayed = execute(request)
+            error = None
+        except Exception as e:
+            replayed = {}
+            error = f'{type(e).__name__}: {e}'
+        result = {
+            'id': action['id'],
+            'action': action['action'],
+            'recorded_seconds': _recorded_seconds(action, step['observation']),
+            'replay_seconds': round(time.monotonic() - start, 3),
+            'error': error,
+            **({'match': False, 'similarity': None} if error else compare(step['observation'], replayed)),
+            'recorded': step['observation'],
+            'replayed': replayed,
+        }
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+    return results
+
+
+def _latency(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        'mean': round(statistics.mean(ordered), 3),
+        'p50': round(ordered[len(ordered) // 2], 3),
+        'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'total': round(sum(ordered), 3),
+    }
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        'actions': len(results),
+        'matched': sum(1 for r in results if r['match'] is True),
+        'diverged': sum(1 for r in results if r['match'] is False and not r['error']),
+        'failed': sum(1 for r in results if r['error']),
+        'unrecorded': sum(1 for r in results if r['match'] is None),
+        'recorded_latency': _latency([r['recorded_seconds'] for r in results if r['recorded_seconds'] is not None]),
+        'replay_latency': _latency([r['replay_seconds'] for r in results if not r['error']]),
+    }
+
+
+def _format_result(result: Dict[str, Any], show_diff: bool) -> str:
+    recorded = f'{result["recorded_seconds"]:.3f}s' if result['recorded_seconds'] is not None else '-'
+    if result['error']:
+        status = f'failed: {result["error"]}'
+    elif result['match'] is None:
+        status = 'no recorded observation'
+    elif result['match']:
+        status = 'match'
+    else:
+        status = f'diverged (similarity {result["similarity"]})'
+    line = f'[{result["id"]}] {result["action"]:<12} recorded {recorded:>8}  replay {result["replay_seconds"]:.3f}s  {status}'
+    if show_diff and result['match'] is False and not result['error']:
+        diff = difflib.unified_diff(
+            str(result['recorded'].get('content', '')).splitlines(),
+            str(result['replayed'].get('content', '')).splitlines(),
+            'recorded',
+            'replayed',
+            lineterm='',
+        )
+        line += '\n' + '\n'.join(f'    {d}' for d in list(diff)[:200])
+    return line
+
+
+def _http_execute(api_url: str, session_id: Optional[str], timeout: float) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    url = api_url.rstrip('/') + '/execute_action'
+
+    def execute(action: Dict[str, Any]) -> Dict[str, Any]:
+        resp = requests.post(url, json={'action': action, 'session_id': session_id}, timeout=timeout)
+        data = resp.json()
+        if not resp.ok:
+            raise RuntimeError(data.get('error') or data.get('detail') or resp.text)
+        return data
+
+    return execute
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog='oh-replay', description='Replay a recorded trajectory against a Simple OpenHands runtime')
+    parser.add_argument('directory', help='Trajectory run directory, or TRAJECTORY_DIR to use its latest run')
+    parser.add_argument('--url', dest='url', default=None, help='Runtime API base URL (default: $OH_API_URL)')
+    parser.add_argument('--session-id', dest='session_id', default=None, help='Session to replay into (default: the main session)')
+    parser.add_argument('--since-id', dest='since_id', type=int, default=-1, help='Only replay actions with a greater id')
+    parser.add_argument('--until-id', dest='until_id', type=int, default=None, help='Only replay actions up to this id')
+    parser.add_argument('--types', dest='types', default=None, help='Comma-separated action types to replay (e.g. run,read)')
+    parser.add_argument('--timeout', dest='timeout', type=float, default=600.0, help='HTTP timeout per action in seconds (default: 600)')
+    parser.add_argument('--show-diff', dest='show_diff', action='store_true', help='Print a diff of diverged outputs')
+    parser.add_argument('--json', dest='json', action='store_true', help='Print a JSON report instead of text')
+    args = parser.parse_args()
+
+    api_url = args.url or os.environ.get('OH_API_URL')
+    if not api_url:
+        print('oh-replay: OH_API_URL is not set and --url was not provided.', file=sys.stderr)
+        return 2
+    try:
+        directory = find_run_directory(args.directory)
+    except OSError as e:
+        print(f'oh-replay: {e}', file=sys.stderr)
+        return 2
+    types = [t.strip() for t in args.types.split(',') if t.strip()] if args.types else None
+    steps = load_steps(directory, args.since_id, args.until_id, types)
+
+    on_result = None if args.json else (lambda result: print(_format_result(result, args.show_diff), flush=True))
+    results = replay(steps, _http_execute(api_url, args.session_id, args.timeout), on_result)
+    summary = summarize(results)
+    if args.json:
+        report = {
+            'directory': directory,
+            'summary': summary,
+            'results': [{k: v for k, v in r.items() if k not in ('recorded', 'replayed')} for r in results],
+        }
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f'\nReplayed {summary["actions"]} actions from {directory}: {summary["matched"]} matched, '
+              f'{summary["diverged"]} diverged, {summary["failed"]} failed, {summary["unrecorded"]} without a recorded observation')
+        for name in ('recorded_latency', 'replay_latency'):
+            if summary[name]:
+                stats = summary[name]
+                print(f'{name.replace("_", " ")}: mean {stats["mean"]}s  p50 {stats["p50"]}s  p95 {stats["p95"]}s  total {stats["total"]}s')
+    return 1 if summary['diverged'] or summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
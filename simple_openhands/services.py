@@ -0,0 +1,484 @@
+"""Managed background services owned by a bash session.
+
+Agents often start web servers with ``&`` or ``nohup`` inside the tmux pane,
+which interleaves their output with later commands and breaks PS1 parsing.
+``ServiceManager`` instead launches each named service as a detached process
+group with its own log file, waits for readiness (a TCP port accepting
+connections and/or a regex appearing in the log), and can list listening
+ports, restart and stop services. ``BashSession.close`` stops every service
+it owns, so ``/reset`` leaves nothing behind.
+"""
+
+import os
+import re
+import signal
+import socket
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import psutil
+
+from simple_openhands.core import logger
+
+SERVICE_NAME_REGEX = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$')
+
+
+class ServiceStatus:
+    STARTING = 'starting'
+    READY = 'ready'
+    RUNNING = 'running'  # alive, but no readiness probe configured
+    EXITED = 'exited'
+    STOPPED = 'stopped'
+
+
+class _AdoptedProcess:
+    """Popen-like handle for a service inherited from a previous server process.
+
+    Persistent bash sessions survive server restarts and so do their services;
+    they are no longer our children, so they are tracked through psutil.
+    """
+
+    def __init__(self, pid: int, create_time: float) -> None:
+        self.pid = pid
+        self.returncode: int | None = None
+        self._proc = psutil.Process(pid)
+        if abs(self._proc.create_time() - create_time) > 1:
+            raise psutil.NoSuchProcess(pid)  # the pid was reused
+
+    def poll(self) -> int | None:
+        if self.returncode is None:
+            try:
+                alive = self._proc.status() != psutil.STATUS_ZOMBIE
+            except psutil.NoSuchProcess:
+                alive = False
+            if not alive:
+                self.returncode = -1  # real exit code is only known to the parent
+        return self.returncode
+
+    def wait(self, timeout: float | None = None) -> int:
+        try:
+            self._proc.wait(timeout=timeout)
+        except psutil.TimeoutExpired:
+            raise subprocess.TimeoutExpired(str(self.pid), timeout or 0)
+        except psutil.NoSuchProcess:
+            pass
+        self.returncode = -1 if self.returncode is None else self.returncode
+        return self.returncode
+
+
+@dataclass
+class ManagedService:
+    """A named, detached process started by ``ServiceManager``."""
+
+    name: str
+    command: str
+    cwd: str
+    log_path: str
+    env: dict[str, str] = field(default_factory=dict)
+    ready_port: int | None = None
+    ready_pattern: str | None = None
+    process: subprocess.Popen | _AdoptedProcess | None = None
+    started_at: float | None = None
+    ready_at: float | None = None
+    stopped: bool = False
+    log_offset: int = 0  # where the current run's output starts in the log file
+    # Process group of the current run; it outlives the leader if children remain
+    pgid: int | None = None
+
+    @property
+    def pid(self) -> int | None:
+        return self.process.pid if self.process is not None else None
+
+    @property
+    def exit_code(self) -> int | None:
+        return self.process.poll() if self.process is not None else None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    @property
+    def status(self) -> str:
+        if self.stopped:
+            return ServiceStatus.STOPPED
+        if not self.alive:
+            return ServiceStatus.EXITED
+        if self.ready_at is not None:
+            return ServiceStatus.READY
+        if self.ready_port is None and self.ready_pattern is None:
+            return ServiceStatus.RUNNING
+        return ServiceStatus.STARTING
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'name': self.name,
+            'command': self.command,
+            'cwd': self.cwd,
+            'pid': self.pid,
+            'status': self.status,
+            'exit_code': self.exit_code,
+            'log_path': self.log_path,
+            'ready_port': self.ready_port,
+            'ready_pattern': self.ready_pattern,
+            'started_at': self.started_at,
+            'startup_seconds': (
+                round(self.ready_at - self.started_at, 3)
+                if self.ready_at is not None and self.started_at is not None
+                else None
+            ),
+        }
+
+
+def _signal_group(pgid: int, signum: int) -> bool:
+    """Signal a process group; False if no process is left in it."""
+    try:
+        os.killpg(pgid, signum)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def is_port_open(port: int, host: str = '127.0.0.1', timeout: float = 0.2) -> bool:
+    """Return True if something accepts TCP connections on ``host:port``."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        return sock.connect_ex((host, port)) == 0
+
+
+def _process_connections(proc: psutil.Process) -> list:
+    # psutil>=6 renamed Process.connections() to Process.net_connections()
+    getter = getattr(proc, 'net_connections', None) or proc.connections
+    return getter(kind='inet')
+
+
+def list_listening_ports() -> list[dict[str, Any]]:
+    """List TCP sockets in LISTEN state with their owning pid (when visible)."""
+    conns: list[tuple[Any, int | None]] = []
+    try:
+        conns = [(c, c.pid) for c in psutil.net_connections(kind='inet')]
+    except (psutil.AccessDenied, PermissionError):
+        # Fall back to the processes we are allowed to inspect
+        for proc in psutil.process_iter():
+            try:
+                conns.extend((c, proc.pid) for c in _process_connections(proc))
+            except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
+                continue
+
+    ports: dict[tuple[str, int], dict[str, Any]] = {}
+    for conn, pid in conns:
+        if conn.status != psutil.CONN_LISTEN or not conn.laddr:
+            continue
+        ports[(conn.laddr.ip, conn.laddr.port)] = {
+            'ip': conn.laddr.ip,
+            'port': conn.laddr.port,
+            'pid': pid,
+        }
+    return sorted(ports.values(), key=lambda p: (p['port'], p['ip']))
+
+
+class ServiceManager:
+    """Start, probe, restart and stop named background services."""
+
+    POLL_INTERVAL = 0.1
+    STOP_TIMEOUT_SECONDS = 5.0
+
+    def __init__(
+        self,
+        log_dir: str,
+        default_cwd: str | None = None,
+        on_change: Callable[[], None] | None = None,
+    ) -> None:
+        self.log_dir = log_dir
+        self.default_cwd = default_cwd or os.getcwd()
+        self._services: dict[str, ManagedService] = {}
+        # The endpoints call the manager from several worker threads
+        self._lock = threading.Lock()
+        # Called after a service is started, stopped, restarted or removed
+        # (persistent sessions save their state file from it)
+        self.on_change = on_change
+
+    def _changed(self) -> None:
+        if self.on_change is None:
+            return
+        try:
+            self.on_change()
+        except Exception as e:
+            logger.warning(f'Service change callback failed: {e}')
+
+    def _get(self, name: str) -> ManagedService:
+        with self._lock:
+            if name not in self._services:
+                raise KeyError(f'Service {name!r} not found')
+            return self._services[name]
+
+    def start(
+        self,
+        name: str,
+        command: str,
+        cwd: str | None = None,
+        env: dict[str, str] | None = None,
+        ready_port: int | None = None,
+        ready_pattern: str | None = None,
+        ready_timeout: float = 30.0,
+    ) -> dict[str, Any]:
+        """Start a named service and wait (up to ``ready_timeout``) for readiness.
+
+        Raises:
+            ValueError: If the name is invalid or a service with that name is still alive.
+        """
+        if not SERVICE_NAME_REGEX.match(name):
+            raise ValueError(
+                f'Invalid service name {name!r}: use letters, digits, "_", "." or "-"'
+            )
+        if ready_pattern is not None:
+            re.compile(ready_pattern)  # fail fast on a bad regex
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        service = ManagedService(
+            name=name,
+            command=command,
+            cwd=cwd or self.default_cwd,
+            log_path=os.path.join(self.log_dir, f'{name}.log'),
+            env=dict(env or {}),
+            ready_port=ready_port,
+            ready_pattern=ready_pattern,
+        )
+        with self._lock:
+            existing = self._services.get(name)
+            if existing is not None and existing.alive:
+                raise ValueError(f'Service {name!r} is already running (pid {existing.pid})')
+            self._services[name] = service
+            self._spawn(service)
+        self._changed()
+        if self.wait_ready(name, timeout=ready_timeout):
+            self._changed()
+        return service.to_dict()
+
+    def _spawn(self, service: ManagedService) -> None:
+        with open(service.log_path, 'ab') as log_file:
+            log_file.write(
+                f'\n=== [{time.strftime("%Y-%m-%d %H:%M:%S")}] starting: {service.command}\n'.encode()
+            )
+            log_file.flush()
+            service.log_offset = log_file.tell()
+            # A new session makes the service its own process group, so stop()
+            # can take down the whole tree and terminal signals never reach it.
+            service.process = subprocess.Popen(
+                ['/bin/bash', '-c', service.command],
+                cwd=service.cwd,
+                env={**os.environ, **service.env},
+                stdin=subprocess.DEVNULL,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+        # start_new_session: the leader's pid is the group id
+        service.pgid = service.process.pid
+        service.started_at = time.time()
+        service.ready_at = None
+        service.stopped = False
+        logger.debug(f'Service {service.name} started with pid {service.pid}')
+
+    def _probe(self, service: ManagedService) -> bool:
+        if service.ready_port is not None and not is_port_open(service.ready_port):
+            return False
+        if service.ready_pattern is not None:
+            try:
+                with open(service.log_path, 'rb') as f:
+                    f.seek(service.log_offset)
+                    output = f.read().decode('utf-8', errors='replace')
+                if not re.search(service.ready_pattern, output, re.MULTILINE):
+                    return False
+            except FileNotFoundError:
+                return False
+        return True
+
+    def wait_ready(self, name: str, timeout: float = 30.0) -> bool:
+        """Poll the readiness probes until they pass, the process exits or time runs out."""
+        service = self._get(name)
+        if service.ready_port is None and service.ready_pattern is None:
+            return service.alive
+        deadline = time.time() + timeout
+        while True:
+            if service.ready_at is not None:
+                return True
+            if not service.alive:
+                return False
+            if self._probe(service):
+                service.ready_at = time.time()
+                return True
+            if time.time() >= deadline:
+                logger.warning(f'Service {name} not ready after {timeout} seconds')
+                return False
+            time.sleep(self.POLL_INTERVAL)
+
+    def status(self, name: str) -> dict[str, Any]:
+        service = self._get(name)
+        if service.alive and service.ready_at is None and (
+            service.ready_port is not None or service.ready_pattern is not None
+        ):
+            if self._probe(service):
+                service.ready_at = time.time()
+        info = service.to_dict()
+        info['ports'] = self._service_ports(service)
+        return info
+
+    def _snapshot(self) -> list[ManagedService]:
+        with self._lock:
+            return list(self._services.values())
+
+    def list_services(self) -> list[dict[str, Any]]:
+        return [self.status(service.name) for service in self._snapshot()]
+
+    def _service_ports(self, service: ManagedService) -> list[int]:
+        if not service.alive or service.pid is None:
+            return []
+        ports: set[int] = set()
+        try:
+            root = psutil.Process(service.pid)
+            for proc in [root, *root.children(recursive=True)]:
+                try:
+                    for conn in _process_connections(proc):
+                        if conn.status == psutil.CONN_LISTEN and conn.laddr:
+                            ports.add(conn.laddr.port)
+                except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
+                    continue
+        except psutil.NoSuchProcess:
+            return []
+        return sorted(ports)
+
+    def listening_ports(self) -> list[dict[str, Any]]:
+        """All listening TCP ports, annotated with the owning service if any."""
+        owners: dict[int, str] = {}
+        for service in self._snapshot():
+            if not service.alive or service.pid is None:
+                continue
+            try:
+                root = psutil.Process(service.pid)
+                for proc in [root, *root.children(recursive=True)]:
+                    owners[proc.pid] = service.name
+            except psutil.NoSuchProcess:
+                continue
+        ports = list_listening_ports()
+        for entry in ports:
+            entry['service'] = owners.get(entry['pid']) if entry['pid'] else None
+        return ports
+
+    def logs(self, name: str, tail: int = 100) -> str:
+        service = self._get(name)
+        try:
+            with open(service.log_path, 'r', encoding='utf-8', errors='replace') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return ''
+        return '\n'.join(lines[-tail:] if tail > 0 else lines)
+
+    def stop(self, name: str, timeout: float | None = None) -> dict[str, Any]:
+        """Send SIGTERM to the service's process group, then SIGKILL after ``timeout``.
+
+        The whole group is signalled even when the ``bash -c`` leader has
+        already exited, so children it left behind are stopped too.
+        """
+        service = self._get(name)
+        timeout = self.STOP_TIMEOUT_SECONDS if timeout is None else timeout
+        pgid = service.pgid
+        if pgid is not None and not service.stopped and _signal_group(pgid, signal.SIGTERM):
+            deadline = time.time() + timeout
+            while time.time() < deadline:
+                if service.process is not None:
+                    service.process.poll()  # reap an exited leader, it would keep the group alive
+                if not _signal_group(pgid, 0):
+                    break
+                time.sleep(self.POLL_INTERVAL)
+            else:
+                logger.warning(f'Service {name} did not stop in {timeout}s, killing it')
+                _signal_group(pgid, signal.SIGKILL)
+                if service.process is not None:
+                    service.process.wait()
+        service.stopped = True
+        self._changed()
+        return service.to_dict()
+
+    def restart(self, name: str, ready_timeout: float = 30.0) -> dict[str, Any]:
+        service = self._get(name)
+        self.stop(name)
+        self._spawn(service)
+        self._changed()
+        if self.wait_ready(name, timeout=ready_timeout):
+            self._changed()
+        return service.to_dict()
+
+    def remove(self, name: str) -> None:
+        self.stop(name)
+        with self._lock:
+            self._services.pop(name, None)
+        self._changed()
+
+    def to_state(self) -> list[dict[str, Any]]:
+        """Serializable description of every service, used by persistent sessions."""
+        states = []
+        for service in self._snapshot():
+            create_time = None
+            if service.alive and service.pid is not None:
+                try:
+                    create_time = psutil.Process(service.pid).create_time()
+                except psutil.NoSuchProcess:
+                    pass
+            states.append(
+                {
+                    'name': service.name,
+                    'command': service.command,
+                    'cwd': service.cwd,
+                    'env': service.env,
+                    'log_path': service.log_path,
+                    'log_offset': service.log_offset,
+                    'ready_port': service.ready_port,
+                    'ready_pattern': service.ready_pattern,
+                    'pid': service.pid if create_time is not None else None,
+                    'create_time': create_time,
+                    'pgid': service.pgid,
+                    'started_at': service.started_at,
+                    'ready_at': service.ready_at,
+                    'stopped': service.stopped,
+                }
+            )
+        return states
+
+    def adopt(self, states: list[dict[str, Any]]) -> None:
+        """Re-register services recorded by ``to_state`` in a previous server process."""
+        for state in states:
+            process = None
+            if state.get('pid') and state.get('create_time'):
+                try:
+                    process = _AdoptedProcess(state['pid'], state['create_time'])
+                except psutil.NoSuchProcess:
+                    process = None
+            service = ManagedService(
+                name=state['name'],
+                command=state['command'],
+                cwd=state['cwd'],
+                log_path=state['log_path'],
+                env=state.get('env') or {},
+                ready_port=state.get('ready_port'),
+                ready_pattern=state.get('ready_pattern'),
+                process=process,
+                started_at=state.get('started_at'),
+                ready_at=state.get('ready_at'),
+                stopped=state.get('stopped', False),
+                log_offset=state.get('log_offset', 0),
+                # Its children may still run after the leader is gone
+                pgid=state.get('pgid') or state.get('pid'),
+            )
+            with self._lock:
+                self._services[service.name] = service
+
+    def stop_all(self) -> None:
+        for service in self._snapshot():
+            name = service.name
+            try:
+                self.stop(name)
+            except Exception as e:
+                logger.warning(f'Failed to stop service {name}: {e}')
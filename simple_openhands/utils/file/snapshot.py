@@ -0,0 +1,93 @@
+"""Cheap workspace snapshots used when forking a bash session."""
+
+import os
+import shutil
+import stat
+import subprocess
+import tempfile
+
+SNAPSHOT_MODES = ('auto', 'reflink', 'hardlink', 'copy')
+
+
+def _reflink_copy(src: str, dst: str) -> bool:
+    """Copy-on-write clone via ``cp --reflink=always`` (btrfs, XFS, APFS-like filesystems)."""
+    try:
+        result = subprocess.run(
+            ['cp', '-a', '--reflink=always', src, dst],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    except FileNotFoundError:
+        return False
+    if result.returncode != 0:
+        shutil.rmtree(dst, ignore_errors=True)
+        return False
+    return True
+
+
+def snapshot_directory(src: str, dst: str, mode: str = 'auto') -> str:
+    """Snapshot directory ``src`` into the new directory ``dst``.
+
+    Modes:
+        reflink:  copy-on-write clone; fails if the filesystem does not support it.
+        hardlink: hardlink every file. Nearly free, but files modified *in place*
+                  by commands (e.g. ``echo >> file``) change in both trees. Git
+                  and most editors replace files via rename, and the runtime's
+                  file write/edit actions call ``break_hardlink`` first, so
+                  those are safe.
+        copy:     regular recursive copy.
+        auto:     reflink when supported, otherwise copy.
+
+    Returns:
+        The mode that was actually used.
+    """
+    if mode not in SNAPSHOT_MODES:
+        raise ValueError(f'Invalid snapshot mode {mode!r}, expected one of {SNAPSHOT_MODES}')
+    if not os.path.isdir(src):
+        raise NotADirectoryError(src)
+    if os.path.exists(dst):
+        raise FileExistsError(dst)
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+
+    if mode in ('auto', 'reflink'):
+        if _reflink_copy(src, dst):
+            return 'reflink'
+        if mode == 'reflink':
+            raise OSError(f'Filesystem of {src} does not support reflink copies')
+        mode = 'copy'
+
+    if mode == 'hardlink':
+        shutil.copytree(src, dst, symlinks=True, copy_function=os.link)
+    else:
+        shutil.copytree(src, dst, symlinks=True)
+    return mode
+
+
+def break_hardlink(path: str) -> bool:
+    """Give the file at ``path`` its own copy if it is hardlinked elsewhere.
+
+    Writing the file in place afterwards changes only this tree. Mode, times
+    and (when running as root) ownership are kept. Returns whether a copy
+    was made.
+    """
+    path = os.path.realpath(path)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return False
+    if not stat.S_ISREG(st.st_mode) or st.st_nlink < 2:
+        return False
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        shutil.copy2(path, tmp_path)
+        if os.geteuid() == 0:
+            os.chown(tmp_path, st.st_uid, st.st_gid)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return True
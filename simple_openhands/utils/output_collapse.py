@@ -0,0 +1,123 @@
+"""Collapse progress-bar redraws and repeated lines in command output.
+
+Tools such as pip, npm, wget and tqdm redraw a progress line hundreds of times.
+Depending on the terminal width and whether they detect a tty, every redraw ends
+up as its own line (or as ``\\r``-separated segments of one line), which inflates
+the observation returned to the agent without adding information.
+"""
+
+import re
+import threading
+
+# Minimum run length before repeated / progress lines are collapsed
+MIN_RUN_LENGTH = 3
+
+# A drawn bar, not just a percentage: log lines such as "accuracy 90.1%" are
+# separate records and must never be collapsed
+_PROGRESS_MARKER = re.compile(
+    r'\d+%\|[^|]*\|'  # 42%|████      | (tqdm, also before its bar has any glyphs)
+    r'|[█▉▊▋▌▍▎▏━╸╺░▒▓]{2,}'  # block / line bars (tqdm, pip, npm)
+    r'|\[[=#>\- ]{3,}\]'  # [=====>    ] (wget, curl, keras)
+)
+_VOLATILE = re.compile(r'[\d\s█▉▊▋▌▍▎▏━╸╺░▒▓=#>\-.:,|]')
+
+
+def _render_carriage_returns(line: str) -> str:
+    """Render ``\\r`` redraws the way a terminal would: later segments overwrite earlier ones."""
+    line = line.rstrip('\r')
+    if '\r' not in line:
+        return line
+    rendered = ''
+    for segment in line.split('\r'):
+        rendered = segment + rendered[len(segment):]
+    return rendered
+
+
+def _progress_signature(line: str) -> str | None:
+    """Signature shared by all redraws of one progress line, or None for ordinary lines."""
+    if not _PROGRESS_MARKER.search(line):
+        return None
+    signature = _VOLATILE.sub('', line)
+    return signature or None
+
+
+def collapse_output(text: str, min_run: int = MIN_RUN_LENGTH) -> str:
+    """Collapse ``\\r`` redraws, progress-bar runs and repeated identical lines.
+
+    - ``\\r``-separated redraws within a line are rendered to their final state.
+    - A run of at least ``min_run`` progress lines (lines that draw a bar) that
+      differ only in numbers and bar glyphs is reduced to its last line, preceded by
+      ``[N progress updates collapsed]``.
+    - A run of at least ``min_run`` identical non-empty lines is kept once,
+      followed by ``[repeated N times]``.
+    """
+    if not text:
+        return text
+    lines = [_render_carriage_returns(line) for line in text.split('\n')]
+
+    result: list[str] = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        j = i + 1
+        if line.strip():
+            while j < len(lines) and lines[j] == line:
+                j += 1
+            if j - i >= min_run:
+                result.append(line)
+                result.append(f'[repeated {j - i} times]')
+                i = j
+                continue
+
+            signature = _progress_signature(line)
+            j = i + 1
+            if signature is not None:
+                while j < len(lines) and _progress_signature(lines[j]) == signature:
+                    j += 1
+                if j - i >= min_run:
+                    result.append(f'[{j - i - 1} progress updates collapsed]')
+                    result.append(lines[j - 1])
+                    i = j
+                    continue
+        result.append(line)
+        i += 1
+    return '\n'.join(result)
+
+
+class OutputCollapseStats:
+    """Byte-savings counters of the output collapsing stage, per bash session."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.commands = 0
+        self.collapsed_commands = 0
+        self.opted_out_commands = 0
+        self.raw_bytes = 0
+        self.output_bytes = 0
+
+    def record(self, raw: str, collapsed: str) -> None:
+        raw_bytes = len(raw.encode('utf-8', errors='replace'))
+        output_bytes = len(collapsed.encode('utf-8', errors='replace'))
+        with self._lock:
+            self.commands += 1
+            self.raw_bytes += raw_bytes
+            self.output_bytes += output_bytes
+            if output_bytes < raw_bytes:
+                self.collapsed_commands += 1
+
+    def record_opt_out(self) -> None:
+        with self._lock:
+            self.opted_out_commands += 1
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            saved = self.raw_bytes - self.output_bytes
+            return {
+                'commands': self.commands,
+                'collapsed_commands': self.collapsed_commands,
+                'opted_out_commands': self.opted_out_commands,
+                'raw_bytes': self.raw_bytes,
+                'output_bytes': self.output_bytes,
+                'saved_bytes': saved,
+                'saved_ratio': round(saved / self.raw_bytes, 4) if self.raw_bytes else 0.0,
+            }
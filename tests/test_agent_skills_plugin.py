@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from simple_openhands.events.action import AgentSkillAction
+from simple_openhands.events.observation import AgentSkillObservation, ErrorObservation
+from simple_openhands.events.serialization import event_from_dict, event_to_dict
+from simple_openhands.plugins import AgentSkillsPlugin
+
+
+@pytest.fixture
+def repo(tmp_path):
+    (tmp_path / 'pkg').mkdir()
+    (tmp_path / 'pkg' / 'a.py').write_text('def needle():\n    pass\n')
+    (tmp_path / 'long.txt').write_text(''.join(f'line {i}\n' for i in range(1, 301)))
+    return tmp_path
+
+
+@pytest.mark.asyncio
+async def test_search_resolves_paths_against_cwd(repo):
+    plugin = AgentSkillsPlugin()
+    action = event_from_dict(
+        {'action': 'agent_skill', 'args': {'function': 'search_dir', 'arguments': {'search_term': 'needle', 'dir_path': 'pkg'}}}
+    )
+    obs = await plugin.run(action, cwd=str(repo))
+    assert isinstance(obs, AgentSkillObservation) and not obs.failed
+    assert f'[Found 1 matches for "needle" in {repo / "pkg"}]' in obs.content
+    assert event_to_dict(obs)['extras']['function'] == 'search_dir'
+
+    # The default dir_path './' is the session's cwd too
+    obs = await plugin.run(AgentSkillAction(function='find_file', arguments={'file_name': 'a.py'}), cwd=str(repo))
+    assert str(repo / 'pkg' / 'a.py') in obs.content
+
+
+@pytest.mark.asyncio
+async def test_open_file_state_is_kept_per_session(repo):
+    plugin = AgentSkillsPlugin()
+    await plugin.run(AgentSkillAction(function='open_file', arguments={'path': 'long.txt'}), session_id='a', cwd=str(repo))
+    obs = await plugin.run(AgentSkillAction(function='scroll_down'), session_id='a')
+    assert '101|line 101' in obs.content
+    obs = await plugin.run(AgentSkillAction(function='scroll_down'), session_id='b')
+    assert 'No file open' in obs.content
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_do_not_mix_output(repo, capsys):
+    plugin = AgentSkillsPlugin()
+    actions = [
+        AgentSkillAction(function='search_file', arguments={'search_term': f'line {i}0', 'file_path': 'long.txt'})
+        for i in range(1, 9)
+    ]
+    observations = await asyncio.gather(*(plugin.run(a, cwd=str(repo)) for a in actions))
+    for i, obs in enumerate(observations, start=1):
+        assert f'"line {i}0"' in obs.content
+        assert f'"line {i + 1}0"' not in obs.content
+    # Output outside of a call still reaches the real stdout
+    print('outside')
+    assert 'outside' in capsys.readouterr().out
+
+
+@pytest.mark.asyncio
+async def test_unknown_functions_bad_arguments_and_exceptions(repo, monkeypatch):
+    plugin = AgentSkillsPlugin()
+    obs = await plugin.run(AgentSkillAction(function='_clamp'))
+    assert isinstance(obs, ErrorObservation) and 'Unknown agent skill' in obs.content
+    obs = await plugin.run(AgentSkillAction(function='search_dir', arguments={'nope': 1}))
+    assert isinstance(obs, ErrorObservation) and 'Invalid arguments for search_dir' in obs.content
+
+    import simple_openhands.plugins.agent_skills.agentskills as agentskills
+
+    def broken(path: str) -> None:
+        print('before')
+        raise OSError('disk on fire')
+
+    monkeypatch.setattr(agentskills, 'parse_latex', broken)
+    obs = await plugin.run(AgentSkillAction(function='parse_latex', arguments={'path': 'x.tex'}))
+    assert obs.failed and obs.content.startswith('before\n') and 'OSError: disk on fire' in obs.content
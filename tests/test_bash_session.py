@@ -2,9 +2,12 @@ import os
 import tempfile
 import time
 
+import libtmux
+import pytest
+
 from simple_openhands.core import logger
 from simple_openhands.events.action import CmdRunAction
-from simple_openhands.bash import BashCommandStatus, BashSession
+from simple_openhands.bash import BashCommandStatus, BashSession, tmux_socket_name
 from simple_openhands.bash_constants import TIMEOUT_MESSAGE_TEMPLATE
 
 def get_no_change_timeout_suffix(timeout_seconds):
@@ -385,3 +388,183 @@ def test_python_interactive_input():
     assert session.prev_status == BashCommandStatus.COMPLETED
 
     session.close()
+
+
+def test_persistent_session_reattach(tmp_path):
+    state_file = str(tmp_path / 'state' / 'bash_session.json')
+    (tmp_path / 'subdir').mkdir()
+    session = BashSession(
+        work_dir=str(tmp_path), no_change_timeout_seconds=2, state_file=state_file
+    )
+    session.initialize()
+    assert not session.reattached
+    session.execute(CmdRunAction('export REATTACH_VAR=kept && cd subdir'))
+    obs = session.execute(CmdRunAction('sleep 4 && echo finished'))
+    assert session.prev_status == BashCommandStatus.NO_CHANGE_TIMEOUT
+    session_name = session.session.name
+    session.detach()
+    assert os.path.exists(state_file)
+
+    # A "restarted server" finds the same tmux session, cwd and running command
+    restarted = BashSession(
+        work_dir=str(tmp_path), no_change_timeout_seconds=5, state_file=state_file
+    )
+    restarted.initialize()
+    assert restarted.reattached
+    assert restarted.session.name == session_name
+    assert restarted.cwd == str(tmp_path / 'subdir')
+    assert restarted.prev_status == BashCommandStatus.NO_CHANGE_TIMEOUT
+
+    obs = restarted.execute(CmdRunAction('', is_input=True))
+    assert 'finished' in obs.content
+    assert restarted.prev_status == BashCommandStatus.COMPLETED
+    obs = restarted.execute(CmdRunAction('echo $REATTACH_VAR'))
+    assert 'kept' in obs.content
+
+    # Closing for real kills the session and forgets the state
+    restarted.close()
+    assert not os.path.exists(state_file)
+    fresh = BashSession(work_dir=str(tmp_path), state_file=state_file)
+    fresh.initialize()
+    assert not fresh.reattached
+    assert fresh.session.name != session_name
+    fresh.close()
+
+
+def test_fork_session_with_workspace_snapshot(tmp_path):
+    workspace = tmp_path / 'workspace'
+    (workspace / 'src').mkdir(parents=True)
+    (workspace / 'src' / 'app.py').write_text('print("v1")\n')
+    session = BashSession(work_dir=str(workspace))
+    session.initialize()
+    session.execute(CmdRunAction(f'cd {workspace}/src && export FORK_VAR=inherited'))
+    session.execute(CmdRunAction(f'export TOOL_HOME={workspace}/src'))
+
+    child = session.fork(work_dir=str(tmp_path / 'fork'), snapshot_mode='copy')
+    try:
+        assert child.fork_info['snapshot_mode'] == 'copy'
+        assert child.cwd == str(tmp_path / 'fork' / 'src')
+        obs = child.execute(CmdRunAction('echo $FORK_VAR $TOOL_HOME && pwd'))
+        assert 'inherited' in obs.content
+        assert f'{tmp_path}/fork/src' in obs.content
+
+        # Changes in the fork do not leak into the parent workspace
+        child.execute(CmdRunAction('echo \'print("v2")\' > app.py'))
+        assert (workspace / 'src' / 'app.py').read_text() == 'print("v1")\n'
+        assert (tmp_path / 'fork' / 'src' / 'app.py').read_text() == 'print("v2")\n'
+    finally:
+        child.close()
+        session.close()
+
+
+def test_output_collapsing_and_opt_out(tmp_path):
+    session = BashSession(work_dir=str(tmp_path))
+    session.initialize()
+    try:
+        command = 'for i in $(seq 1 50); do echo "waiting"; done; echo finished'
+        obs = session.execute(CmdRunAction(command))
+        assert obs.content.splitlines()[-3:] == ['waiting', '[repeated 50 times]', 'finished']
+        stats = session.output_stats.to_dict()
+        assert stats['collapsed_commands'] == 1
+        assert stats['saved_bytes'] > 0
+
+        obs = session.execute(CmdRunAction(command, collapse_output=False))
+        assert obs.content.count('waiting') == 50
+        assert session.output_stats.to_dict()['opted_out_commands'] == 1
+    finally:
+        session.close()
+
+
+def test_screen_capture_for_full_screen_program(tmp_path):
+    session = BashSession(work_dir=str(tmp_path), no_change_timeout_seconds=5)
+    session.initialize()
+    try:
+        session.execute(CmdRunAction('echo before-tui'))
+        # Minimal "TUI": switch to the alternate screen, draw, wait for a key
+        command = (
+            "printf '\\033[?1049h\\033[2J\\033[HTUI header\\nstatus: idle\\n> '; "
+            "read -r key; printf '\\033[?1049l'; echo \"got $key\""
+        )
+        obs = session.execute(CmdRunAction(command))
+        assert obs.screen is not None and obs.screen['alternate_on']
+        assert obs.content.splitlines() == ['TUI header', 'status: idle', '>']
+        assert (obs.screen['cursor_y'], obs.screen['cursor_x']) == (2, 2)
+        assert 'before-tui' not in obs.content
+        assert session.prev_status == BashCommandStatus.CONTINUE
+
+        # A new command is refused while the program is still running
+        obs = session.execute(CmdRunAction('ls'))
+        assert 'is NOT executed' in obs.metadata.suffix
+
+        # Leaving the alternate screen switches back to history capture
+        obs = session.execute(CmdRunAction('q', is_input=True))
+        assert obs.screen is None
+        assert 'got q' in obs.content
+        assert 'TUI header' not in obs.content.splitlines()
+        assert obs.metadata.exit_code == 0
+
+        # Explicit screen mode returns the visible region of a plain command
+        session.execute(CmdRunAction('printf "line1\\nline2\\n"; sleep 30'))
+        obs = session.execute(CmdRunAction('', is_input=True, capture_mode='screen'))
+        assert obs.screen is not None and not obs.screen['alternate_on']
+        assert 'line2' in obs.content
+        session.execute(CmdRunAction('C-c', is_input=True))
+    finally:
+        session.close()
+
+
+def test_tmux_socket_name_layouts():
+    assert tmux_socket_name('shared', 'sess') is None
+    assert tmux_socket_name('per-session', 'sess') == 'sess'
+    shards = {tmux_socket_name('sharded:4', f'sess-{i}') for i in range(50)}
+    assert shards == {f'simple_openhands-shard-{i}' for i in range(4)}
+    for layout in ('sharded:0', 'sharded:x', 'per-user'):
+        with pytest.raises(ValueError):
+            tmux_socket_name(layout, 'sess')
+
+
+def test_per_session_tmux_server(tmp_path):
+    state_file = str(tmp_path / 'state.json')
+    session = BashSession(
+        work_dir=str(tmp_path), tmux_socket_layout='per-session', state_file=state_file
+    )
+    session.initialize()
+    assert session.tmux_socket == session.session.name
+    assert not libtmux.Server().has_session(session.session.name)
+    obs = session.execute(CmdRunAction('echo $TMUX'))
+    assert session.tmux_socket in obs.content
+    session.detach()
+
+    # The socket is recorded in the state file, whatever the configured layout
+    restarted = BashSession(work_dir=str(tmp_path), state_file=state_file)
+    restarted.initialize()
+    assert restarted.reattached
+    assert restarted.tmux_socket == session.tmux_socket
+    server = restarted.server
+    restarted.close()
+    assert not server.is_alive()
+
+
+def test_command_history(tmp_path):
+    session = BashSession(work_dir=str(tmp_path), no_change_timeout_seconds=2)
+    session.initialize()
+    try:
+        session.execute(CmdRunAction('echo alpha'))
+        session.execute(CmdRunAction('ls /nonexistent-dir'))
+        # Output of a long-running command is accumulated over several calls
+        obs = session.execute(CmdRunAction('echo first; sleep 3; echo second'))
+        assert session.prev_status == BashCommandStatus.NO_CHANGE_TIMEOUT
+        session.execute(CmdRunAction('', is_input=True))
+
+        latest, failed, first = session.history.query(limit=3)
+        assert first.command == 'echo alpha' and first.exit_code == 0
+        assert first.cwd == str(tmp_path)
+        assert failed.exit_code != 0
+        assert session.history.query(failed=True) == [failed]
+        assert 'first' in latest.output and 'second' in latest.output
+        assert latest.duration >= 3
+
+        (match,) = session.history.grep('No such file')
+        assert match['id'] == failed.id
+    finally:
+        session.close()
@@ -0,0 +1,59 @@
+import re
+
+import pytest
+
+from simple_openhands.command_history import MAX_OUTPUT_CHARS, CommandHistory
+
+
+def test_query_newest_first_and_filters():
+    history = CommandHistory()
+    history.add('git status', 'On branch main\nnothing to commit', 0, cwd='/repo')
+    history.add('pytest -q', '1 failed, 3 passed', 1, duration=2.5)
+    history.add('ls', 'a.py\nb.py', 0)
+
+    assert [r.command for r in history.query(limit=2)] == ['ls', 'pytest -q']
+    assert [r.command for r in history.query(exit_code=1)] == ['pytest -q']
+    assert [r.command for r in history.query(failed=False)] == ['ls', 'git status']
+    assert [r.command for r in history.query(command=r'^git ')] == ['git status']
+
+    record = history.get(1)
+    assert record.output == 'On branch main\nnothing to commit'
+    assert record.to_dict()['cwd'] == '/repo'
+    assert 'output' not in record.to_dict()
+    with pytest.raises(KeyError):
+        history.get(42)
+
+
+def test_grep_past_outputs():
+    history = CommandHistory()
+    history.add('pytest -q', 'test_a PASSED\ntest_b FAILED\ntest_c FAILED', 1)
+    history.add('echo hi', 'hi', 0)
+
+    (match,) = history.grep('failed', ignore_case=True)
+    assert match['command'] == 'pytest -q'
+    assert match['match_count'] == 2
+    assert match['matches'][0] == {'line': 2, 'text': 'test_b FAILED'}
+    assert history.grep('nothing-matches') == []
+    with pytest.raises(re.error):
+        history.grep('(')
+
+
+def test_budget_evicts_oldest_records():
+    history = CommandHistory(max_bytes=2000)
+    for i in range(50):
+        history.add(f'cmd-{i}', f'output {i} ' + 'x' * 200, 0)
+    stats = history.stats()
+    assert stats['bytes'] <= 2000
+    assert stats['evicted'] > 0
+    assert stats['records'] + stats['evicted'] == 50
+    assert history.query(limit=1)[0].command == 'cmd-49'
+
+
+def test_large_outputs_keep_their_tail():
+    history = CommandHistory()
+    output = 'head\n' + 'y' * MAX_OUTPUT_CHARS + '\ntail'
+    record = history.add('big', output, 0)
+    assert record.output_truncated
+    assert record.output_chars == len(output)
+    assert record.output.endswith('tail')
+    assert len(record.compressed_output) < 10_000
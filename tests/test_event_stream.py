@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from simple_openhands.events import EventSource
+from simple_openhands.events.action import CmdRunAction
+from simple_openhands.events.observation import CmdOutputObservation, ErrorObservation
+from simple_openhands.events.serialization import event_from_dict, event_to_dict
+from simple_openhands.events.stream import EventStream
+
+
+@pytest.mark.asyncio
+async def test_events_get_consecutive_ids_and_observations_their_cause():
+    stream = EventStream()
+    action = CmdRunAction(command='ls')
+    assert 'id' not in event_to_dict(action)
+
+    action_dict = await stream.add_event(action, EventSource.AGENT)
+    observation_dict = await stream.add_event(
+        CmdOutputObservation(content='a b', command='ls'), EventSource.ENVIRONMENT, cause=action.id
+    )
+    assert action_dict['id'] == 0 and action_dict['source'] == 'agent' and 'cause' not in action_dict
+    assert action_dict['timestamp'] is not None
+    assert observation_dict['id'] == 1 and observation_dict['cause'] == 0
+    assert observation_dict['source'] == 'environment'
+    assert [e['id'] for e in stream.get_events()] == [0, 1]
+    assert [e['id'] for e in stream.get_events(since_id=0)] == [1]
+
+    restored = event_from_dict(action_dict)
+    assert isinstance(restored, CmdRunAction) and restored.command == 'ls'
+    assert restored.id == 0 and restored.source == EventSource.AGENT and restored.timestamp == action.timestamp
+    restored = event_from_dict({'observation': 'error', 'content': 'boom', 'id': 5, 'cause': 4, 'source': 'environment'})
+    assert isinstance(restored, ErrorObservation) and restored.cause == 4 and restored.id == 5
+
+
+@pytest.mark.asyncio
+async def test_ring_buffer_keeps_the_latest_events():
+    stream = EventStream(max_events=3)
+    for i in range(5):
+        await stream.add_event(CmdRunAction(command=f'echo {i}'), EventSource.AGENT)
+    assert [e['id'] for e in stream.get_events()] == [2, 3, 4]
+    assert stream.stats()['oldest_id'] == 2 and stream.stats()['next_id'] == 5
+
+
+@pytest.mark.asyncio
+async def test_subscription_replays_backlog_then_receives_new_events():
+    stream = EventStream()
+    for i in range(3):
+        await stream.add_event(CmdRunAction(command=f'echo {i}'), EventSource.AGENT)
+    subscription = stream.subscribe(since_id=0)
+    await stream.add_event(CmdRunAction(command='echo 3'), EventSource.AGENT)
+
+    received = []
+
+    async def consume():
+        async for record in subscription:
+            received.append(record['id'])
+
+    consumer = asyncio.create_task(consume())
+    await asyncio.sleep(0)
+    await stream.add_event(CmdRunAction(command='echo 4'), EventSource.AGENT)
+    subscription.close()
+    await asyncio.wait_for(consumer, 1)
+    assert received == [1, 2, 3, 4]
+    assert stream.stats()['subscribers'] == []
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_drops_events_without_blocking_the_stream():
+    stream = EventStream()
+    subscription = stream.subscribe(maxsize=2)
+    for i in range(5):
+        await asyncio.wait_for(stream.add_event(CmdRunAction(command=f'echo {i}'), EventSource.AGENT), 1)
+    assert subscription.dropped == 3
+    subscription.close()
+    assert [record['id'] async for record in subscription] == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_blocking_subscriber_applies_backpressure():
+    stream = EventStream()
+    subscription = stream.subscribe(maxsize=1, block=True, put_timeout=5)
+    await stream.add_event(CmdRunAction(command='echo 0'), EventSource.AGENT)
+    adding = asyncio.create_task(stream.add_event(CmdRunAction(command='echo 1'), EventSource.AGENT))
+    await asyncio.sleep(0.05)
+    assert not adding.done()
+
+    assert (await subscription.__anext__())['id'] == 0
+    await asyncio.wait_for(adding, 1)
+    assert (await subscription.__anext__())['id'] == 1
+    assert subscription.dropped == 0
+    subscription.close()
+
+    timed_out = stream.subscribe(maxsize=1, block=True, put_timeout=0.01)
+    await stream.add_event(CmdRunAction(command='echo 2'), EventSource.AGENT)
+    await stream.add_event(CmdRunAction(command='echo 3'), EventSource.AGENT)
+    assert timed_out.dropped == 1
@@ -0,0 +1,106 @@
+import json
+import os
+import pickle
+import time
+import types
+
+import pytest
+
+from simple_openhands.plugins.jupyter.checkpoint import (
+    CHECKPOINT_SOURCE,
+    RESTORE_SOURCE,
+    checkpoint_expression,
+    checkpoint_path,
+    parse_result,
+    read_result,
+)
+
+
+def _call(source: str, function: str, *args):
+    namespace: dict = {}
+    exec(source, namespace)
+    return json.loads(namespace[function](*args))
+
+
+def _checkpoint(user_ns: dict, directory: str, names=None, background=False, hidden=None) -> dict:
+    shell = types.SimpleNamespace(user_ns=user_ns, user_ns_hidden=hidden or {})
+    return _call(CHECKPOINT_SOURCE, 'checkpoint', shell, directory, names, 'token', background)
+
+
+def _restore(user_ns: dict, directory: str, names=None) -> dict:
+    return _call(RESTORE_SOURCE, 'restore', types.SimpleNamespace(user_ns=user_ns), directory, names)
+
+
+def test_checkpoint_skips_unpicklable_variables_and_restores_the_rest(tmp_path):
+    directory = str(tmp_path / 'cp')
+    user_ns = {
+        'data': {'a': [1, 2, 3]},
+        'gen': (i for i in range(3)),
+        'square': lambda x: x * x,
+        'os': os,
+        '_private': 1,
+    }
+    report = _checkpoint(user_ns, directory)
+    assert report['saved'] == ['data']
+    assert set(report['skipped']) == {'gen', 'square'}
+    assert 'TypeError' in report['skipped']['gen']
+    assert read_result(directory, 'token') == report
+    assert read_result(directory, 'other') is None
+
+    restored: dict = {}
+    assert _restore(restored, directory) == {'restored': ['data'], 'failed': {}}
+    assert restored == {'data': {'a': [1, 2, 3]}}
+
+
+def test_checkpoint_is_incremental(tmp_path):
+    directory = str(tmp_path / 'cp')
+    user_ns = {'a': 1, 'b': [1, 2]}
+    _checkpoint(user_ns, directory)
+    mtime = os.path.getmtime(os.path.join(directory, 'a.pkl'))
+
+    user_ns['b'].append(3)
+    report = _checkpoint(user_ns, directory)
+    assert report['saved'] == ['b'] and report['unchanged'] == ['a']
+    assert os.path.getmtime(os.path.join(directory, 'a.pkl')) == mtime
+
+    # A full checkpoint drops deleted variables, a partial one merges into the manifest
+    del user_ns['a']
+    _checkpoint(user_ns, directory)
+    assert not os.path.exists(os.path.join(directory, 'a.pkl'))
+    user_ns['c'] = 'x'
+    report = _checkpoint(user_ns, directory, names=['c', 'missing'])
+    assert report['saved'] == ['c'] and report['skipped'] == {'missing': 'not defined'}
+    restored: dict = {}
+    assert _restore(restored, directory, ['b', 'c', 'a'])['failed'] == {'a': 'not in checkpoint'}
+    assert restored == {'b': [1, 2, 3], 'c': 'x'}
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires os.fork')
+def test_background_checkpoint_writes_result_file(tmp_path):
+    directory = str(tmp_path / 'cp')
+    report = _checkpoint({'a': 1}, directory, background=True)
+    assert report == {'token': 'token', 'background': True, 'variables': ['a']}
+    for _ in range(200):
+        result = read_result(directory, 'token')
+        if result is not None:
+            break
+        time.sleep(0.01)
+    assert result['saved'] == ['a']
+    with open(os.path.join(directory, 'a.pkl'), 'rb') as f:
+        assert pickle.load(f) == 1
+
+
+def test_expression_does_not_bind_names(tmp_path):
+    shell = types.SimpleNamespace(user_ns={'a': 1}, user_ns_hidden={})
+    user_ns = {'get_ipython': lambda: shell}
+    value = eval(checkpoint_expression(str(tmp_path), None, 't', False), user_ns)
+    assert set(user_ns) - {'__builtins__'} == {'get_ipython'}
+    assert parse_result({'status': 'ok', 'data': {'text/plain': repr(value)}})['saved'] == ['a']
+    with pytest.raises(RuntimeError, match='OSError'):
+        parse_result({'status': 'error', 'ename': 'OSError', 'evalue': 'x'})
+
+
+@pytest.mark.parametrize('name', ['', '..', 'a/b', 'x' * 65])
+def test_checkpoint_path_rejects_unsafe_names(name):
+    with pytest.raises(ValueError):
+        checkpoint_path('/tmp', 'default', name)
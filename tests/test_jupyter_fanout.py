@@ -0,0 +1,88 @@
+import asyncio
+import sys
+
+import pytest
+
+from simple_openhands.plugins.jupyter.fanout import LaneFailed, fan_out, item_code, summarize
+from simple_openhands.plugins.jupyter.worker_pool import StatelessWorkerPool
+
+
+@pytest.mark.asyncio
+async def test_fan_out_keeps_input_order_and_bounds_parallelism():
+    running = 0
+    peak = 0
+    lanes_used = set()
+
+    async def run_item(lane, index, item):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        lanes_used.add(lane)
+        # Later inputs finish first
+        await asyncio.sleep(0.01 * (10 - index))
+        running -= 1
+        if item == 'bad':
+            raise RuntimeError('boom')
+        return {'status': 'ok', 'output': item.upper()}
+
+    inputs = ['a', 'b', 'bad', 'c', 'd']
+    results = await fan_out(inputs, run_item, ['x', 'y'])
+    assert [r['input'] for r in results] == inputs
+    assert [r['index'] for r in results] == list(range(5))
+    assert [r['output'] for r in results] == ['A', 'B', 'RuntimeError: boom', 'C', 'D']
+    assert results[2]['status'] == 'error'
+    assert peak == 2 and lanes_used == {'x', 'y'}
+
+    text = summarize(results, 2, 'workers', 0.5)
+    assert text.startswith('Ran 5 items on 2 workers in 0.50s: 4 ok, 1 failed\n')
+    assert '--- [2] error' in text
+
+
+@pytest.mark.asyncio
+async def test_fan_out_retires_failed_lanes():
+    used = []
+
+    async def run_item(lane, index, item):
+        used.append(lane)
+        await asyncio.sleep(0.01)
+        if lane == 'x':
+            raise LaneFailed('lane x is gone')
+        return {'status': 'ok', 'output': str(item)}
+
+    results = await fan_out(list(range(6)), run_item, ['x', 'y'])
+    assert used.count('x') == 1
+    assert [r['status'] for r in results].count('error') == 1
+    assert 'lane x is gone' in [r['output'] for r in results]
+
+    async def always_fails(lane, index, item):
+        raise LaneFailed(f'lane {lane} is gone')
+
+    results = await asyncio.wait_for(fan_out(list(range(5)), always_fails, ['x', 'y']), 1)
+    assert [r['status'] for r in results] == ['error'] * 5
+    assert sum(r['output'] == 'Not run: every lane failed' for r in results) == 3
+
+
+def test_item_code_binds_json_input():
+    namespace: dict = {}
+    exec(item_code('result = item["n"] * 2', {'n': 21, 's': "it's"}), namespace)
+    assert namespace['result'] == 42 and namespace['item']['s'] == "it's"
+    with pytest.raises(ValueError):
+        item_code('pass', 1, 'not valid')
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.platform == 'win32', reason='requires fork and Unix sockets')
+async def test_fan_out_over_stateless_workers():
+    pool = StatelessWorkerPool(2, modules=[])
+    await pool.start()
+    try:
+        async def run_item(lane, index, item):
+            result = await pool.run(item_code('print(10 // item)', item))
+            return {'status': result['status'], 'output': result['output']}
+
+        results = await fan_out([1, 2, 0, 5], run_item, [0, 1])
+        assert [r['output'] for r in results][:2] == ['10\n', '5\n']
+        assert results[2]['status'] == 'error' and 'ZeroDivisionError' in results[2]['output']
+        assert results[3]['output'] == '2\n'
+    finally:
+        await pool.shutdown()
@@ -0,0 +1,61 @@
+import asyncio
+import sys
+
+import pytest
+import pytest_asyncio
+
+pytest.importorskip('kernel_gateway')
+pytest.importorskip('ipykernel')
+
+from simple_openhands.plugins.jupyter.execute_server import (  # noqa: E402
+    JupyterKernel,
+    wait_for_gateway,
+)
+from simple_openhands.utils.system import find_available_tcp_port  # noqa: E402
+
+
+@pytest_asyncio.fixture
+async def gateway():
+    port = find_available_tcp_port()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, '-m', 'jupyter', 'kernelgateway',
+        '--KernelGatewayApp.ip=127.0.0.1', f'--KernelGatewayApp.port={port}',
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        await wait_for_gateway(f'http://127.0.0.1:{port}', timeout=60, process=process)
+        yield f'127.0.0.1:{port}'
+    finally:
+        process.terminate()
+        await process.wait()
+
+
+@pytest.mark.asyncio
+async def test_gateway_kernel_concurrent_executions(gateway):
+    kernel = JupyterKernel(gateway, 'test')
+    await kernel.initialize()
+    try:
+        results = await asyncio.gather(
+            *(kernel.execute(f'import time; time.sleep(0.05); print({i})') for i in range(5))
+        )
+        assert [r['text'] for r in results] == [f'{i}\n' for i in range(5)]
+        # Outputs are complete even when the reply overtakes them
+        for i in range(30):
+            assert (await kernel.execute(f'print({i})'))['text'] == f'{i}\n'
+        assert kernel.router.pending == 0
+    finally:
+        await kernel.shutdown_async()
+
+
+@pytest.mark.asyncio
+async def test_gateway_kernel_timeout_recovers(gateway):
+    kernel = JupyterKernel(gateway, 'test')
+    await kernel.initialize()
+    try:
+        await kernel.execute('x = 1')
+        result = await kernel.execute('import time; time.sleep(30)', timeout=1)
+        assert result['text'] == '[Execution timed out (1 seconds).]'
+        assert (await kernel.execute('print(x)'))['text'] == '1\n'
+    finally:
+        await kernel.shutdown_async()
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+import tornado.web
+from tornado.httpclient import HTTPClientError
+
+from simple_openhands.plugins.jupyter.execute_server import (
+    retry_with_backoff,
+    wait_for_gateway,
+)
+from simple_openhands.utils.system import find_available_tcp_port
+
+
+class ForbiddenHandler(tornado.web.RequestHandler):
+    def get(self) -> None:
+        # What the kernel gateway answers when list_kernels is disabled
+        self.set_status(403)
+
+
+@pytest.mark.asyncio
+async def test_wait_for_gateway_detects_late_server():
+    port = find_available_tcp_port()
+    app = tornado.web.Application([(r'/api/kernels', ForbiddenHandler)])
+
+    async def start_later():
+        await asyncio.sleep(0.3)
+        return app.listen(port, address='127.0.0.1')
+
+    server_task = asyncio.create_task(start_later())
+    elapsed = await wait_for_gateway(f'http://127.0.0.1:{port}', timeout=10)
+    server = await server_task
+    server.stop()
+    # Backoff is capped well below the old one-second polling
+    assert 0.3 <= elapsed < 1.5
+
+
+@pytest.mark.asyncio
+async def test_wait_for_gateway_fails_fast_when_process_exits():
+    class ExitedProcess:
+        returncode = 1
+
+    port = find_available_tcp_port()
+    with pytest.raises(RuntimeError, match='exited with code 1'):
+        await wait_for_gateway(f'http://127.0.0.1:{port}', timeout=10, process=ExitedProcess())
+
+
+@pytest.mark.asyncio
+async def test_retry_with_backoff_times_out():
+    calls = 0
+
+    async def probe():
+        nonlocal calls
+        calls += 1
+        raise ConnectionRefusedError('down')
+
+    with pytest.raises(ConnectionRefusedError, match='Not ready after 0.2 seconds'):
+        await retry_with_backoff(probe, timeout=0.2, initial_delay=0.01, max_delay=0.05)
+    assert calls >= 4
+
+
+@pytest.mark.asyncio
+async def test_retry_with_backoff_raises_http_errors_at_once():
+    codes = [599, 503, 500]
+
+    async def probe():
+        raise HTTPClientError(codes.pop(0))
+
+    with pytest.raises(HTTPClientError) as excinfo:
+        await retry_with_backoff(probe, timeout=10, initial_delay=0.01)
+    # Connection errors and 503 were retried, the 500 was not
+    assert excinfo.value.code == 500 and codes == []
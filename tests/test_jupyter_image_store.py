@@ -0,0 +1,47 @@
+import base64
+import os
+
+import pytest
+
+from simple_openhands.plugins.jupyter.image_store import ImageStore
+
+
+def test_put_is_content_addressed_and_deduplicated(tmp_path):
+    store = ImageStore(str(tmp_path))
+    digest = store.put(b'png-bytes')
+    assert store.put(b'png-bytes') == digest
+    assert store.put(b'other') != digest
+    with open(store.path(digest), 'rb') as f:
+        assert f.read() == b'png-bytes'
+    stats = store.stats()
+    assert stats['stored'] == 2 and stats['deduplicated'] == 1
+    assert stats['bytes'] == len(b'png-bytes') + len(b'other')
+
+
+def test_put_data_url(tmp_path):
+    store = ImageStore(str(tmp_path))
+    url = 'data:image/png;base64,' + base64.b64encode(b'\x89PNG').decode()
+    digest = store.put_data_url(url)
+    with open(store.path(digest), 'rb') as f:
+        assert f.read() == b'\x89PNG'
+    assert store.put_data_url('https://example.com/a.png') is None
+
+
+def test_path_rejects_malformed_digest(tmp_path):
+    store = ImageStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.path('../../etc/passwd')
+
+
+def test_eviction_removes_oldest_images(tmp_path):
+    store = ImageStore(str(tmp_path), max_bytes=25)
+    first = store.put(b'a' * 10)
+    os.utime(store.path(first), (1, 1))
+    second = store.put(b'b' * 10)
+    os.utime(store.path(second), (2, 2))
+    third = store.put(b'c' * 10)
+    assert not os.path.exists(store.path(first))
+    assert os.path.exists(store.path(second)) and os.path.exists(store.path(third))
+    assert store.stats()['evicted'] == 1 and store.stats()['bytes'] == 20
+    # A reopened store accounts for the images already on disk
+    assert ImageStore(str(tmp_path), max_bytes=25).stats()['bytes'] == 20
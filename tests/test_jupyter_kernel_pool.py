@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from simple_openhands.plugins.jupyter.kernel_pool import KernelPool
+
+
+class FakeKernel:
+    started = 0
+
+    def __init__(self) -> None:
+        FakeKernel.started += 1
+        self.number = FakeKernel.started
+        self.initialized = False
+        self.closed = False
+
+    async def initialize(self) -> None:
+        await asyncio.sleep(0.01)
+        self.initialized = True
+
+    async def shutdown_async(self) -> None:
+        self.closed = True
+
+
+async def _settle(pool: KernelPool) -> None:
+    while pool.stats()['starting']:
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_pool_prewarms_and_assigns_one_kernel_per_session():
+    pool = KernelPool(FakeKernel, size=2)
+    pool.fill()
+    await _settle(pool)
+    assert pool.stats()['idle'] == 2
+
+    a = await pool.acquire('a')
+    assert a.initialized
+    assert await pool.acquire('a') is a
+    b = await pool.acquire('b')
+    assert b is not a
+    stats = pool.stats()
+    assert stats['hits'] == 2 and stats['misses'] == 0
+    assert stats['sessions'] == ['a', 'b']
+
+    # Assigning kernels triggers a background refill
+    await _settle(pool)
+    assert pool.stats()['idle'] == 2
+    assert pool.stats()['startup_seconds']['avg'] is not None
+    await pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_pool_release_recycles_kernel():
+    pool = KernelPool(FakeKernel, size=1)
+    a = await pool.acquire('a')
+    assert pool.stats()['misses'] == 1
+    await _settle(pool)
+
+    assert await pool.release('a')
+    assert a.closed
+    assert not await pool.release('a')
+    assert pool.get('a') is None
+    # A released session never gets its old kernel back
+    assert await pool.acquire('a') is not a
+    assert pool.stats()['recycled'] == 1
+    await pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_pool_concurrent_acquire_same_session():
+    pool = KernelPool(FakeKernel, size=0)
+    kernels = await asyncio.gather(*(pool.acquire('s') for _ in range(5)))
+    assert all(k is kernels[0] for k in kernels)
+    assert pool.stats()['misses'] == 1
+    assert pool.stats()['idle'] == 0
+    await pool.shutdown()
+    assert kernels[0].closed
+
+
+def test_pool_rejects_negative_size():
+    with pytest.raises(ValueError):
+        KernelPool(FakeKernel, size=-1)
+
+
+class FailingKernel(FakeKernel):
+    async def initialize(self) -> None:
+        await asyncio.sleep(0.01)
+        raise RuntimeError('warm-up failed')
+
+
+class SlowKernel(FakeKernel):
+    instances: list = []
+
+    def __init__(self) -> None:
+        super().__init__()
+        SlowKernel.instances.append(self)
+
+    async def initialize(self) -> None:
+        await asyncio.sleep(10)
+
+
+@pytest.mark.asyncio
+async def test_pool_shuts_down_kernels_that_fail_or_are_cancelled_while_starting():
+    kernels = []
+
+    def factory():
+        kernel = FailingKernel()
+        kernels.append(kernel)
+        return kernel
+
+    pool = KernelPool(factory, size=1)
+    with pytest.raises(RuntimeError):
+        await pool.acquire('a')
+    await _settle(pool)
+    assert kernels and all(k.closed for k in kernels)
+
+    pool = KernelPool(SlowKernel, size=2)
+    pool.fill()
+    await asyncio.sleep(0.01)
+    await asyncio.wait_for(pool.shutdown(), 1)
+    assert len(SlowKernel.instances) == 2 and all(k.closed for k in SlowKernel.instances)
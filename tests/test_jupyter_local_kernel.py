@@ -0,0 +1,406 @@
+import asyncio
+import base64
+import signal
+import time
+
+import pytest
+
+pytest.importorskip('jupyter_client')
+pytest.importorskip('ipykernel')
+
+from simple_openhands.events.action import (  # noqa: E402
+    IPythonFanOutAction,
+    IPythonRunCellAction,
+    KernelCheckpointAction,
+    KernelRestoreAction,
+)
+from simple_openhands.plugins.jupyter import JupyterPlugin  # noqa: E402
+from simple_openhands.plugins.jupyter.local_kernel import LocalJupyterKernel  # noqa: E402
+from simple_openhands.plugins.jupyter.output_buffer import OutputLimits  # noqa: E402
+from simple_openhands.plugins.jupyter.warmup import WarmupProfile  # noqa: E402
+
+
+@pytest.mark.asyncio
+async def test_local_kernel_outputs_and_state():
+    kernel = LocalJupyterKernel('test')
+    await kernel.initialize()
+    try:
+        assert kernel.startup_seconds is not None
+        assert (await kernel.execute('x = 21'))['text'] == '[Code executed successfully with no output]'
+        assert (await kernel.execute('x * 2'))['text'] == '42'
+        assert (await kernel.execute('print("a"); print("b")'))['text'] == 'a\nb\n'
+        error = (await kernel.execute('1 / 0'))['text']
+        assert 'ZeroDivisionError' in error
+        assert '\x1b[' not in error
+    finally:
+        await kernel.shutdown_async()
+
+
+@pytest.mark.asyncio
+async def test_local_kernel_timeout_interrupts_and_recovers():
+    kernel = LocalJupyterKernel('test')
+    await kernel.initialize()
+    try:
+        await kernel.execute('x = 1')
+        result = await kernel.execute('import time; time.sleep(30)', timeout=1)
+        assert result['text'] == '[Execution timed out (1 seconds).]'
+        # The kernel survives the interrupt and the next cell is not aborted
+        assert (await kernel.execute('print(x)'))['text'] == '1\n'
+    finally:
+        await kernel.shutdown_async()
+
+
+@pytest.mark.asyncio
+async def test_local_kernel_bounds_cell_output(tmp_path):
+    limits = OutputLimits(head_bytes=1000, tail_bytes=1000, spill_dir=str(tmp_path))
+    kernel = LocalJupyterKernel('test', output_limits=limits)
+    await kernel.initialize()
+    try:
+        result = await kernel.execute('for i in range(100000): print(i)')
+        assert result['text'].startswith('0\n1\n2\n')
+        assert result['text'].endswith('99998\n99999\n')
+        assert len(result['text']) < 2200
+        truncation = result['truncation']
+        assert truncation['dropped_bytes'] == truncation['total_bytes'] - 2000
+        with open(truncation['spill_path']) as f:
+            assert f.read() == ''.join(f'{i}\n' for i in range(100000))
+    finally:
+        await kernel.shutdown_async()
+
+
+@pytest.mark.asyncio
+async def test_local_kernel_runs_warmup_profile():
+    warmup = WarmupProfile(modules=['json', 'no_such_module_xyz'], code='WARM = 41 + 1')
+    kernel = LocalJupyterKernel('test', warmup=warmup)
+    await kernel.initialize()
+    try:
+        assert kernel.warmup_seconds is not None
+        result = await kernel.execute("import sys; print('json' in sys.modules, 'json' in dir(), WARM)")
+        assert result['text'] == 'True False 42\n'
+    finally:
+        await kernel.shutdown_async()
+
+
+@pytest.mark.asyncio
+async def test_local_kernel_concurrent_executions():
+    kernel = LocalJupyterKernel('test')
+    await kernel.initialize()
+    try:
+        results = await asyncio.gather(
+            *(kernel.execute(f'import time; time.sleep(0.05); print({i})') for i in range(5))
+        )
+        assert [r['text'] for r in results] == [f'{i}\n' for i in range(5)]
+        assert kernel.router.pending == 0
+    finally:
+        await kernel.shutdown_async()
+
+
+@pytest.mark.asyncio
+async def test_plugin_local_backend(monkeypatch, tmp_path):
+    monkeypatch.setenv('JUPYTER_BACKEND', 'local')
+    monkeypatch.setenv('LOCAL_RUNTIME_MODE', '1')
+    monkeypatch.setenv('SIMPLE_OPENHANDS_REPO_PATH', str(tmp_path))
+    plugin = JupyterPlugin()
+    await plugin.initialize('test')
+    try:
+        assert isinstance(plugin.kernel, LocalJupyterKernel)
+        assert plugin.python_interpreter_path
+        obs = await plugin.run(IPythonRunCellAction(code='import os; print(os.getcwd())'))
+        assert obs.content.strip() == str(tmp_path)
+    finally:
+        await plugin.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_plugin_sessions_get_separate_kernels(monkeypatch, tmp_path):
+    monkeypatch.setenv('JUPYTER_BACKEND', 'local')
+    monkeypatch.setenv('JUPYTER_KERNEL_POOL_SIZE', '1')
+    monkeypatch.setenv('LOCAL_RUNTIME_MODE', '1')
+    monkeypatch.setenv('SIMPLE_OPENHANDS_REPO_PATH', str(tmp_path))
+    plugin = JupyterPlugin()
+    await plugin.initialize('test')
+    try:
+        await plugin.run(IPythonRunCellAction(code='x = "default"'))
+        await plugin.run(IPythonRunCellAction(code='x = "fork"'), session_id='fork')
+        obs = await plugin.run(IPythonRunCellAction(code='print(x)'))
+        assert obs.content.strip() == 'default'
+        assert plugin.pool_stats()['sessions'] == ['default', 'fork']
+
+        assert await plugin.release_session('fork')
+        obs = await plugin.run(IPythonRunCellAction(code='print(x)'), session_id='fork')
+        assert 'NameError' in obs.content
+        assert plugin.pool_stats()['recycled'] == 1
+    finally:
+        await plugin.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_plugin_run_stream_yields_outputs_before_completion(monkeypatch, tmp_path):
+    monkeypatch.setenv('JUPYTER_BACKEND', 'local')
+    monkeypatch.setenv('JUPYTER_KERNEL_POOL_SIZE', '0')
+    monkeypatch.setenv('LOCAL_RUNTIME_MODE', '1')
+    monkeypatch.setenv('SIMPLE_OPENHANDS_REPO_PATH', str(tmp_path))
+    plugin = JupyterPlugin()
+    await plugin.initialize('test')
+    try:
+        code = 'import time\nprint("first", flush=True)\ntime.sleep(1)\nprint("second")\n42'
+        start = time.monotonic()
+        events = []
+        async for event in plugin.run_stream(IPythonRunCellAction(code=code)):
+            events.append((time.monotonic() - start, event))
+
+        outputs = [e for _, e in events if e['type'] == 'output']
+        assert [o['msg_type'] for o in outputs] == ['stream', 'stream', 'execute_result']
+        assert outputs[0]['content']['text'] == 'first\n'
+        # The first line arrives while the cell is still sleeping
+        assert events[0][0] < events[-1][0] - 0.5
+        final = events[-1][1]
+        assert final['type'] == 'observation'
+        assert final['observation'].content == 'first\nsecond\n42'
+    finally:
+        await plugin.shutdown()
+
+
+# 1x1 transparent PNG
+PNG = 'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII='
+
+
+@pytest.mark.asyncio
+async def test_plugin_stores_images_out_of_band(monkeypatch, tmp_path):
+    monkeypatch.setenv('JUPYTER_BACKEND', 'local')
+    monkeypatch.setenv('JUPYTER_KERNEL_POOL_SIZE', '0')
+    monkeypatch.setenv('JUPYTER_IMAGE_DIR', str(tmp_path / 'images'))
+    monkeypatch.setenv('LOCAL_RUNTIME_MODE', '1')
+    monkeypatch.setenv('SIMPLE_OPENHANDS_REPO_PATH', str(tmp_path))
+    plugin = JupyterPlugin()
+    await plugin.initialize('test')
+    try:
+        code = (
+            'import base64\nfrom IPython.display import Image, display\n'
+            f'png = base64.b64decode("{PNG}")\n'
+            'display(Image(data=png)); display(Image(data=png))'
+        )
+        obs = await plugin.run(IPythonRunCellAction(code=code))
+        assert len(obs.image_urls) == 2
+        assert obs.image_urls[0] == obs.image_urls[1]
+        assert obs.image_urls[0].startswith('/images/') and obs.image_urls[0].endswith('.png')
+        assert plugin.image_store.stats()['stored'] == 1
+        digest = obs.image_urls[0][len('/images/'):-len('.png')]
+        with open(plugin.image_store.path(digest), 'rb') as f:
+            assert f.read() == base64.b64decode(PNG)
+
+        obs = await plugin.run(IPythonRunCellAction(code=code, image_mode='inline'))
+        assert obs.image_urls[0] == f'data:image/png;base64,{PNG}'
+
+        obs = await plugin.run(IPythonRunCellAction(code='1', image_mode='bogus'))
+        assert 'Invalid image_mode' in obs.content
+    finally:
+        await plugin.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_plugin_restarts_dead_kernel_and_replays_init_code(monkeypatch, tmp_path):
+    monkeypatch.setenv('JUPYTER_BACKEND', 'local')
+    monkeypatch.setenv('JUPYTER_KERNEL_POOL_SIZE', '1')
+    monkeypatch.setenv('LOCAL_RUNTIME_MODE', '1')
+    monkeypatch.setenv('SIMPLE_OPENHANDS_REPO_PATH', str(tmp_path))
+    plugin = JupyterPlugin()
+    await plugin.initialize('test')
+    try:
+        init = IPythonRunCellAction(code='x = 1', kernel_init_code='setting = "init"')
+        await plugin.run(init)
+
+        # The cell kills its own kernel: it is reported, not re-run
+        start = time.monotonic()
+        obs = await plugin.run(IPythonRunCellAction(code='import os; os._exit(1)'))
+        assert time.monotonic() - start < 10
+        assert obs.content.startswith('[Kernel restarted: kernel died while running this cell')
+        assert 'kernel_init_code was re-run' in obs.content
+
+        obs = await plugin.run(IPythonRunCellAction(code='print(setting); print("x" in dir())'))
+        assert obs.content.strip() == 'init\nFalse'
+        assert plugin.restart_stats['restarts'] == 1
+
+        # Killed between cells: the next cell runs in a fresh kernel behind the marker
+        kernel = plugin.kernel
+        await kernel.kernel_manager.signal_kernel(signal.SIGKILL)
+        while await kernel.is_alive():
+            await asyncio.sleep(0.05)
+        obs = await plugin.run(IPythonRunCellAction(code='print(setting)'))
+        assert obs.content.startswith('[Kernel restarted: kernel died after the previous cell')
+        assert obs.content.splitlines()[-1] == 'init'
+        assert plugin.kernel is not kernel
+        assert plugin.restart_stats['restarts'] == 2
+    finally:
+        await plugin.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_plugin_accounts_cell_resources_and_enforces_rss_limit(monkeypatch, tmp_path):
+    monkeypatch.setenv('JUPYTER_BACKEND', 'local')
+    monkeypatch.setenv('JUPYTER_KERNEL_POOL_SIZE', '1')
+    monkeypatch.setenv('JUPYTER_KERNEL_MAX_RSS_MB', '400')
+    monkeypatch.setenv('JUPYTER_RESOURCE_SAMPLE_INTERVAL', '0.1')
+    monkeypatch.setenv('LOCAL_RUNTIME_MODE', '1')
+    monkeypatch.setenv('SIMPLE_OPENHANDS_REPO_PATH', str(tmp_path))
+    plugin = JupyterPlugin()
+    await plugin.initialize('test')
+    try:
+        obs = await plugin.run(IPythonRunCellAction(code='block = bytearray(100 * 1024 * 1024)'))
+        assert obs.resources['rss_delta'] > 90 * 1024 * 1024
+        assert obs.resources['duration_seconds'] > 0
+        assert 'cpu_seconds' in obs.resources
+
+        code = 'import time\nblocks = []\nfor _ in range(100):\n    blocks.append(bytearray(50 * 1024 * 1024)); time.sleep(0.05)'
+        obs = await plugin.run(IPythonRunCellAction(code=code))
+        assert obs.content.startswith('[Kernel restarted: kernel exceeded the RSS limit of 400 MB')
+        assert obs.resources['rss_limit_exceeded'] is True
+        obs = await plugin.run(IPythonRunCellAction(code='print("block" in dir())'))
+        assert obs.content.strip().endswith('False')
+
+        stats = plugin.resource_stats()
+        history = stats['sessions']['default']['history']
+        assert [h['code'] for h in history[-3:]] == [
+            'block = bytearray(100 * 1024 * 1024)',
+            code,
+            'print("block" in dir())',
+        ]
+        assert stats['sessions']['default']['rss'] < 400 * 1024 * 1024
+    finally:
+        await plugin.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_plugin_inspects_namespace_without_touching_it(monkeypatch, tmp_path):
+    monkeypatch.setenv('JUPYTER_BACKEND', 'local')
+    monkeypatch.setenv('JUPYTER_KERNEL_POOL_SIZE', '0')
+    monkeypatch.setenv('LOCAL_RUNTIME_MODE', '1')
+    monkeypatch.setenv('SIMPLE_OPENHANDS_REPO_PATH', str(tmp_path))
+    plugin = JupyterPlugin()
+    await plugin.initialize('test')
+    try:
+        await plugin.run(IPythonRunCellAction(code='big = bytearray(10_000_000)\nsmall = [1, 2, 3]'))
+        report = await plugin.inspect_namespace('default')
+        assert not report['cached']
+        assert report['variables'][0]['name'] == 'big'
+        assert report['variables'][0]['size'] >= 10_000_000
+        assert {'big', 'small'} <= {v['name'] for v in report['variables']}
+
+        assert (await plugin.inspect_namespace('default'))['cached']
+        # The inspection left no trace in the namespace; the next cell invalidates the cache
+        obs = await plugin.run(IPythonRunCellAction(code='del big; print(sorted(k for k in dir() if not k.startswith("_")))'))
+        assert 'inspect' not in obs.content and 'ns' not in obs.content
+        report = await plugin.inspect_namespace('default')
+        assert not report['cached']
+        assert 'big' not in {v['name'] for v in report['variables']}
+
+        assert await plugin.inspect_namespace('nope') is None
+    finally:
+        await plugin.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_plugin_forks_kernels_from_zygote(monkeypatch, tmp_path):
+    monkeypatch.setenv('JUPYTER_BACKEND', 'local')
+    monkeypatch.setenv('JUPYTER_KERNEL_FORK', '1')
+    monkeypatch.setenv('JUPYTER_KERNEL_POOL_SIZE', '0')
+    monkeypatch.setenv('LOCAL_RUNTIME_MODE', '1')
+    monkeypatch.setenv('SIMPLE_OPENHANDS_REPO_PATH', str(tmp_path))
+    plugin = JupyterPlugin()
+    await plugin.initialize('test')
+    try:
+        assert plugin.kernel.forked
+        obs = await plugin.run(IPythonRunCellAction(code='import os; print(os.getcwd())'), session_id='other')
+        assert obs.content.strip() == str(tmp_path)
+        assert plugin.zygote.stats()['forks'] == 2
+    finally:
+        await plugin.shutdown()
+    assert not plugin.zygote.stats()['running']
+
+
+@pytest.mark.asyncio
+async def test_plugin_checkpoints_and_restores_kernel_variables(monkeypatch, tmp_path):
+    monkeypatch.setenv('JUPYTER_BACKEND', 'local')
+    monkeypatch.setenv('JUPYTER_KERNEL_POOL_SIZE', '0')
+    monkeypatch.setenv('JUPYTER_CHECKPOINT_DIR', str(tmp_path / 'checkpoints'))
+    monkeypatch.setenv('LOCAL_RUNTIME_MODE', '1')
+    monkeypatch.setenv('SIMPLE_OPENHANDS_REPO_PATH', str(tmp_path))
+    plugin = JupyterPlugin()
+    await plugin.initialize('test')
+    try:
+        await plugin.run(IPythonRunCellAction(code='import os\ndata = list(range(1000))\nhandle = open(os.devnull)\ndef f(): pass'))
+        obs = await plugin.checkpoint(KernelCheckpointAction())
+        assert obs.in_progress and 'data' in obs.saved
+        # The kernel keeps serving cells while the checkpoint is written
+        assert (await plugin.run(IPythonRunCellAction(code='print(len(data))'))).content.strip() == '1000'
+
+        obs = await plugin.checkpoint(KernelCheckpointAction(wait=True))
+        assert not obs.in_progress
+        assert obs.unchanged == ['data']
+        assert set(obs.skipped) == {'handle', 'f'}
+        assert 'handle: TypeError' in obs.content
+        # The report of the background checkpoint comes with the next one
+        assert obs.background_report['saved'] == ['data']
+        assert set(obs.background_report['skipped']) == {'handle', 'f'}
+        assert 'started earlier finished: 1 saved' in obs.content
+
+        obs = await plugin.checkpoint(KernelCheckpointAction(name='bad', variables=['data']))
+        assert obs.in_progress and obs.background_report is None
+        # A background checkpoint that fails is reported, not just logged
+        # (here: one whose result never appears)
+        plugin._pending_checkpoints[obs.path] = 'lost'
+        plugin.checkpoint_timeout = 0.2
+        obs = await plugin.restore(KernelRestoreAction(name='bad'))
+        assert 'did not finish' in obs.background_report['error']
+        assert 'started earlier failed' in obs.content
+        plugin.checkpoint_timeout = 300
+
+        await plugin.release_session('default')
+        obs = await plugin.restore(KernelRestoreAction())
+        assert obs.restored == ['data'] and obs.failed == {}
+        assert (await plugin.run(IPythonRunCellAction(code='print(sum(data))'))).content.strip() == '499500'
+
+        with pytest.raises(ValueError):
+            await plugin.restore(KernelRestoreAction(name='missing'))
+    finally:
+        await plugin.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_plugin_fans_out_over_temporary_kernels(monkeypatch, tmp_path):
+    monkeypatch.setenv('JUPYTER_BACKEND', 'local')
+    monkeypatch.setenv('JUPYTER_KERNEL_POOL_SIZE', '0')
+    monkeypatch.setenv('LOCAL_RUNTIME_MODE', '1')
+    monkeypatch.setenv('SIMPLE_OPENHANDS_REPO_PATH', str(tmp_path))
+    plugin = JupyterPlugin()
+    await plugin.initialize('test')
+    try:
+        obs = await plugin.fan_out(
+            IPythonFanOutAction(
+                code='import os\nprint(scale * item, os.getpid())',
+                inputs=[1, 2, 'x', 4],
+                setup_code='scale = 10',
+                max_parallel=2,
+                stateless=False,
+            )
+        )
+        assert [r['status'] for r in obs.results] == ['ok', 'ok', 'ok', 'ok']
+        values = [r['output'].split()[0] for r in obs.results]
+        assert values == ['10', '20', 'x' * 10, '40']
+        assert len({r['output'].split()[1] for r in obs.results}) == 2
+        assert obs.content.startswith('Ran 4 items on 2 kernels')
+
+        obs = await plugin.fan_out(IPythonFanOutAction(code='1 / item', inputs=[1, 0], stateless=False))
+        assert obs.results[0]['status'] == 'ok'
+        assert obs.results[1]['status'] == 'error' and 'ZeroDivisionError' in obs.results[1]['output']
+        # The temporary kernels are shut down; only the default session keeps its kernel
+        assert plugin.pool_stats()['sessions'] == ['default']
+    finally:
+        await plugin.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_plugin_rejects_unknown_backend(monkeypatch):
+    monkeypatch.setenv('JUPYTER_BACKEND', 'zmq')
+    with pytest.raises(ValueError):
+        await JupyterPlugin().initialize('test')
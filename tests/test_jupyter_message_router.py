@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from simple_openhands.plugins.jupyter.execute_server import wait_for_execution
+from simple_openhands.plugins.jupyter.message_router import KernelDiedError, MessageRouter
+
+
+def _msg(parent: str, msg_type: str, **content) -> dict:
+    return {'parent_header': {'msg_id': parent}, 'msg_type': msg_type, 'content': content}
+
+
+@pytest.mark.asyncio
+async def test_router_delivers_messages_to_their_request():
+    router = MessageRouter()
+    a = router.register('a')
+    b = router.register('b')
+    messages = [
+        _msg('b', 'stream', text='from b'),
+        _msg('a', 'stream', text='from a'),
+        _msg('unknown', 'stream', text='nobody'),
+        _msg('a', 'status', execution_state='idle'),
+    ]
+
+    async def read():
+        return messages.pop(0) if messages else None
+
+    await router.pump(read)
+    assert a.get_nowait()['content']['text'] == 'from a'
+    assert b.get_nowait()['content']['text'] == 'from b'
+    assert router.dropped == 1
+    router.unregister('a')
+    router.dispatch(_msg('a', 'stream', text='late'))
+    assert router.dropped == 2 and router.pending == 1
+
+
+@pytest.mark.asyncio
+async def test_wait_for_execution_waits_for_output_after_reply():
+    router = MessageRouter()
+    queue = router.register('x')
+    outputs: list[dict] = []
+    task = asyncio.create_task(wait_for_execution(queue, outputs))
+    # The reply overtakes the last output, which only the idle status ends
+    router.dispatch(_msg('x', 'execute_reply', status='ok'))
+    router.dispatch(_msg('x', 'stream', text='late output'))
+    await asyncio.sleep(0.01)
+    assert not task.done()
+    router.dispatch(_msg('x', 'status', execution_state='idle'))
+    reply = await task
+    assert reply['status'] == 'ok'
+    assert outputs == [{'type': 'text', 'content': 'late output'}]
+
+
+@pytest.mark.asyncio
+async def test_fail_all_wakes_pending_requests():
+    router = MessageRouter()
+    queue = router.register('x')
+    router.fail_all(ConnectionRefusedError('gone'))
+    with pytest.raises(ConnectionRefusedError):
+        await wait_for_execution(queue, [])
+
+
+@pytest.mark.asyncio
+async def test_pump_read_error_fails_pending_requests():
+    router = MessageRouter()
+    queue = router.register('x')
+
+    async def read():
+        raise ConnectionError('channel closed')
+
+    await asyncio.wait_for(router.pump(read), 1)
+    with pytest.raises(KernelDiedError, match='channel closed'):
+        await asyncio.wait_for(wait_for_execution(queue, []), 1)
+
+
+def test_kernel_lost_broadcast_calls_handler():
+    router = MessageRouter()
+    router.register('x')
+    states = []
+    router.on_kernel_lost = states.append
+    broadcast = {'parent_header': {}, 'msg_type': 'status', 'content': {'execution_state': 'restarting'}}
+    router.dispatch(broadcast)
+    # Ordinary status messages of a request are still routed
+    router.dispatch(_msg('x', 'status', execution_state='busy'))
+    assert states == ['restarting']
+    assert router.dropped == 0
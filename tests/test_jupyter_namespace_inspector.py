@@ -0,0 +1,64 @@
+import json
+import os
+import types
+
+import pytest
+
+from simple_openhands.plugins.jupyter.namespace_inspector import (
+    INSPECT_SOURCE,
+    inspect_expression,
+    parse_inspection,
+)
+
+
+class Point:
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+def _inspect(user_ns: dict, hidden: dict | None = None, max_objects: int = 100_000) -> dict:
+    namespace: dict = {}
+    exec(INSPECT_SOURCE, namespace)
+    shell = types.SimpleNamespace(user_ns=user_ns, user_ns_hidden=hidden or {}, execution_count=7)
+    return json.loads(namespace['inspect'](shell, max_objects))
+
+
+def test_variables_ranked_by_deep_size():
+    big = [bytes([i % 256]) * 1000 for i in range(100)]
+    report = _inspect({'big': big, 'small': 1, 'text': 'abc', 'point': Point([0] * 500, 2)})
+    names = [v['name'] for v in report['variables']]
+    assert names[0] == 'big' and names[1] == 'point'
+    by_name = {v['name']: v for v in report['variables']}
+    assert by_name['big']['size'] > 100 * 1000
+    assert by_name['big']['shape'] == [100]
+    assert by_name['big']['type'] == 'list'
+    assert by_name['point']['type'].endswith('Point')
+    assert by_name['text']['shape'] == [3]
+    assert report['execution_count'] == 7
+
+
+def test_hidden_private_and_module_names_are_skipped():
+    hidden = {'In': []}
+    report = _inspect({'In': hidden['In'], '_': 1, '_private': 2, 'os': os, 'kept': 3}, hidden)
+    assert [v['name'] for v in report['variables']] == ['kept']
+
+
+def test_walk_is_bounded():
+    report = _inspect({'items': list(range(1000))}, max_objects=10)
+    assert report['variables'][0]['complete'] is False
+
+
+def test_expression_does_not_bind_names():
+    user_ns = {'get_ipython': lambda: types.SimpleNamespace(user_ns={'a': [1, 2]}, execution_count=1)}
+    before = set(user_ns)
+    value = eval(inspect_expression(), user_ns)
+    assert set(user_ns) - {'__builtins__'} == before
+    assert parse_inspection({'status': 'ok', 'data': {'text/plain': repr(value)}})['variables'][0]['name'] == 'a'
+
+
+def test_parse_inspection_raises_on_error():
+    with pytest.raises(RuntimeError, match='NameError'):
+        parse_inspection({'status': 'error', 'ename': 'NameError', 'evalue': 'x'})
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from simple_openhands.plugins.jupyter.execute_server import format_outputs
+from simple_openhands.plugins.jupyter.output_buffer import CellOutputBuffer, OutputLimits
+
+
+def _text(content: str) -> dict:
+    return {'type': 'text', 'content': content}
+
+
+def test_small_output_is_kept_unchanged(tmp_path):
+    buffer = CellOutputBuffer(OutputLimits(head_bytes=10, tail_bytes=10, spill_dir=str(tmp_path)))
+    buffer.append(_text('hello\n'))
+    buffer.append(_text('world'))
+    buffer.close()
+    assert format_outputs(buffer, True) == {'text': 'hello\nworld', 'images': []}
+    assert not buffer.truncated
+    assert os.listdir(tmp_path) == []
+
+
+def test_overflow_keeps_head_and_tail_and_spills_everything(tmp_path):
+    buffer = CellOutputBuffer(OutputLimits(head_bytes=10, tail_bytes=10, spill_dir=str(tmp_path)))
+    chunks = [f'line {i:03d}\n' for i in range(100)]
+    for chunk in chunks:
+        buffer.append(_text(chunk))
+    buffer.close()
+
+    full = ''.join(chunks)
+    result = format_outputs(buffer, True)
+    assert result['text'].startswith(full[:10])
+    assert result['text'].endswith(full[-10:])
+    assert f'{len(full) - 20} bytes of output truncated' in result['text']
+    assert result['truncation']['dropped_bytes'] == len(full) - 20
+    assert result['truncation']['total_bytes'] == len(full)
+    with open(result['truncation']['spill_path'], encoding='utf-8') as f:
+        assert f.read() == full
+
+
+def test_overflow_without_spill_dir(tmp_path):
+    buffer = CellOutputBuffer(OutputLimits(head_bytes=4, tail_bytes=4, spill_dir=None))
+    buffer.append(_text('a' * 1000 + 'tail'))
+    buffer.close()
+    text = format_outputs(buffer, True)['text']
+    assert text == 'aaaa\n[... 996 bytes of output truncated ...]\ntail'
+    assert buffer.spill_path is None
+
+
+def test_output_that_fits_head_plus_tail_is_not_spilled(tmp_path):
+    buffer = CellOutputBuffer(OutputLimits(head_bytes=5, tail_bytes=100, spill_dir=str(tmp_path)))
+    buffer.append(_text('0123456789'))
+    buffer.close()
+    assert format_outputs(buffer, True)['text'] == '0123456789'
+    assert os.listdir(tmp_path) == []
+
+
+def test_images_over_budget_are_dropped():
+    buffer = CellOutputBuffer(OutputLimits(max_image_bytes=10, spill_dir=None))
+    buffer.append({'type': 'image', 'content': 'x' * 8})
+    buffer.append({'type': 'image', 'content': 'y' * 8})
+    result = format_outputs(buffer, True)
+    assert result['images'] == ['x' * 8]
+    assert result['truncation']['dropped_images'] == 1
+
+
+def test_clear_resets_buffer_and_spill_file(tmp_path):
+    buffer = CellOutputBuffer(OutputLimits(head_bytes=2, tail_bytes=2, spill_dir=str(tmp_path)))
+    buffer.append(_text('0123456789'))
+    assert buffer.spill_path and os.path.exists(buffer.spill_path)
+    buffer.clear()
+    assert list(buffer) == [] and buffer.dropped_bytes == 0
+    assert os.listdir(tmp_path) == []
+
+
+def test_spill_dir_is_pruned(tmp_path):
+    limits = OutputLimits(head_bytes=1, tail_bytes=1, spill_dir=str(tmp_path), max_spill_files=3)
+    for _ in range(5):
+        buffer = CellOutputBuffer(limits)
+        buffer.append(_text('overflowing'))
+        buffer.close()
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_limits_from_env(monkeypatch):
+    monkeypatch.setenv('JUPYTER_OUTPUT_HEAD_BYTES', '100')
+    monkeypatch.setenv('JUPYTER_OUTPUT_SPILL_DIR', '')
+    limits = OutputLimits.from_env()
+    assert limits.head_bytes == 100
+    assert limits.spill_dir is None
+    monkeypatch.setenv('JUPYTER_OUTPUT_TAIL_BYTES', '-1')
+    with pytest.raises(ValueError):
+        OutputLimits.from_env()
@@ -0,0 +1,61 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+from simple_openhands.plugins.jupyter.resources import (
+    MB,
+    CellResourceMeter,
+    ResourceLimits,
+    process_usage,
+)
+
+
+def test_process_usage_includes_children():
+    own_rss, _ = process_usage(os.getpid())
+    child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(5)'])
+    try:
+        rss, cpu_seconds = process_usage(os.getpid())
+        assert rss > own_rss
+        assert cpu_seconds > 0
+    finally:
+        child.kill()
+        child.wait()
+    assert process_usage(child.pid) is None
+
+
+def test_limits_from_env(monkeypatch):
+    monkeypatch.setenv('JUPYTER_KERNEL_MAX_RSS_MB', '512')
+    monkeypatch.setenv('JUPYTER_KERNEL_RSS_ACTION', 'interrupt')
+    limits = ResourceLimits.from_env()
+    assert limits.max_rss_bytes == 512 * MB
+    assert limits.on_exceeded == 'interrupt'
+
+    monkeypatch.setenv('JUPYTER_KERNEL_RSS_ACTION', 'ignore')
+    with pytest.raises(ValueError):
+        ResourceLimits.from_env()
+
+
+@pytest.mark.asyncio
+async def test_meter_reports_usage_and_fires_once_over_limit():
+    exceeded = []
+    meter = CellResourceMeter(
+        os.getpid(), ResourceLimits(max_rss_bytes=1, sample_interval=0.01), on_exceeded=exceeded.append
+    )
+    meter.start()
+    await asyncio.sleep(0.05)
+    record = meter.stop()
+    assert len(exceeded) == 1 and meter.exceeded
+    assert record['rss_limit_exceeded'] is True
+    assert record['rss_peak'] >= record['rss_before'] > 0
+    assert record['rss_delta'] == record['rss_after'] - record['rss_before']
+    assert record['duration_seconds'] >= 0.05
+
+
+def test_meter_without_pid_only_times_the_cell():
+    meter = CellResourceMeter(None, ResourceLimits())
+    meter.start()
+    record = meter.stop()
+    assert set(record) == {'timestamp', 'duration_seconds'}
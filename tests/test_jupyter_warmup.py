@@ -0,0 +1,24 @@
+from simple_openhands.plugins.jupyter.warmup import DEFAULT_WARMUP_MODULES, WarmupProfile
+
+
+def test_default_profile_preloads_agentskills():
+    profile = WarmupProfile()
+    assert profile.modules == DEFAULT_WARMUP_MODULES
+    cells = profile.cells()
+    assert len(cells) == 1
+    namespace: dict = {}
+    exec(cells[0].replace(repr(DEFAULT_WARMUP_MODULES), "['json']"), namespace)
+    # The helper does not leak into the user namespace
+    assert '__warmup' not in namespace
+
+
+def test_profile_from_env(monkeypatch):
+    monkeypatch.setenv('JUPYTER_WARMUP_MODULES', 'json, csv,')
+    monkeypatch.setenv('JUPYTER_WARMUP_CODE', 'X = 1')
+    profile = WarmupProfile.from_env()
+    assert profile.modules == ['json', 'csv']
+    assert profile.cells()[-1] == 'X = 1'
+
+    monkeypatch.setenv('JUPYTER_WARMUP_MODULES', '')
+    monkeypatch.delenv('JUPYTER_WARMUP_CODE')
+    assert WarmupProfile.from_env().cells() == []
@@ -0,0 +1,70 @@
+import asyncio
+import sys
+import time
+
+import pytest
+
+from simple_openhands.plugins.jupyter.output_buffer import OutputLimits
+from simple_openhands.plugins.jupyter.worker_pool import StatelessWorkerPool
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason='requires fork and Unix sockets')
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_runs_snippets_without_shared_state(tmp_path):
+    pool = StatelessWorkerPool(2, modules=['csv'], cwd=str(tmp_path))
+    await pool.start()
+    try:
+        result = await pool.run('import os, sys\nx = 1\nprint(os.getcwd(), "csv" in sys.modules)\nx + 1')
+        assert result['status'] == 'ok'
+        assert result['output'] == f'{tmp_path} True\n2\n'
+        assert result['images'] == []
+        assert result['rss_peak'] > 0
+
+        result = await pool.run('print(x)')
+        assert result['status'] == 'error'
+        assert "NameError: name 'x' is not defined" in result['output']
+        assert 'worker_server' not in result['output']
+
+        result = await pool.run('import os; os.system("echo from-subprocess")')
+        assert 'from-subprocess' in result['output']
+        stats = pool.stats()
+        assert stats['jobs'] == 3 and stats['errors'] == 1
+    finally:
+        await pool.shutdown()
+    assert not pool.stats()['alive']
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_timeouts_and_crashes():
+    pool = StatelessWorkerPool(1, modules=[])
+    await pool.start()
+    try:
+        result = await pool.run('import time\ntime.sleep(10)', timeout=0.3)
+        assert result['status'] == 'timeout'
+        assert 'TimeoutError: Execution timed out after 0.3 seconds' in result['output']
+
+        result = await pool.run('import os; os._exit(1)')
+        assert result['status'] == 'error'
+        # The worker that died is replaced
+        assert (await pool.run('print("ok")'))['output'] == 'ok\n'
+        assert pool.stats()['timeouts'] == 1
+    finally:
+        await pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_runs_in_parallel_and_truncates_output():
+    pool = StatelessWorkerPool(3, modules=[], output_limits=OutputLimits(head_bytes=100, tail_bytes=100))
+    await pool.start()
+    try:
+        start_time = time.monotonic()
+        results = await asyncio.gather(*[pool.run('import time; time.sleep(0.5)') for _ in range(3)])
+        assert all(r['status'] == 'ok' for r in results)
+        assert time.monotonic() - start_time < 1.4
+
+        result = await pool.run('print("a" * 10000)')
+        assert 'bytes of output truncated' in result['output']
+        assert len(result['output']) < 300
+    finally:
+        await pool.shutdown()
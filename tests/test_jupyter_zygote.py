@@ -0,0 +1,118 @@
+import asyncio
+import os
+import time
+from queue import Empty
+
+import psutil
+import pytest
+
+pytest.importorskip('jupyter_client')
+pytest.importorskip('ipykernel')
+
+from simple_openhands.plugins.jupyter.local_kernel import LocalJupyterKernel  # noqa: E402
+from simple_openhands.plugins.jupyter.zygote import ForkedKernelManager, KernelZygote  # noqa: E402
+
+
+@pytest.mark.asyncio
+async def test_forked_kernels_share_preloaded_modules():
+    zygote = KernelZygote(['csv'])
+    await zygote.start()
+    kernels = [LocalJupyterKernel('test', zygote=zygote) for _ in range(2)]
+    try:
+        for kernel in kernels:
+            await kernel.initialize()
+            assert kernel.forked
+            assert psutil.Process(kernel.pid).ppid() == zygote.process.pid
+        # Preloaded but not bound in the user namespace
+        result = await kernels[0].execute('import sys; print("csv" in sys.modules, "csv" in dir())')
+        assert result['text'].strip() == 'True False'
+        await kernels[0].execute('x = 1')
+        result = await kernels[1].execute('print("x" in dir())')
+        assert result['text'].strip() == 'False'
+        assert zygote.stats()['forks'] == 2
+    finally:
+        for kernel in kernels:
+            await kernel.shutdown_async()
+        await zygote.shutdown()
+    assert not zygote.stats()['running']
+
+
+@pytest.mark.asyncio
+async def test_forked_kernel_interrupt_and_shutdown():
+    zygote = KernelZygote([])
+    await zygote.start()
+    kernel = LocalJupyterKernel('test', zygote=zygote)
+    try:
+        await kernel.initialize()
+        start = time.monotonic()
+        result = await kernel.execute('import time; time.sleep(30)', timeout=1)
+        assert time.monotonic() - start < 10
+        assert 'timed out' in result['text']
+        result = await kernel.execute('print("alive")')
+        assert result['text'].strip() == 'alive'
+        pid = kernel.pid
+    finally:
+        await kernel.shutdown_async()
+        await zygote.shutdown()
+    for _ in range(50):
+        if not psutil.pid_exists(pid):
+            break
+        await asyncio.sleep(0.1)
+    assert not psutil.pid_exists(pid)
+
+
+@pytest.mark.asyncio
+async def test_kernel_spawns_when_zygote_is_gone():
+    zygote = KernelZygote([])
+    await zygote.start()
+    await zygote.shutdown()
+    kernel = LocalJupyterKernel('test', zygote=zygote)
+    try:
+        await kernel.initialize()
+        assert not kernel.forked
+        assert (await kernel.execute('print(1)'))['text'].strip() == '1'
+    finally:
+        await kernel.shutdown_async()
+
+
+class _Channel:
+    def __init__(self) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def get_msg(self, timeout: float) -> dict:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            raise Empty
+
+
+class _SlowKernelClient:
+    """Answers each kernel_info after `delay` seconds."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.requests: list[str] = []
+        self.shell_channel = _Channel()
+        self.iopub_channel = _Channel()
+
+    def kernel_info(self) -> str:
+        msg_id = f'kernel_info-{len(self.requests)}'
+        self.requests.append(msg_id)
+        asyncio.get_running_loop().call_later(self.delay, self._reply, msg_id)
+        return msg_id
+
+    def _reply(self, msg_id: str) -> None:
+        self.iopub_channel.queue.put_nowait({'msg_type': 'status', 'parent_header': {'msg_id': msg_id}})
+        self.shell_channel.queue.put_nowait({'msg_type': 'kernel_info_reply', 'parent_header': {'msg_id': msg_id}})
+
+
+@pytest.mark.asyncio
+async def test_wait_for_ready_sends_one_kernel_info():
+    manager = ForkedKernelManager(KernelZygote([]))
+    manager.pid = os.getpid()
+    client = _SlowKernelClient(delay=0.3)
+    await manager.wait_for_ready(client, timeout=5)
+    # No further replies are left behind on the shell channel
+    assert client.requests == ['kernel_info-0']
+    await asyncio.sleep(0.5)
+    assert client.shell_channel.queue.empty()
@@ -0,0 +1,65 @@
+from simple_openhands.utils.output_collapse import OutputCollapseStats, collapse_output
+
+
+def test_carriage_return_redraws_render_final_state():
+    assert collapse_output('Downloading 10%\rDownloading 50%\rDone           \nok') == 'Done           \nok'
+    # Shorter redraws only overwrite the beginning of the line, as in a terminal
+    assert collapse_output('fetching 12345\rdone') == 'donehing 12345'
+    assert collapse_output('line one\r\nline two\r\n') == 'line one\nline two\n'
+
+
+def test_repeated_identical_lines():
+    text = 'start\n' + 'Waiting for lock...\n' * 382 + 'end'
+    assert collapse_output(text) == 'start\nWaiting for lock...\n[repeated 382 times]\nend'
+    # Short runs and blank lines are kept as they are
+    assert collapse_output('a\na\nb\n\n\n\nc') == 'a\na\nb\n\n\n\nc'
+
+
+def test_progress_bar_runs_keep_last_line():
+    bars = [
+        f'{i:3d}%|{"█" * (i // 10):<10}| {i}/100 [00:{i % 60:02d}<00:03, {i * 1.5:.1f}it/s]'
+        for i in range(101)
+    ]
+    text = 'Epoch 1\n' + '\n'.join(bars) + '\nEpoch 2'
+    assert collapse_output(text) == (
+        f'Epoch 1\n[100 progress updates collapsed]\n{bars[-1]}\nEpoch 2'
+    )
+
+
+def test_pip_download_progress():
+    lines = [
+        f'   ━━━━━━━━━━{"╸" if i < 10 else "━"} {i}.{i}/10.0 MB {i}.1 MB/s eta 0:00:0{9 - i % 10}'
+        for i in range(1, 11)
+    ]
+    collapsed = collapse_output('Collecting numpy\n' + '\n'.join(lines))
+    assert collapsed.splitlines() == [
+        'Collecting numpy',
+        '[9 progress updates collapsed]',
+        lines[-1],
+    ]
+
+
+def test_distinct_lines_are_untouched():
+    text = 'Epoch 1/10 loss 0.5\nEpoch 2/10 loss 0.4\nEpoch 3/10 loss 0.3\n10% done\n20% more'
+    assert collapse_output(text) == text
+
+
+def test_percent_log_lines_are_untouched():
+    epochs = '\n'.join(f'Epoch {i}: accuracy {90 + i}.{i}%' for i in range(1, 5)) + '\n'
+    assert collapse_output(epochs) == epochs
+    monitor = '\n'.join(f'12:00:{i:02d} cpu {40 + i}% mem 3{i}.5%' for i in range(10)) + '\n'
+    assert collapse_output(monitor) == monitor
+
+
+def test_stats():
+    stats = OutputCollapseStats()
+    raw = 'x\n' * 100
+    stats.record(raw, collapse_output(raw))
+    stats.record('short', 'short')
+    stats.record_opt_out()
+    data = stats.to_dict()
+    assert data['commands'] == 2
+    assert data['collapsed_commands'] == 1
+    assert data['opted_out_commands'] == 1
+    assert data['raw_bytes'] == 205
+    assert data['saved_bytes'] == data['raw_bytes'] - data['output_bytes'] > 150
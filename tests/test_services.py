@@ -0,0 +1,137 @@
+import sys
+
+import psutil
+import pytest
+
+from simple_openhands.services import ServiceManager, ServiceStatus, is_port_open
+from simple_openhands.utils.system import find_available_tcp_port
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = ServiceManager(log_dir=str(tmp_path / 'logs'), default_cwd=str(tmp_path))
+    yield manager
+    manager.stop_all()
+
+
+def test_start_with_port_readiness(manager):
+    port = find_available_tcp_port()
+    info = manager.start(
+        'web',
+        f'{sys.executable} -m http.server {port} --bind 127.0.0.1',
+        ready_port=port,
+        ready_timeout=15,
+    )
+    assert info['status'] == ServiceStatus.READY
+    assert info['startup_seconds'] is not None
+    assert is_port_open(port)
+    assert port in manager.status('web')['ports']
+    assert any(p['port'] == port for p in manager.listening_ports())
+
+    info = manager.stop('web')
+    assert info['status'] == ServiceStatus.STOPPED
+    assert not is_port_open(port)
+
+
+def test_start_with_log_pattern_readiness(manager):
+    info = manager.start(
+        'worker',
+        'echo booting; sleep 0.3; echo "worker ready"; sleep 30',
+        ready_pattern=r'^worker ready$',
+        ready_timeout=10,
+    )
+    assert info['status'] == ServiceStatus.READY
+    logs = manager.logs('worker')
+    assert 'booting' in logs
+    assert 'worker ready' in logs
+
+
+def test_output_goes_to_log_file_and_cwd(manager, tmp_path):
+    manager.start('pwd', 'pwd; echo "$GREETING"', env={'GREETING': 'hi there'})
+    manager._get('pwd').process.wait(timeout=5)
+    info = manager.status('pwd')
+    assert info['status'] == ServiceStatus.EXITED
+    assert info['exit_code'] == 0
+    assert str(tmp_path) in manager.logs('pwd')
+    assert 'hi there' in manager.logs('pwd')
+
+
+def test_exited_service_is_not_ready(manager):
+    info = manager.start('broken', 'exit 3', ready_pattern='never', ready_timeout=5)
+    assert info['status'] == ServiceStatus.EXITED
+    assert info['exit_code'] == 3
+
+
+def test_duplicate_and_invalid_names(manager):
+    manager.start('sleeper', 'sleep 30')
+    with pytest.raises(ValueError):
+        manager.start('sleeper', 'sleep 30')
+    with pytest.raises(ValueError):
+        manager.start('../evil', 'true')
+    with pytest.raises(KeyError):
+        manager.status('missing')
+
+
+def test_restart_and_stop_all(manager):
+    first = manager.start('sleeper', 'sleep 30')
+    second = manager.restart('sleeper')
+    assert second['pid'] != first['pid']
+    assert second['status'] == ServiceStatus.RUNNING
+    manager.stop_all()
+    assert manager.status('sleeper')['status'] == ServiceStatus.STOPPED
+
+
+def test_stop_kills_process_group(manager):
+    manager.start('tree', 'sleep 30 & sleep 30 & wait')
+    proc = manager._get('tree').process
+    manager.stop('tree', timeout=2)
+    assert proc.poll() is not None
+
+
+def _gone(pid):
+    try:
+        return psutil.Process(pid).status() == psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return True
+
+
+def test_stop_kills_children_of_an_exited_leader(manager):
+    manager.start('orphan', 'sleep 30 & echo $!')
+    manager._get('orphan').process.wait(timeout=5)
+    child = int(manager.logs('orphan').splitlines()[-1])
+    assert not _gone(child)
+    assert manager.stop('orphan', timeout=2)['status'] == ServiceStatus.STOPPED
+    assert _gone(child)
+
+    # A group with no process left counts as stopped
+    manager.start('done', 'true')
+    manager._get('done').process.wait(timeout=5)
+    assert manager.stop('done')['status'] == ServiceStatus.STOPPED
+
+
+def test_restart_waits_for_fresh_log_pattern(manager):
+    manager.start('once', 'echo ready; sleep 30', ready_pattern='ready', ready_timeout=5)
+    manager.stop('once')
+    # Same log file, but this run never prints the readiness marker
+    service = manager._get('once')
+    service.command = 'sleep 30'
+    manager._spawn(service)
+    assert not manager.wait_ready('once', timeout=0.5)
+    assert manager.status('once')['status'] == ServiceStatus.STARTING
+
+
+def test_changes_are_reported(tmp_path):
+    states = []
+    manager = ServiceManager(log_dir=str(tmp_path / 'logs'), default_cwd=str(tmp_path))
+    manager.on_change = lambda: states.append([(s['name'], s['stopped']) for s in manager.to_state()])
+    try:
+        manager.start('sleeper', 'sleep 30')
+        assert states[-1] == [('sleeper', False)]
+        manager.stop('sleeper')
+        assert states[-1] == [('sleeper', True)]
+        manager.restart('sleeper')
+        assert states[-1] == [('sleeper', False)]
+        manager.remove('sleeper')
+        assert states[-1] == []
+    finally:
+        manager.stop_all()
@@ -0,0 +1,157 @@
+import asyncio
+import gzip
+import json
+import os
+
+import pytest
+
+from simple_openhands.events import EventSource
+from simple_openhands.events.action import CmdRunAction, FileReadAction
+from simple_openhands.events.observation import CmdOutputObservation
+from simple_openhands.events.recorder import TrajectoryRecorder, find_run_directory, read_events, segment_ids
+from simple_openhands.events.serialization import event_from_dict
+from simple_openhands.events.stream import EventStream
+from simple_openhands.replay import load_steps, replay, summarize
+
+
+async def _record_commands(stream: EventStream, count: int) -> None:
+    for i in range(count):
+        action = CmdRunAction(command=f'echo {i}')
+        await stream.add_event(action, EventSource.AGENT)
+        await stream.add_event(
+            CmdOutputObservation(content=f'{i}\n', command=f'echo {i}'), EventSource.ENVIRONMENT, cause=action.id
+        )
+
+
+@pytest.mark.asyncio
+async def test_recorder_writes_gzip_segments_with_an_index(tmp_path):
+    stream = EventStream()
+    recorder = TrajectoryRecorder(str(tmp_path))
+    recorder.start(stream)
+    await _record_commands(stream, 3)
+    while recorder.stats()['events'] < 6:
+        await asyncio.sleep(0.01)
+    await _record_commands(stream, 1)
+    await recorder.stop()
+
+    directory = find_run_directory(str(tmp_path))
+    assert directory == recorder.directory
+    assert segment_ids(directory) == [0]
+    # A plain (multi-member) gzip file of JSON lines
+    with gzip.open(os.path.join(directory, 'segment-000000000000.jsonl.gz'), 'rt') as f:
+        records = [json.loads(line) for line in f]
+    assert [r['id'] for r in records] == list(range(8))
+    assert records[1]['cause'] == 0 and records[1]['extras']['metadata']['exit_code'] == -1
+    assert isinstance(event_from_dict(records[0]), CmdRunAction)
+    with open(os.path.join(directory, 'segment-000000000000.idx')) as f:
+        index = [tuple(map(int, line.split())) for line in f]
+    # Two batches, i.e. two gzip members
+    assert [event_id for event_id, _ in index] == list(range(8))
+    assert len({offset for _, offset in index}) == 2 and index[6][1] > 0
+    assert [r['id'] for r in read_events(directory, since_id=6)] == [7]
+    assert recorder.stats()['events'] == 8 and recorder.stats()['dropped'] == 0
+
+
+@pytest.mark.asyncio
+async def test_segments_rotate_and_reads_start_from_the_index(tmp_path):
+    stream = EventStream()
+    recorder = TrajectoryRecorder(str(tmp_path), segment_bytes=1)
+    recorder.start(stream)
+    for i in range(4):
+        await _record_commands(stream, 1)
+        # Let the writer finish the batch so that every pair gets its own segment
+        while recorder.stats()['events'] < 2 * (i + 1):
+            await asyncio.sleep(0.01)
+    await recorder.stop()
+
+    assert segment_ids(recorder.directory) == [0, 2, 4, 6]
+    assert [r['id'] for r in read_events(recorder.directory)] == list(range(8))
+    assert [r['id'] for r in read_events(recorder.directory, since_id=4)] == [5, 6, 7]
+
+    retained = TrajectoryRecorder(str(tmp_path / 'retained'), segment_bytes=1, max_segments=2)
+    retained.start(stream)
+    await _record_commands(stream, 1)
+    while retained.stats()['events'] < 2:
+        await asyncio.sleep(0.01)
+    await _record_commands(stream, 2)
+    await retained.stop()
+    assert len(segment_ids(retained.directory)) == 2
+
+
+@pytest.mark.asyncio
+async def test_truncated_batch_is_skipped(tmp_path):
+    stream = EventStream()
+    recorder = TrajectoryRecorder(str(tmp_path))
+    recorder.start(stream)
+    await _record_commands(stream, 2)
+    await recorder.stop()
+    path = os.path.join(recorder.directory, 'segment-000000000000.jsonl.gz')
+    data = gzip.compress(json.dumps({'id': 4, 'content': os.urandom(32 * 1024).hex()}).encode() + b'\n')
+    with open(path, 'ab') as f:
+        f.write(data[: len(data) // 2])
+    assert [r['id'] for r in read_events(recorder.directory)] == [0, 1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_replay_reports_latency_and_divergence(tmp_path):
+    stream = EventStream()
+    recorder = TrajectoryRecorder(str(tmp_path))
+    recorder.start(stream)
+    await _record_commands(stream, 2)
+    read = FileReadAction(path='/missing')
+    await stream.add_event(read, EventSource.AGENT)
+    await recorder.stop()
+
+    steps = load_steps(recorder.directory)
+    assert [s['action']['id'] for s in steps] == [0, 2, 4]
+    assert steps[2]['observation'] is None
+
+    def execute(action):
+        if action['action'] == 'read':
+            return {'observation': 'read', 'content': 'File not found'}
+        command = action['args']['command']
+        output = '0\n' if command == 'echo 0' else '2\n'
+        return {'observation': 'run', 'content': output, 'extras': {'metadata': {'exit_code': -1}}}
+
+    results = replay(steps, execute)
+    assert [r['match'] for r in results] == [True, False, None]
+    assert results[1]['similarity'] == 0.5
+    assert results[0]['recorded_seconds'] is not None and results[0]['replay_seconds'] >= 0
+
+    def failing(action):
+        raise ConnectionError('runtime is down')
+
+    assert replay(steps[:1], failing)[0]['error'] == 'ConnectionError: runtime is down'
+    summary = summarize(results)
+    assert (summary['actions'], summary['matched'], summary['diverged'], summary['unrecorded']) == (3, 1, 1, 1)
+    assert summary['replay_latency']['p50'] >= 0
+    assert load_steps(recorder.directory, types=['read'])[0]['action']['action'] == 'read'
+
+
+@pytest.mark.asyncio
+async def test_write_errors_do_not_stop_the_recorder(tmp_path):
+    stream = EventStream()
+    recorder = TrajectoryRecorder(str(tmp_path), queue_size=1, put_timeout=5)
+    recorder.start(stream)
+    write = recorder._write
+    failures = []
+
+    def flaky_write(batch):
+        if not failures:
+            failures.append(batch)
+            raise ValueError('I/O operation on closed file')
+        write(batch)
+
+    recorder._write = flaky_write
+    await _record_commands(stream, 1)
+    while recorder.stats()['write_errors'] < 1:
+        await asyncio.sleep(0.01)
+    await _record_commands(stream, 1)
+    await recorder.stop()
+    assert recorder.stats()['write_errors'] == 1
+    lost = [r['id'] for r in failures[0]]
+    assert [r['id'] for r in read_events(recorder.directory)] == [i for i in range(4) if i not in lost]
+
+    # A writer that has exited no longer holds up the stream
+    await asyncio.wait_for(_record_commands(stream, 5), 1)
+    assert stream.stats()['subscribers'] == []
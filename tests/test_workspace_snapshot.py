@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from simple_openhands.utils.file.snapshot import break_hardlink, snapshot_directory
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    src = tmp_path / 'src'
+    (src / 'pkg').mkdir(parents=True)
+    (src / 'pkg' / 'mod.py').write_text('x = 1\n')
+    os.symlink('pkg/mod.py', src / 'link.py')
+    return src
+
+
+def test_copy_snapshot_is_independent(workspace, tmp_path):
+    dst = tmp_path / 'dst'
+    assert snapshot_directory(str(workspace), str(dst), 'copy') == 'copy'
+    assert os.path.islink(dst / 'link.py')
+    (dst / 'pkg' / 'mod.py').write_text('x = 2\n')
+    assert (workspace / 'pkg' / 'mod.py').read_text() == 'x = 1\n'
+
+
+def test_hardlink_snapshot_shares_inodes(workspace, tmp_path):
+    dst = tmp_path / 'dst'
+    assert snapshot_directory(str(workspace), str(dst), 'hardlink') == 'hardlink'
+    assert os.stat(dst / 'pkg' / 'mod.py').st_ino == os.stat(workspace / 'pkg' / 'mod.py').st_ino
+
+    # Copy-on-write before an in-place write, also through a symlink
+    os.chmod(dst / 'pkg' / 'mod.py', 0o640)
+    assert break_hardlink(str(dst / 'link.py'))
+    with open(dst / 'pkg' / 'mod.py', 'w') as f:
+        f.write('x = 2\n')
+    assert (workspace / 'pkg' / 'mod.py').read_text() == 'x = 1\n'
+    assert os.stat(dst / 'pkg' / 'mod.py').st_mode & 0o777 == 0o640
+    assert not break_hardlink(str(dst / 'pkg' / 'mod.py'))
+    assert not break_hardlink(str(dst / 'missing.py'))
+    assert sorted(os.listdir(dst / 'pkg')) == ['mod.py']
+
+
+def test_auto_falls_back_to_a_usable_mode(workspace, tmp_path):
+    dst = tmp_path / 'dst'
+    assert snapshot_directory(str(workspace), str(dst)) in ('reflink', 'copy')
+    assert (dst / 'pkg' / 'mod.py').read_text() == 'x = 1\n'
+
+
+def test_invalid_arguments(workspace, tmp_path):
+    with pytest.raises(ValueError):
+        snapshot_directory(str(workspace), str(tmp_path / 'dst'), 'zfs')
+    with pytest.raises(FileExistsError):
+        snapshot_directory(str(workspace), str(workspace))
+    with pytest.raises(NotADirectoryError):
+        snapshot_directory(str(tmp_path / 'missing'), str(tmp_path / 'dst'))